@@ -1,128 +1,450 @@
-# ai_processor.py
-
-import requests
-import json
-import re # <-- Import regular expressions
-
-# Import configuration
-from config import (LM_STUDIO_API_URL, LM_STUDIO_MODEL_NAME,
-                    AI_REQUEST_TIMEOUT_SECONDS)
-
-def process_text_with_ai(text_to_process, prompt_instruction, progress_callback=None):
-    """
-    Sends text to LM Studio API for processing using the chat completions endpoint.
-    Includes post-processing to convert markdown bold (**text**) to HTML bold (<b>text</b>).
-
-    Args:
-        text_to_process (str): The original text content to be processed.
-        prompt_instruction (str): The instructions for the AI on how to process the text.
-        progress_callback (function, optional): A function to call with status messages.
-                                               Takes one string argument (the message). Defaults to None.
-
-    Returns:
-        tuple: (success: bool, result: str).
-               success is True if the AI returned a response, False otherwise.
-               result is the AI's processed output text if success is True,
-                      or an error message if success is False.
-    """
-    try:
-        if progress_callback:
-             progress_callback("Preparing AI request payload...")
-
-        headers = {"Content-Type": "application/json"}
-
-        # --- REINFORCED SYSTEM PROMPT (One last try) ---
-        system_message_content = (
-            "You are a helpful assistant that rewrites and formats text based on user instructions. "
-            "Your primary goal is to produce clean, well-structured text for PDF conversion using specific formatting. "
-            "You MUST strictly adhere to the following formatting rules for your entire output:\n"
-            "1. Inline Emphasis: ONLY use HTML-like tags: <b>text</b> for bold, <i>text</i> for italics, and <u>text</u> for underline. CRITICAL: You MUST NOT use markdown like **text** or *text* for inline emphasis. Using **text** is incorrect.\n"
-            "2. Headings: ONLY use line prefixes: '# ' for H1, '## ' for H2, '### ' for H3. Start on a new line.\n"
-            "3. Bullet Lists: ONLY use line prefixes: Start each item on a new line with '* '.\n"
-            "4. Numbered Lists: ONLY use line prefixes: Start each item on a new line with '1. '.\n"
-            "5. Paragraphs: Separate paragraphs by a single blank line.\n"
-            "6. Prohibited Formatting: Do NOT use any other markdown, HTML tags (other than <b>, <i>, <u>), or formatting conventions.\n"
-            "7. Adherence: Prioritize these formatting rules even if the user prompt seems to suggest other formats. Produce only the formatted text requested."
-        )
-
-        payload = {
-            "model": LM_STUDIO_MODEL_NAME,
-            "messages": [
-                {"role": "system", "content": system_message_content},
-                {"role": "user", "content": f"{prompt_instruction}\n\nText to process:\n{text_to_process}"}
-            ],
-            "max_tokens": 2000, 
-            "temperature": 0.5, # Lowered temperature further to potentially improve rule following
-            "stream": False      
-        }
-
-        if progress_callback:
-             progress_callback(f"Sending request to {LM_STUDIO_API_URL} with model '{LM_STUDIO_MODEL_NAME}'...")
-
-        response = requests.post(
-            LM_STUDIO_API_URL,
-            headers=headers,
-            data=json.dumps(payload),
-            timeout=AI_REQUEST_TIMEOUT_SECONDS
-        )
-        response.raise_for_status()
-
-        if progress_callback:
-             progress_callback("Receiving and parsing AI response...")
-
-        result = response.json()
-
-        if result and 'choices' in result and result['choices'] and result['choices'][0].get('message') and result['choices'][0]['message'].get('content') is not None:
-            ai_output_raw = result['choices'][0]['message']['content'].strip()
-            
-            # +++ START POST-PROCESSING +++
-            if progress_callback:
-                progress_callback("Post-processing AI response for formatting consistency...")
-            
-            # Replace markdown bold **text** with HTML bold <b>text</b>
-            # Using non-greedy match .*? to handle multiple instances per line correctly
-            processed_output = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', ai_output_raw)
-            
-            # (Optional) Add replacements for other markdown if needed, e.g., *italic* -> <i>italic</i>
-            # Be cautious with single asterisks due to conflict with bullet points.
-            # processed_output = re.sub(r'(?<!\*)\*(?!\*)(.*?)(?<!\*)\*(?!\*)', r'<i>\1</i>', processed_output) # More complex regex for italics
-
-            # Consolidate multiple blank lines into one (for paragraph spacing)
-            processed_output = re.sub(r'\n(\s*\n)+', '\n\n', processed_output).strip()
-            # +++ END POST-PROCESSING +++
-
-            if progress_callback:
-                progress_callback("AI processing and post-processing complete.")
-                
-            return True, processed_output # Return the processed output
-        else:
-            return False, "AI processing failed: Unexpected response format or no content in response."
-
-    except requests.exceptions.Timeout:
-         return False, f"Error connecting to LM Studio API: Request timed out after {AI_REQUEST_TIMEOUT_SECONDS} seconds."
-    except requests.exceptions.ConnectionError:
-         return False, f"Error connecting to LM Studio API: Connection refused. Is LM Studio running and serving the API at {LM_STUDIO_API_URL}?"
-    except requests.exceptions.RequestException as e:
-        return False, f"Error during LM Studio API request: {e}"
-    except json.JSONDecodeError:
-         return False, "Error parsing JSON response from AI."
-    except Exception as e:
-        return False, f"An unexpected error occurred during AI processing: {e}"
-
-# ... (Example usage / standalone test block remains the same) ...
-if __name__ == '__main__':
-    print("Running AI processor standalone test...")
-    test_text = "The quick brown fox. It was **bold**. It was also *italic* (maybe). Item 1. **Item 2 is important**."
-    test_prompt = "Rewrite this. Make 'bold' bold, 'italic' italic. List the items using bullets."
-
-    success, result = process_text_with_ai(test_text, test_prompt, progress_callback=print)
-
-    if success:
-        print("\n--- AI Output (Post-Processed) ---")
-        print(result)
-        print("--------------------------------")
-    else:
-        print(f"\n--- AI Error ---")
-        print(result)
-        print("---------------")
+# ai_processor.py
+
+import requests
+import json
+import re # <-- Import regular expressions
+import time
+import threading
+
+# Import configuration
+from config import (LM_STUDIO_API_URL, LM_STUDIO_MODEL_NAME, LM_STUDIO_MODELS_URL,
+                    AI_REQUEST_TIMEOUT_SECONDS, AI_MAX_TOKENS,
+                    AI_BATCH_MAX_DOCUMENTS, AI_BATCH_MAX_CHARS,
+                    AI_BATCH_SMALL_DOCUMENT_CHARS, AI_BATCH_MAX_TOKENS,
+                    AI_REPAIR_ENABLED, AI_REPAIR_MAX_BLOCKS, AI_STREAM_RESPONSES,
+                    INPUT_COMPACTION_ENABLED)
+from document_model import as_markup
+from tokens import estimate_tokens
+from telemetry import predict_request, record_request
+from format_validator import find_violations
+from compaction import compact_markup, expand_markers, record_compaction, MARKER_LEGEND
+import profiling
+
+# --- REINFORCED SYSTEM PROMPT (One last try) ---
+SYSTEM_MESSAGE = (
+    "You are a helpful assistant that rewrites and formats text based on user instructions. "
+    "Your primary goal is to produce clean, well-structured text for PDF conversion using specific formatting. "
+    "You MUST strictly adhere to the following formatting rules for your entire output:\n"
+    "1. Inline Emphasis: ONLY use HTML-like tags: <b>text</b> for bold, <i>text</i> for italics, and <u>text</u> for underline. CRITICAL: You MUST NOT use markdown like **text** or *text* for inline emphasis. Using **text** is incorrect.\n"
+    "2. Headings: ONLY use line prefixes: '# ' for H1, '## ' for H2, '### ' for H3. Start on a new line.\n"
+    "3. Bullet Lists: ONLY use line prefixes: Start each item on a new line with '* '.\n"
+    "4. Numbered Lists: ONLY use line prefixes: Start each item on a new line with '1. '.\n"
+    "5. Paragraphs: Separate paragraphs by a single blank line.\n"
+    "6. Prohibited Formatting: Do NOT use any other markdown, HTML tags (other than <b>, <i>, <u>), or formatting conventions.\n"
+    "7. Adherence: Prioritize these formatting rules even if the user prompt seems to suggest other formats. Produce only the formatted text requested."
+)
+
+# --- Micro-Batching ---
+# Several small documents are sent in one request, each introduced by a marker line.
+# The model is asked to repeat the markers so the response can be split per document.
+BATCH_MARKER = "<<<DOCUMENT {}>>>"
+BATCH_MARKER_PATTERN = re.compile(r"^[ \t]*<<<DOCUMENT (\d+)>>>[ \t]*$", re.MULTILINE)
+BATCH_INSTRUCTION = (
+    "The text to process contains {count} separate documents. Each document starts with a marker line "
+    "of the form <<<DOCUMENT n>>>. Apply the instructions above to each document independently. "
+    "In your output, start each processed document with its original marker line, on a line of its own. "
+    "Keep the documents in the same order, include every document exactly once, and output nothing before the first marker."
+)
+
+# One HTTP session for all requests, so the connection to LM Studio is reused (keep-alive)
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Returns the shared requests.Session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None: _session = requests.Session()
+        return _session
+
+# --- Formatting Repair ---
+# Blocks that break the rules are re-sent in one request, each introduced by a marker line.
+REPAIR_MARKER = "<<<BLOCK {}>>>"
+REPAIR_MARKER_PATTERN = re.compile(r"^[ \t]*<<<BLOCK (\d+)>>>[ \t]*$", re.MULTILINE)
+REPAIR_INSTRUCTION = (
+    "Each block below breaks the formatting rules. Problems found:\n{problems}\n\n"
+    "Rewrite each block so that it follows the formatting rules exactly. Keep its wording, meaning and "
+    "line prefix ('# ', '## ', '### ', '* ') and change only the formatting. "
+    "Start each fixed block with its original marker line, on a line of its own. "
+    "Keep the blocks in the same order and output nothing else."
+)
+
+def _read_stream(response, start_time, prediction, eta_callback):
+    """
+    Reads a streamed (server-sent events) completion. The body is read to its end, also after
+    "[DONE]", so the connection goes back to the session's pool instead of being discarded.
+
+    Returns:
+        tuple: (content: str or None, first_token_seconds: float or None, chunk_count: int, usage: dict or None)
+    """
+    content_parts = []; first_token_seconds = None; chunk_count = 0; usage = None; last_eta_time = 0.0; done = False
+    for line in response.iter_lines():
+        if done or not line or not line.startswith(b"data:"): continue
+        data = line[5:].strip()
+        if data == b"[DONE]": done = True; continue
+        chunk = json.loads(data.decode('utf-8'))
+        if chunk.get('usage'): usage = chunk['usage']
+        choices = chunk.get('choices') or []
+        delta = (choices[0].get('delta') or {}).get('content') if choices else None
+        if not delta: continue
+        now = time.perf_counter()
+        if first_token_seconds is None: first_token_seconds = now - start_time
+        content_parts.append(delta); chunk_count += 1 # LM Studio sends about one token per chunk
+        if eta_callback and now - last_eta_time >= 0.5:
+            last_eta_time = now
+            generating_seconds = now - start_time - first_token_seconds
+            # Measured speed once there is enough of it, otherwise the historical one
+            rate = chunk_count / generating_seconds if generating_seconds > 1.0 else prediction["completion_tokens"] / max(prediction["generation_seconds"], 0.001)
+            eta_callback(now - start_time, max(prediction["completion_tokens"] - chunk_count, 0) / max(rate, 0.001))
+    return ("".join(content_parts) if content_parts else None), first_token_seconds, chunk_count, usage
+
+def _request_completion(messages, max_tokens, progress_callback=None, eta_callback=None, record=True, prompt_tokens=None):
+    """
+    Posts a chat completion request to LM Studio and records its timing (telemetry.py).
+
+    Args:
+        eta_callback (function, optional): Called with (elapsed_seconds, remaining_seconds),
+            first with the prediction from telemetry and then with live updates while streaming.
+        record (bool): Store the request's timing in the telemetry history.
+        prompt_tokens (int, optional): Token count of the messages, if already known.
+
+    Returns:
+        tuple: (success: bool, result: str) - the raw message content, or an error message.
+    """
+    try:
+        headers = {"Content-Type": "application/json"}
+        payload = {
+            "model": LM_STUDIO_MODEL_NAME,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.5, # Lowered temperature further to potentially improve rule following
+            "stream": AI_STREAM_RESPONSES
+        }
+        if AI_STREAM_RESPONSES: payload["stream_options"] = {"include_usage": True}
+
+        if prompt_tokens is None: prompt_tokens = estimate_tokens("\n".join(message["content"] for message in messages))
+        prediction = predict_request(prompt_tokens, max_tokens)
+        if eta_callback: eta_callback(0.0, prediction["total_seconds"])
+
+        if progress_callback:
+             progress_callback(f"Sending request to {LM_STUDIO_API_URL} with model '{LM_STUDIO_MODEL_NAME}' (~{prompt_tokens} prompt tokens, predicted {prediction['total_seconds']:.0f}s)...")
+
+        start_time = time.perf_counter()
+        with profiling.stage("http"):
+            response = get_session().post(
+                LM_STUDIO_API_URL,
+                headers=headers,
+                data=json.dumps(payload),
+                timeout=AI_REQUEST_TIMEOUT_SECONDS,
+                stream=AI_STREAM_RESPONSES
+            )
+            with response: # Released on every path, including errors while reading
+                response.raise_for_status()
+
+                if progress_callback:
+                     progress_callback("Receiving and parsing AI response...")
+
+                if AI_STREAM_RESPONSES:
+                    content, first_token_seconds, completion_tokens, usage = _read_stream(response, start_time, prediction, eta_callback)
+                else:
+                    result = response.json(); first_token_seconds = None; content = None
+                    usage = result.get('usage') if isinstance(result, dict) else None
+                    if result and 'choices' in result and result['choices'] and result['choices'][0].get('message') and result['choices'][0]['message'].get('content') is not None:
+                        content = result['choices'][0]['message']['content']
+                    completion_tokens = estimate_tokens(content)
+        total_seconds = time.perf_counter() - start_time
+
+        if content is None: return False, "AI processing failed: Unexpected response format or no content in response."
+        if usage: prompt_tokens = usage.get('prompt_tokens') or prompt_tokens; completion_tokens = usage.get('completion_tokens') or completion_tokens
+        if record: record_request(prompt_tokens, completion_tokens, first_token_seconds, total_seconds)
+        return True, content.strip()
+
+    except requests.exceptions.Timeout:
+         return False, f"Error connecting to LM Studio API: Request timed out after {AI_REQUEST_TIMEOUT_SECONDS} seconds."
+    except requests.exceptions.ConnectionError:
+         return False, f"Error connecting to LM Studio API: Connection refused. Is LM Studio running and serving the API at {LM_STUDIO_API_URL}?"
+    except requests.exceptions.RequestException as e:
+        return False, f"Error during LM Studio API request: {e}"
+    except (json.JSONDecodeError, UnicodeDecodeError):
+         return False, "Error parsing JSON response from AI."
+    except Exception as e:
+        return False, f"An unexpected error occurred during AI processing: {e}"
+
+def _post_process(ai_output_raw):
+    """Normalizes AI output for the PDF parser."""
+    # Replace markdown bold **text** with HTML bold <b>text</b>
+    # Using non-greedy match .*? to handle multiple instances per line correctly
+    processed_output = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', ai_output_raw)
+
+    # (Optional) Add replacements for other markdown if needed, e.g., *italic* -> <i>italic</i>
+    # Be cautious with single asterisks due to conflict with bullet points.
+    # processed_output = re.sub(r'(?<!\*)\*(?!\*)(.*?)(?<!\*)\*(?!\*)', r'<i>\1</i>', processed_output) # More complex regex for italics
+
+    # Consolidate multiple blank lines into one (for paragraph spacing)
+    return re.sub(r'\n(\s*\n)+', '\n\n', processed_output).strip()
+
+def repair_formatting(markup, progress_callback=None, stats=None):
+    """
+    Finds the blocks of post-processed AI output that break the formatting rules
+    (format_validator.find_violations) and re-requests only those, in one request.
+    A fix is spliced back in if it passes validation; otherwise the block is kept.
+
+    Args:
+        markup (str): Post-processed AI output.
+        progress_callback (function, optional): Called with status messages.
+        stats (dict, optional): Accumulates 'repair_requests', 'blocks_repaired' and 'blocks_unrepaired'.
+
+    Returns:
+        str: The markup with the repaired blocks spliced in.
+    """
+    violations = find_violations(markup)
+    if not violations: return markup
+    targets = violations[:AI_REPAIR_MAX_BLOCKS]
+    if progress_callback: progress_callback(f"{len(violations)} block(s) break the formatting rules. Requesting repair of {len(targets)}...")
+
+    lines = markup.split('\n')
+    blocks = ["\n".join(lines[start:end]) for start, end, _ in targets]
+    problems = "\n".join(f"Block {number}: {', '.join(issues)}" for number, (_, _, issues) in enumerate(targets, 1))
+    marked_blocks = "\n\n".join(f"{REPAIR_MARKER.format(number)}\n{block}" for number, block in enumerate(blocks, 1))
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": f"{REPAIR_INSTRUCTION.format(problems=problems)}\n\nBlocks:\n{marked_blocks}"}
+    ]
+    # Roughly the size of the blocks themselves, with room for a short block
+    max_tokens = min(AI_MAX_TOKENS, max(256, sum(len(block) for block in blocks) // 2))
+    success, output = _request_completion(messages, max_tokens)
+    sections = split_batched_output(output, len(targets), REPAIR_MARKER_PATTERN) if success else {}
+
+    repaired = 0
+    # Splice from the end so the line indices of earlier blocks stay valid
+    for number, (start, end, _) in reversed(list(enumerate(targets, 1))):
+        if number not in sections: continue
+        fixed_block = _post_process(sections[number])
+        if find_violations(fixed_block): continue
+        lines[start:end] = fixed_block.split('\n'); repaired += 1
+
+    if stats is not None:
+        stats["repair_requests"] = stats.get("repair_requests", 0) + 1
+        stats["blocks_repaired"] = stats.get("blocks_repaired", 0) + repaired
+        stats["blocks_unrepaired"] = stats.get("blocks_unrepaired", 0) + len(violations) - repaired
+    if progress_callback:
+        if success: progress_callback(f"Repaired {repaired} of {len(violations)} block(s) that broke the formatting rules.")
+        else: progress_callback(f"Formatting repair request failed, keeping the original blocks: {output}")
+    return "\n".join(lines)
+
+def _finish_output(ai_output_raw, progress_callback=None, stats=None):
+    """Post-processes an AI response and, if enabled, repairs blocks that still break the rules."""
+    with profiling.stage("postprocess"):
+        processed_output = _post_process(ai_output_raw)
+        if AI_REPAIR_ENABLED: processed_output = repair_formatting(processed_output, progress_callback, stats)
+    return processed_output
+
+def process_text_with_ai(text_to_process, prompt_instruction, progress_callback=None, stats=None, eta_callback=None, text_tokens=None,
+                         compact=INPUT_COMPACTION_ENABLED):
+    """
+    Sends text to LM Studio API for processing using the chat completions endpoint.
+    Includes post-processing to convert markdown bold (**text**) to HTML bold (<b>text</b>).
+
+    Args:
+        text_to_process (str or Document): The original text content to be processed.
+                                           A Document is serialized to markup here, when the request is built.
+        prompt_instruction (str): The instructions for the AI on how to process the text.
+        progress_callback (function, optional): A function to call with status messages.
+                                               Takes one string argument (the message). Defaults to None.
+        stats (dict, optional): Accumulates formatting repair and compaction counts (see describe_stats).
+        eta_callback (function, optional): Called with (elapsed_seconds, remaining_seconds) for the main request.
+        text_tokens (int, optional): Token count of text_to_process, if already known (fan-out counts
+                                     the source once for all prompts). Only the instructions are counted here.
+        compact (bool): Send the text through compaction.compact_markup first (shortened slide markers
+                        are expanded again in the response).
+
+    Returns:
+        tuple: (success: bool, result: str).
+               success is True if the AI returned a response, False otherwise.
+               result is the AI's processed output text if success is True,
+                      or an error message if success is False.
+    """
+    if progress_callback:
+         progress_callback("Preparing AI request payload...")
+
+    text_to_process = as_markup(text_to_process)
+    compaction = None
+    if compact:
+        compaction = compact_markup(text_to_process); record_compaction(stats, compaction)
+        if progress_callback: progress_callback(compaction.summary())
+        text_to_process = compaction.text; text_tokens = compaction.tokens_after
+        prompt_instruction += compaction.prompt_suffix()
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": f"{prompt_instruction}\n\nText to process:\n{text_to_process}"}
+    ]
+    prompt_tokens = text_tokens + estimate_tokens(f"{SYSTEM_MESSAGE}\n{prompt_instruction}\n\nText to process:") if text_tokens is not None else None
+    success, result = _request_completion(messages, AI_MAX_TOKENS, progress_callback, eta_callback, prompt_tokens=prompt_tokens)
+    if not success: return False, result
+    if compaction and compaction.markers_shortened: result = expand_markers(result)
+
+    # +++ START POST-PROCESSING +++
+    if progress_callback:
+        progress_callback("Post-processing AI response for formatting consistency...")
+    processed_output = _finish_output(result, progress_callback, stats)
+    # +++ END POST-PROCESSING +++
+
+    if progress_callback:
+        progress_callback("AI processing and post-processing complete.")
+
+    return True, processed_output # Return the processed output
+
+def warm_up_model(progress_callback=None):
+    """
+    Prepares LM Studio for the first real job: lists the served models (opening the
+    shared connection), checks that LM_STUDIO_MODEL_NAME is among them and sends a
+    one-token completion with the system prompt, which loads the model if needed.
+
+    Returns:
+        tuple: (success: bool, message: str) - message reports the latencies or the problem.
+    """
+    try:
+        start_time = time.perf_counter()
+        response = get_session().get(LM_STUDIO_MODELS_URL, timeout=AI_REQUEST_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        model_ids = [model.get('id') for model in response.json().get('data', [])]
+        endpoint_seconds = time.perf_counter() - start_time
+    except requests.exceptions.ConnectionError:
+        return False, f"Warm-up: LM Studio is not reachable at {LM_STUDIO_MODELS_URL}."
+    except Exception as e:
+        return False, f"Warm-up: could not list models at {LM_STUDIO_MODELS_URL}: {e}"
+
+    model_note = ""
+    if LM_STUDIO_MODEL_NAME not in model_ids:
+        # LM Studio may still load it on demand (JIT loading), so try the priming request anyway
+        model_note = f" Note: '{LM_STUDIO_MODEL_NAME}' is not listed by the server (available: {', '.join(filter(None, model_ids)) or 'none'})."
+    if progress_callback: progress_callback(f"Warm-up: endpoint answered in {endpoint_seconds * 1000:.0f} ms. Priming model...")
+
+    start_time = time.perf_counter()
+    messages = [
+        {"role": "system", "content": SYSTEM_MESSAGE},
+        {"role": "user", "content": "Reply with OK."}
+    ]
+    success, result = _request_completion(messages, 1, record=False) # Model loading would skew the history
+    priming_seconds = time.perf_counter() - start_time
+    if not success: return False, f"Warm-up: priming completion failed after {priming_seconds:.1f}s.{model_note} {result}"
+    return True, f"Warm-up: endpoint {endpoint_seconds * 1000:.0f} ms, priming completion {priming_seconds:.1f}s. Model '{LM_STUDIO_MODEL_NAME}' answered.{model_note}"
+
+def plan_batches(texts, max_documents=AI_BATCH_MAX_DOCUMENTS, max_chars=AI_BATCH_MAX_CHARS, small_document_chars=AI_BATCH_SMALL_DOCUMENT_CHARS):
+    """
+    Groups documents (markup strings) into shared requests, keeping their order.
+    Large documents, and documents that contain the marker text themselves, get a group of their own.
+
+    Returns:
+        list of lists of indices into texts.
+    """
+    batches = []; current = []; current_chars = 0
+    for index, text in enumerate(texts):
+        size = len(text)
+        if size > small_document_chars or "<<<DOCUMENT" in text:
+            if current: batches.append(current); current = []; current_chars = 0
+            batches.append([index]); continue
+        if current and (len(current) >= max_documents or current_chars + size > max_chars):
+            batches.append(current); current = []; current_chars = 0
+        current.append(index); current_chars += size
+    if current: batches.append(current)
+    return batches
+
+def split_batched_output(output, count, marker_pattern=BATCH_MARKER_PATTERN):
+    """
+    Splits a shared response at its marker lines (marker_pattern captures the 1-based position).
+
+    Returns:
+        dict: {position (1-based): text} for each marker that appears exactly once with non-empty text.
+              Missing, repeated, out-of-range or empty sections are left out.
+    """
+    matches = list(marker_pattern.finditer(output))
+    sections = {}; seen = set(); repeated = set()
+    for i, match in enumerate(matches):
+        position = int(match.group(1))
+        if position in seen: repeated.add(position); continue
+        seen.add(position)
+        section_end = matches[i + 1].start() if i + 1 < len(matches) else len(output)
+        section_text = output[match.end():section_end].strip()
+        if 1 <= position <= count and section_text: sections[position] = section_text
+    for position in repeated: sections.pop(position, None)
+    return sections
+
+def process_texts_batched(texts, prompt_instruction, progress_callback=None, stats=None, compact=INPUT_COMPACTION_ENABLED):
+    """
+    Processes several documents with the same prompt, packing small ones into shared requests.
+    Documents whose section cannot be recovered from a shared response (or whose shared request
+    failed) are re-sent individually with process_text_with_ai.
+
+    Args:
+        texts (list of str or Document): The documents, in order.
+        prompt_instruction (str): The instructions applied to every document.
+        progress_callback (function, optional): Called with status messages.
+        stats (dict, optional): Accumulates formatting repair and compaction counts (see describe_stats).
+        compact (bool): Compact every document first (see process_text_with_ai), so more fit in a shared request.
+
+    Returns:
+        list of tuples: (success: bool, result: str) per document, in input order.
+    """
+    texts = [as_markup(text) for text in texts]
+    results = [None] * len(texts)
+    batch_texts = texts; batch_prompt = prompt_instruction
+    if compact: # Documents sent on their own are compacted (and counted) by process_text_with_ai
+        compactions = [compact_markup(text) for text in texts]
+        batch_texts = [compaction.text for compaction in compactions]
+        if any(compaction.markers_shortened for compaction in compactions): batch_prompt += f"\n\n{MARKER_LEGEND}"
+    batches = plan_batches(batch_texts)
+    for batch_number, indices in enumerate(batches, 1):
+        if len(indices) == 1:
+            if progress_callback: progress_callback(f"Batch {batch_number}/{len(batches)}: 1 document.")
+            results[indices[0]] = process_text_with_ai(texts[indices[0]], prompt_instruction, stats=stats, compact=compact)
+            continue
+
+        if progress_callback: progress_callback(f"Batch {batch_number}/{len(batches)}: {len(indices)} documents in one request.")
+        combined_text = "\n\n".join(f"{BATCH_MARKER.format(position)}\n{batch_texts[index]}" for position, index in enumerate(indices, 1))
+        messages = [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": f"{batch_prompt}\n\n{BATCH_INSTRUCTION.format(count=len(indices))}\n\nText to process:\n{combined_text}"}
+        ]
+        success, output = _request_completion(messages, AI_BATCH_MAX_TOKENS)
+        sections = split_batched_output(output, len(indices)) if success else {}
+        fallback = []
+        for position, index in enumerate(indices, 1):
+            if position not in sections: fallback.append(index); continue
+            if compact:
+                record_compaction(stats, compactions[index])
+                if progress_callback: progress_callback(f"Document {index + 1}: {compactions[index].summary()}")
+            results[index] = (True, _finish_output(expand_markers(sections[position]) if compact else sections[position], progress_callback, stats))
+        if fallback:
+            reason = "request failed" if not success else "markers missing in response"
+            if progress_callback: progress_callback(f"Batch {batch_number}: {len(fallback)} of {len(indices)} documents re-sent individually ({reason}).")
+            for index in fallback: results[index] = process_text_with_ai(texts[index], prompt_instruction, stats=stats, compact=compact)
+    return results
+
+def describe_stats(stats):
+    """Summary lines for a stats dict filled by process_text_with_ai/process_texts_batched ([] if empty)."""
+    lines = []
+    if stats.get("repair_requests") is not None:
+        lines.append(f"Formatting repairs: {stats['blocks_repaired']} block(s) repaired in {stats['repair_requests']} request(s), {stats['blocks_unrepaired']} left as-is.")
+    if stats.get("documents_compacted"):
+        before = stats["tokens_before_compaction"]; saved = before - stats["tokens_after_compaction"]
+        lines.append(f"Input compaction: ~{saved:,} of ~{before:,} tokens saved ({100.0 * saved / before if before else 0.0:.0f}%) over {stats['documents_compacted']} document(s).")
+    return lines
+
+# ... (Example usage / standalone test block remains the same) ...
+if __name__ == '__main__':
+    print("Running AI processor standalone test...")
+    test_text = "The quick brown fox. It was **bold**. It was also *italic* (maybe). Item 1. **Item 2 is important**."
+    test_prompt = "Rewrite this. Make 'bold' bold, 'italic' italic. List the items using bullets."
+
+    success, result = process_text_with_ai(test_text, test_prompt, progress_callback=print)
+
+    if success:
+        print("\n--- AI Output (Post-Processed) ---")
+        print(result)
+        print("--------------------------------")
+    else:
+        print(f"\n--- AI Error ---")
+        print(result)
+        print("---------------")
         print("Make sure LM Studio is running with the specified model and API enabled.")
\ No newline at end of file
@@ -0,0 +1,104 @@
+# batch.py
+
+# Headless batch conversion: formats a set of files with one prompt and writes one PDF per file.
+# Examples:
+#   python batch.py memos/*.docx --output-dir out --prompt "Formal Report Summary"
+#   python batch.py report.docx --prompts "Formal Report Summary" "Blog Post Style"   (one PDF per prompt)
+
+import os
+import sys
+import time
+import argparse
+
+from config import PDF_PAGE_SIZE_OPTIONS, PDF_PAGE_SIZE_DEFAULT, PDF_FONT_SIZE_DEFAULT, DEFAULT_PROMPT, INPUT_COMPACTION_ENABLED
+from prompts import PREDEFINED_PROMPTS, PROMPT_NAMES
+import profiling
+
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pptx")
+
+def load_input(file_path):
+    """Returns the text (str) or Document for one input file. Raises on read errors."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".txt":
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f: return f.read()
+    from extractors import extract_file
+    document, _ = extract_file(file_path)
+    return document
+
+def _resolve_prompt(args):
+    if args.prompt_file:
+        with open(args.prompt_file, 'r', encoding='utf-8') as f: return f.read().strip()
+    if args.prompt:
+        if args.prompt not in PREDEFINED_PROMPTS: raise SystemExit(f"Unknown prompt '{args.prompt}'. Choose from: {', '.join(PROMPT_NAMES)}")
+        return PREDEFINED_PROMPTS[args.prompt]
+    return DEFAULT_PROMPT
+
+def _fan_out_inputs(args, paths, texts, failures):
+    """--prompts: renders every input with every prompt (concurrent requests, parallel PDF layout)."""
+    from fanout import fan_out, summary_message
+    for file_path, source in zip(paths, texts):
+        base_name = os.path.splitext(os.path.basename(file_path))[0]
+        print(f"Fan-out for {file_path}:")
+        results, summary = fan_out(source, args.prompts, args.output_dir, base_name, args.page_size, args.font_size, progress_callback=print, compact=args.compact)
+        for entry in results:
+            if not entry["success"]: print(f"{entry['prompt']} failed for {file_path}: {entry['message']}"); failures += 1
+        print(summary_message(results, summary))
+    return 1 if failures else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Format files with the LLM and write one PDF per file.")
+    parser.add_argument("inputs", nargs="+", help=f"Input files ({', '.join(SUPPORTED_EXTENSIONS)}).")
+    parser.add_argument("--output-dir", default="output", help="Directory for the generated PDFs.")
+    parser.add_argument("--prompt", help="Name of a predefined prompt (default: the app's default prompt).")
+    parser.add_argument("--prompt-file", help="Read the prompt instruction from a file instead.")
+    parser.add_argument("--prompts", nargs="+", metavar="NAME", help="Fan-out: render every input once per predefined prompt, concurrently.")
+    parser.add_argument("--no-batch", action="store_true", help="Send every document in its own request.")
+    parser.add_argument("--compact", action=argparse.BooleanOptionalAction, default=INPUT_COMPACTION_ENABLED, help="Compact the input before sending it (repeated boilerplate, whitespace, slide markers).")
+    parser.add_argument("--page-size", choices=PDF_PAGE_SIZE_OPTIONS, default=PDF_PAGE_SIZE_DEFAULT)
+    parser.add_argument("--font-size", type=int, default=PDF_FONT_SIZE_DEFAULT)
+    parser.add_argument("--profile", nargs="?", const="", metavar="DIR", help="Profile each load, AI and render step (dumps in DIR, default PROFILE_DIR).")
+    args = parser.parse_args(argv)
+    if args.profile is not None: profiling.enable(args.profile or None)
+    if args.prompts:
+        unknown = [name for name in args.prompts if name not in PREDEFINED_PROMPTS]
+        if unknown: raise SystemExit(f"Unknown prompt(s) {', '.join(repr(name) for name in unknown)}. Choose from: {', '.join(PROMPT_NAMES)}")
+    else: prompt_instruction = _resolve_prompt(args)
+
+    from ai_processor import process_text_with_ai, process_texts_batched, describe_stats
+    from pdf_generator import generate_pdf
+
+    # --- Load ---
+    paths = []; texts = []; failures = 0
+    for file_path in args.inputs:
+        if os.path.splitext(file_path)[1].lower() not in SUPPORTED_EXTENSIONS:
+            print(f"Skipping unsupported file: {file_path}"); continue
+        try:
+            with profiling.job(f"load-{os.path.basename(file_path)}"): texts.append(load_input(file_path))
+            paths.append(file_path)
+        except Exception as e: print(f"Error reading {file_path}: {e}"); failures += 1
+    if not paths: print("No input files to process."); return 1
+    if args.prompts: return _fan_out_inputs(args, paths, texts, failures)
+
+    # --- Format ---
+    start_time = time.perf_counter(); repair_stats = {}
+    with profiling.job("ai"):
+        if args.no_batch: results = [process_text_with_ai(text, prompt_instruction, progress_callback=print, stats=repair_stats, compact=args.compact) for text in texts]
+        else: results = process_texts_batched(texts, prompt_instruction, progress_callback=print, stats=repair_stats, compact=args.compact)
+    ai_seconds = time.perf_counter() - start_time
+
+    # --- Render ---
+    os.makedirs(args.output_dir, exist_ok=True)
+    for file_path, (success, result) in zip(paths, results):
+        if not success: print(f"AI failed for {file_path}: {result}"); failures += 1; continue
+        pdf_path = os.path.join(args.output_dir, os.path.splitext(os.path.basename(file_path))[0] + ".pdf")
+        with profiling.job(f"pdf-{os.path.basename(file_path)}"): pdf_success, message = generate_pdf(result, pdf_path, args.page_size, args.font_size)
+        print(message if pdf_success else f"PDF failed for {file_path}: {message}")
+        if not pdf_success: failures += 1
+
+    rate = len(paths) / ai_seconds * 60 if ai_seconds > 0 else 0.0
+    print(f"Processed {len(paths)} documents in {ai_seconds:.1f}s ({rate:.1f} documents/minute), {failures} failed.")
+    for line in describe_stats(repair_stats): print(line)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+# checkpoints.py
+
+# Durable checkpoints for segmented AI jobs (large-file mode), so a job interrupted by an LM Studio
+# crash, a timeout or a cancel resumes from the last completed segment instead of starting over:
+#   CHECKPOINT_DIR/<job key>/manifest.json       source, prompt, model, segment count, creation time
+#   CHECKPOINT_DIR/<job key>/segment_00003.txt   AI output of segment 3, stored byte-for-byte
+# The job key hashes everything that determines the outputs (model, completion limit, prompt,
+# compaction and the text of every segment), so running the same job again finds its checkpoints,
+# and any change starts a fresh job. Every file is written to a temporary name, flushed to disk
+# and renamed, so a crash never leaves a partial output behind. Restored outputs are identical
+# to the ones received, so a resumed job yields the same text as an uninterrupted one. Its PDF is
+# written in ReportLab's invariant mode (fixed creation date and ID), so the file is identical too.
+# A job's checkpoints are removed once its PDF is written or the save is declined; abandoned jobs
+# expire after CHECKPOINT_MAX_AGE_DAYS. Single-request jobs are not checkpointed, so running the
+# same text again always asks the model for a new answer.
+#
+#   python checkpoints.py            list unfinished jobs
+#   python checkpoints.py --clear    remove all checkpoints
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+
+from config import (CHECKPOINT_ENABLED, CHECKPOINT_DIR, CHECKPOINT_MAX_AGE_DAYS, LM_STUDIO_MODEL_NAME,
+                    AI_MAX_TOKENS, INPUT_COMPACTION_ENABLED)
+
+# Bump when the on-disk layout changes
+CHECKPOINT_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+def _segment_hash(segment):
+    return hashlib.blake2b(segment.encode('utf-8'), digest_size=20).hexdigest()
+
+def job_key(segments, prompt_instruction, compact=INPUT_COMPACTION_ENABLED, model=LM_STUDIO_MODEL_NAME):
+    """
+    Key of a job: changes whenever a segment, the prompt, the model or the request settings change.
+    segments is consumed one at a time, so a large file is never held in memory.
+
+    Returns:
+        tuple: (key: str, segment_count: int)
+    """
+    digest = hashlib.sha256(f"{CHECKPOINT_FORMAT_VERSION}|{model}|{AI_MAX_TOKENS}|{bool(compact)}|".encode('utf-8'))
+    digest.update(prompt_instruction.encode('utf-8'))
+    segment_count = 0
+    for segment in segments: digest.update(b"|" + _segment_hash(segment).encode('ascii')); segment_count += 1
+    return digest.hexdigest()[:32], segment_count
+
+def _write_atomic(path, text):
+    """Writes text to path via a temporary file, flushed to disk before the rename."""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8', newline='') as f: # newline='': outputs are restored exactly
+        f.write(text); f.flush(); os.fsync(f.fileno())
+    os.replace(temp_path, path) # Atomic: a checkpoint is either complete or absent
+
+class JobCheckpoint:
+    """The checkpoint directory of one job. Segment indices are 1-based, as in the progress messages."""
+
+    def __init__(self, directory, segment_count):
+        self.directory = directory
+        self.segment_count = segment_count
+
+    def _segment_path(self, index):
+        return os.path.join(self.directory, f"segment_{index:05d}.txt")
+
+    def load(self, index):
+        """Stored output of a segment, or None if it has not completed yet."""
+        try:
+            with open(self._segment_path(index), 'r', encoding='utf-8', newline='') as f: return f.read()
+        except FileNotFoundError: return None
+        except OSError as e:
+            print(f"WARNING (checkpoints): Could not read segment {index} of '{self.directory}': {e}")
+            return None
+
+    def save(self, index, output):
+        """Stores the output of a completed segment. Failures are reported, never raised."""
+        try: _write_atomic(self._segment_path(index), output)
+        except OSError as e: print(f"WARNING (checkpoints): Could not store segment {index} in '{self.directory}': {e}")
+
+    def is_complete(self, index):
+        return os.path.exists(self._segment_path(index))
+
+    def completed_count(self):
+        return sum(1 for index in range(1, self.segment_count + 1) if self.is_complete(index))
+
+    def discard(self):
+        """Removes the job's checkpoints (once its result is safely written)."""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+def open_job(segments, prompt_instruction, source_name="", compact=INPUT_COMPACTION_ENABLED, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Finds or creates the checkpoint directory for a job. segments is an iterable of the
+    segment texts (read once, to compute the job key).
+
+    Returns:
+        JobCheckpoint, or None when checkpoints are disabled or the directory cannot be used
+        (the job then simply runs without checkpoints).
+    """
+    if not CHECKPOINT_ENABLED: return None
+    try:
+        prune_expired(checkpoint_dir)
+        key, segment_count = job_key(segments, prompt_instruction, compact)
+        directory = os.path.join(checkpoint_dir, key)
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            manifest = {"format": CHECKPOINT_FORMAT_VERSION, "source": source_name, "prompt": prompt_instruction, "model": LM_STUDIO_MODEL_NAME,
+                        "compact": bool(compact), "segments": segment_count, "created": time.time()}
+            _write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1))
+        return JobCheckpoint(directory, segment_count)
+    except OSError as e:
+        print(f"WARNING (checkpoints): Checkpoints unavailable for '{source_name}': {e}")
+        return None
+
+def prune_expired(checkpoint_dir=CHECKPOINT_DIR, max_age_days=CHECKPOINT_MAX_AGE_DAYS):
+    """Removes job directories not written to for max_age_days. Returns the number removed."""
+    if not os.path.isdir(checkpoint_dir): return 0
+    cutoff = time.time() - max_age_days * 86400; removed = 0
+    for name in os.listdir(checkpoint_dir):
+        path = os.path.join(checkpoint_dir, name)
+        try:
+            if os.path.isdir(path) and os.stat(path).st_mtime < cutoff: shutil.rmtree(path); removed += 1
+        except OSError: pass
+    return removed
+
+def list_jobs(checkpoint_dir=CHECKPOINT_DIR):
+    """Manifests of the stored jobs, each with "directory" and "completed" added, oldest first."""
+    jobs = []
+    if not os.path.isdir(checkpoint_dir): return jobs
+    for name in os.listdir(checkpoint_dir):
+        directory = os.path.join(checkpoint_dir, name)
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f: manifest = json.load(f)
+        except (OSError, ValueError): continue
+        manifest["directory"] = directory
+        manifest["completed"] = JobCheckpoint(directory, manifest.get("segments", 0)).completed_count()
+        jobs.append(manifest)
+    return sorted(jobs, key=lambda job: job.get("created", 0))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="List or clear the checkpoints of unfinished AI jobs.")
+    parser.add_argument("--clear", action="store_true", help="Remove all checkpoints.")
+    args = parser.parse_args()
+    if args.clear:
+        shutil.rmtree(CHECKPOINT_DIR, ignore_errors=True); print(f"Removed '{CHECKPOINT_DIR}'.")
+        sys.exit(0)
+    jobs = list_jobs()
+    if not jobs: print(f"No checkpoints in '{CHECKPOINT_DIR}'.")
+    for job in jobs:
+        created = time.strftime('%Y-%m-%d %H:%M', time.localtime(job.get("created", 0)))
+        prompt = " ".join(job.get("prompt", "").split())[:50]
+        print(f"{created}  {job['completed']}/{job.get('segments', '?')} segments  {job.get('source') or '(text)'}  [{job.get('model')}] \"{prompt}\"")
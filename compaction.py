@@ -0,0 +1,136 @@
+# compaction.py
+
+# Token-saving compaction of markup before it is sent to the LLM:
+#   - whitespace: runs of spaces/tabs become one space, lines are trimmed, blank runs collapse
+#   - boilerplate: short non-heading lines repeated COMPACTION_BOILERPLATE_MIN_REPEATS+ times (slide
+#     footers, running headers of DOCX exports) are kept once, and a line repeating the previous one is dropped
+#   - markers: "## Slide 3: Title" becomes "## S3: Title" and "### Speaker Notes (Slide 3):"
+#     becomes "### N3:", with a one-line legend added to the prompt. expand_markers() turns them
+#     back in the response. Markers are only shortened when that saves more than the legend costs.
+# Every dropped or rewritten line is recorded, so Compaction.restore_source() rebuilds the
+# original markup exactly. The pass is linear in the input size.
+#
+# Report for files (no LM Studio needed):
+#   python compaction.py deck.pptx notes.docx report.txt
+
+import re
+import sys
+import functools
+from collections import Counter
+
+from config import COMPACTION_BOILERPLATE_MIN_REPEATS, COMPACTION_BOILERPLATE_MAX_CHARS
+from tokens import estimate_tokens
+
+SLIDE_MARKER_PATTERN = re.compile(r"^(#{1,3}) Slide (\d+): ")
+NOTES_MARKER_PATTERN = re.compile(r"^(#{1,3}) Speaker Notes \(Slide (\d+)\):")
+SHORT_SLIDE_MARKER_PATTERN = re.compile(r"^(#{1,3}) S(\d+): ", re.MULTILINE)
+SHORT_NOTES_MARKER_PATTERN = re.compile(r"^(#{1,3}) N(\d+):", re.MULTILINE)
+WHITESPACE_RUN_PATTERN = re.compile(r"[ \t\u00a0]+") # Includes non-breaking spaces
+
+MARKER_LEGEND = ("Shortened headings: 'S<n>:' starts slide <n> and 'N<n>:' starts the speaker notes of slide <n>. "
+                 "Keep these headings exactly as written.")
+
+def _shorten_markers(line):
+    line = SLIDE_MARKER_PATTERN.sub(r"\1 S\2: ", line, count=1)
+    return NOTES_MARKER_PATTERN.sub(r"\1 N\2:", line, count=1)
+
+def expand_markers(text):
+    """Turns shortened slide/notes headings (in compacted input or LLM output) back into the full form."""
+    text = SHORT_SLIDE_MARKER_PATTERN.sub(r"\1 Slide \2: ", text)
+    return SHORT_NOTES_MARKER_PATTERN.sub(r"\1 Speaker Notes (Slide \2):", text)
+
+class Compaction:
+    """The compacted text of one document, its token counts and what is needed to restore the original."""
+    __slots__ = ("text", "markers_shortened", "tokens_before", "tokens_after", "lines_removed",
+                 "_line_count", "_kept_indices", "_original_lines")
+
+    def __init__(self, text, markers_shortened, tokens_before, tokens_after, lines_removed, line_count, kept_indices, original_lines):
+        self.text = text
+        self.markers_shortened = markers_shortened # True if the prompt needs MARKER_LEGEND and the output expand_markers()
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after # Includes the legend when markers were shortened
+        self.lines_removed = lines_removed
+        self._line_count = line_count
+        self._kept_indices = kept_indices # Original line index of every compacted line
+        self._original_lines = original_lines # {original index: line} for dropped lines and lines that changed
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+    def prompt_suffix(self):
+        """Text to append to the prompt instruction ("" when no markers were shortened)."""
+        return f"\n\n{MARKER_LEGEND}" if self.markers_shortened else ""
+
+    def summary(self):
+        percent = 100.0 * self.tokens_saved / self.tokens_before if self.tokens_before else 0.0
+        return (f"Compaction: ~{self.tokens_before:,} -> ~{self.tokens_after:,} tokens ({self.tokens_saved:,} saved, {percent:.0f}%), "
+                f"{self.lines_removed:,} line(s) removed{', slide markers shortened' if self.markers_shortened else ''}.")
+
+    def restore_source(self):
+        """The original markup, exactly as passed to compact_markup()."""
+        compacted_lines = self.text.split("\n") if self._kept_indices else []
+        lines = [None] * self._line_count
+        for index, line in zip(self._kept_indices, compacted_lines): lines[index] = expand_markers(line) if self.markers_shortened else line
+        for index, line in self._original_lines.items(): lines[index] = line
+        return "\n".join(lines)
+
+@functools.lru_cache(maxsize=4) # Fan-out sends the same source with several prompts
+def compact_markup(markup):
+    """Compacts one document's markup. Returns a Compaction."""
+    original_lines = markup.split("\n")
+    normalized = [WHITESPACE_RUN_PATTERN.sub(" ", line).strip() for line in original_lines]
+    counts = Counter(line for line in normalized if line and len(line) <= COMPACTION_BOILERPLATE_MAX_CHARS and not line.startswith("#")) # Headings are structure
+    boilerplate = {line for line, count in counts.items() if count >= COMPACTION_BOILERPLATE_MIN_REPEATS}
+
+    kept_indices = []; kept_lines = []; seen_boilerplate = set(); previous_text_line = None
+    for index, line in enumerate(normalized):
+        if not line:
+            if kept_lines and kept_lines[-1]: kept_indices.append(index); kept_lines.append("")
+            continue
+        if line == previous_text_line: continue
+        if line in boilerplate:
+            if line in seen_boilerplate: continue
+            seen_boilerplate.add(line)
+        kept_indices.append(index); kept_lines.append(line); previous_text_line = line
+    while kept_lines and not kept_lines[-1]: kept_lines.pop(); kept_indices.pop()
+
+    tokens_before = estimate_tokens(markup)
+    text = "\n".join(kept_lines); tokens_after = estimate_tokens(text)
+    shortened_lines = [_shorten_markers(line) if line.startswith("#") else line for line in kept_lines]
+    markers_shortened = False
+    if shortened_lines != kept_lines:
+        shortened_text = "\n".join(shortened_lines)
+        shortened_tokens = estimate_tokens(shortened_text) + estimate_tokens(MARKER_LEGEND)
+        if shortened_tokens < tokens_after: text = shortened_text; tokens_after = shortened_tokens; markers_shortened = True; kept_lines = shortened_lines
+
+    # Everything restore_source() cannot derive from the compacted text
+    kept = set(kept_indices)
+    original_lines_changed = {index: line for index, line in enumerate(original_lines) if index not in kept}
+    for index, line in zip(kept_indices, kept_lines):
+        restored = expand_markers(line) if markers_shortened else line
+        if restored != original_lines[index]: original_lines_changed[index] = original_lines[index]
+    return Compaction(text, markers_shortened, tokens_before, tokens_after, len(original_lines) - len(kept_indices),
+                      len(original_lines), kept_indices, original_lines_changed)
+
+def record_compaction(stats, compaction):
+    """Adds one document's compaction to a stats dict (see ai_processor.describe_stats)."""
+    if stats is None: return
+    stats["documents_compacted"] = stats.get("documents_compacted", 0) + 1
+    stats["tokens_before_compaction"] = stats.get("tokens_before_compaction", 0) + compaction.tokens_before
+    stats["tokens_after_compaction"] = stats.get("tokens_after_compaction", 0) + compaction.tokens_after
+
+if __name__ == '__main__':
+    from document_model import as_markup
+    exit_code = 0
+    for file_path in sys.argv[1:]:
+        if file_path.lower().endswith(".txt"):
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f: markup = f.read()
+        else:
+            from extractors import extract_file
+            markup = as_markup(extract_file(file_path)[0])
+        compaction = compact_markup(markup)
+        reversible = compaction.restore_source() == markup
+        if not reversible: exit_code = 1
+        print(f"{file_path}: {compaction.summary()} Restores exactly: {'yes' if reversible else 'NO'}.")
+    sys.exit(exit_code)
@@ -1,75 +1,195 @@
-# config.py
-
-import os
-from prompts import PROMPT_NAMES, DEFAULT_PROMPT_TEXT
-
-# --- Configuration for LM Studio API ---
-LM_STUDIO_API_URL = "http://localhost:1234/v1/chat/completions"
-LM_STUDIO_MODEL_NAME = "qwen2.5-7b-instruct-1m" # Verify with your LM Studio setup
-AI_REQUEST_TIMEOUT_SECONDS = 180
-
-# --- LLM Context Window (Estimate) ---
-# You need to find the actual context window size for the specific Qwen 2.5 7B model you are using.
-# Common sizes are 4096, 8192, 32768, or even larger.
-# Check the model's page on Hugging Face or documentation.
-LLM_CONTEXT_WINDOW = 8192 # <-- UPDATE THIS VALUE based on your model
-
-# --- File Paths ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKGROUND_IMAGE_PATH = os.path.join(BASE_DIR, "background.png")
-
-# --- Styling Colors ---
-COLOR_BACKGROUND_DARK = "#1a1a1a"
-COLOR_TEXT_NEON_GREEN = "#00ff00"
-COLOR_HIGHLIGHT_CYAN = "#00ffff"
-COLOR_BUTTON_GREEN_DARK = "#008800"
-COLOR_BUTTON_GREEN_HOVER = "#00aa00"
-COLOR_BUTTON_GREEN_PRESSED = "#006600"
-COLOR_DISABLED_BG = "#333333"
-COLOR_DISABLED_TEXT = "#999999"
-COLOR_DISABLED_BORDER = "#555555"
-COLOR_ERROR_RED = "#ff0000"
-COLOR_WARNING_YELLOW = "#ffff00"
-COLOR_INPUT_BACKGROUND = "#0a0a0a"
-COLOR_STATUS_DEFAULT = COLOR_HIGHLIGHT_CYAN
-COLOR_LOG_BACKGROUND = "#050505"
-
-# --- Token Count Colors ---
-COLOR_TOKEN_NORMAL = COLOR_TEXT_NEON_GREEN # Green when well within limit
-COLOR_TOKEN_WARNING = COLOR_WARNING_YELLOW # Yellow when approaching limit
-COLOR_TOKEN_EXCEEDED = COLOR_ERROR_RED # Red when exceeding limit
-TOKEN_WARNING_THRESHOLD_PERCENT = 80 # Show warning color when exceeding this percentage of context window
-
-# --- Default Prompt ---
-DEFAULT_PROMPT = DEFAULT_PROMPT_TEXT
-
-# --- PDF Generation Defaults (ReportLab) ---
-PDF_PAGE_SIZE_OPTIONS = ["Letter", "A4"]
-PDF_PAGE_SIZE_DEFAULT = "Letter"
-
-PDF_FONT_SIZE_OPTIONS = [10, 11, 12, 14, 16]
-PDF_FONT_SIZE_DEFAULT = 12
-
-PDF_FONT_NAME_DEFAULT = "Helvetica"
-
-PDF_PARAGRAPH_SPACE_INCHES = 0.1
-PDF_HEADING_SPACE_AFTER_INCHES = 0.15
-PDF_BULLET_INDENT_POINTS = 20
-
-# --- UI Dimensions and Spacing ---
-WINDOW_WIDTH = 750
-WINDOW_HEIGHT = 650
-LAYOUT_MARGIN = 20
-LAYOUT_SPACING = 15
-PROMPT_INPUT_MIN_HEIGHT = 80
-ORIGINAL_TEXT_INPUT_MIN_HEIGHT = 200
-BUTTON_MIN_HEIGHT = 35
-PROCESS_BUTTON_MIN_WIDTH = 250
-LOAD_FILE_BUTTON_MIN_WIDTH = 140
-SETTINGS_FRAME_HEIGHT = 60
-LOG_AREA_MIN_HEIGHT = 100
-
-# --- Separator Style ---
-SEPARATOR_COLOR = COLOR_HIGHLIGHT_CYAN
-SEPARATOR_HEIGHT_PX = 1
+# config.py
+
+import os
+from prompts import PROMPT_NAMES, DEFAULT_PROMPT_TEXT
+
+# --- Configuration for LM Studio API ---
+LM_STUDIO_API_URL = "http://localhost:1234/v1/chat/completions"
+LM_STUDIO_MODEL_NAME = "qwen2.5-7b-instruct-1m" # Verify with your LM Studio setup
+AI_REQUEST_TIMEOUT_SECONDS = 180
+AI_MAX_TOKENS = 2000 # Completion limit for one document
+AI_STREAM_RESPONSES = True # Stream completions: measures time to first token and drives the live ETA
+
+# --- Throughput Telemetry ---
+# Per-model request timings (prompt/generation speed, time to first token), used for ETA
+# prediction and capacity planning (python telemetry.py).
+TELEMETRY_FILE = os.path.join(os.path.expanduser("~"), ".formatai_pdf", "telemetry.json")
+TELEMETRY_MAX_SAMPLES = 500 # Most recent requests kept per model
+
+# Blocks of AI output that break the formatting rules are sent back for repair (only those blocks)
+AI_REPAIR_ENABLED = True
+AI_REPAIR_MAX_BLOCKS = 20 # Most blocks repaired per AI response (one repair request)
+LM_STUDIO_MODELS_URL = LM_STUDIO_API_URL.replace("/chat/completions", "/models")
+
+# --- Model Warm-Up ---
+# LM Studio loads models lazily, so the first real request can be very slow. A background
+# warm-up checks the endpoint, confirms the model is available and sends a tiny completion.
+AI_WARM_UP_ON_START = True # Warm up when the main window is created
+AI_WARM_UP_ON_FILE_LOAD = True # Warm up again when a file is loaded...
+AI_WARM_UP_INTERVAL_SECONDS = 300 # ...unless the last successful warm-up is more recent than this
+
+# --- Micro-Batching (batch runs) ---
+# Small documents that share a prompt are packed into one request, separated by marker lines,
+# so they share the system prompt prefill and the HTTP round trip.
+AI_BATCH_MAX_DOCUMENTS = 8 # Documents per shared request
+AI_BATCH_MAX_CHARS = 6000 # Combined input size of one shared request
+AI_BATCH_SMALL_DOCUMENT_CHARS = 2500 # Larger documents are always sent on their own
+AI_BATCH_MAX_TOKENS = 6000 # Completion limit for one shared request
+
+# --- Multi-Prompt Fan-Out (fanout.py) ---
+# One source rendered with several prompts: the requests run concurrently and each PDF is laid out
+# in its own process. Set LM Studio's parallel request slots to at least FANOUT_MAX_CONCURRENT_REQUESTS,
+# otherwise the server queues the requests and the total time is the sum instead of the slowest one.
+FANOUT_MAX_CONCURRENT_REQUESTS = 4
+FANOUT_RENDER_PROCESSES = None # None = one process per CPU core (never more than the number of prompts)
+
+# --- Input Compaction (compaction.py) ---
+# Optional pass before a document is sent to the LLM: repeated boilerplate lines (slide footers,
+# running headers) are kept once, whitespace is normalized and the slide/speaker-notes headings
+# are shortened (and expanded again in the response).
+INPUT_COMPACTION_ENABLED = False # Default of the "Compact Input" checkbox, batch.py --compact and service jobs
+COMPACTION_BOILERPLATE_MIN_REPEATS = 3 # A line repeated this often is boilerplate...
+COMPACTION_BOILERPLATE_MAX_CHARS = 120 # ...if it is no longer than this
+
+# --- Checkpoints (checkpoints.py) ---
+# In large-file mode, the AI output of every completed segment is saved to a job directory, so a job
+# interrupted by a crash, a timeout or a cancel resumes from the last completed segment when it is run again.
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DIR = os.path.join(os.path.expanduser("~"), ".formatai_pdf", "checkpoints")
+CHECKPOINT_MAX_AGE_DAYS = 7 # Unfinished jobs not touched for this long are removed
+
+# --- LLM Context Window (Estimate) ---
+# You need to find the actual context window size for the specific Qwen 2.5 7B model you are using.
+# Common sizes are 4096, 8192, 32768, or even larger.
+# Check the model's page on Hugging Face or documentation.
+LLM_CONTEXT_WINDOW = 8192 # <-- UPDATE THIS VALUE based on your model
+
+# --- File Paths ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_IMAGE_PATH = os.path.join(BASE_DIR, "background.png")
+
+# --- Styling Colors ---
+COLOR_BACKGROUND_DARK = "#1a1a1a"
+COLOR_TEXT_NEON_GREEN = "#00ff00"
+COLOR_HIGHLIGHT_CYAN = "#00ffff"
+COLOR_BUTTON_GREEN_DARK = "#008800"
+COLOR_BUTTON_GREEN_HOVER = "#00aa00"
+COLOR_BUTTON_GREEN_PRESSED = "#006600"
+COLOR_DISABLED_BG = "#333333"
+COLOR_DISABLED_TEXT = "#999999"
+COLOR_DISABLED_BORDER = "#555555"
+COLOR_ERROR_RED = "#ff0000"
+COLOR_WARNING_YELLOW = "#ffff00"
+COLOR_INPUT_BACKGROUND = "#0a0a0a"
+COLOR_STATUS_DEFAULT = COLOR_HIGHLIGHT_CYAN
+COLOR_LOG_BACKGROUND = "#050505"
+
+# --- Token Count Colors ---
+COLOR_TOKEN_NORMAL = COLOR_TEXT_NEON_GREEN # Green when well within limit
+COLOR_TOKEN_WARNING = COLOR_WARNING_YELLOW # Yellow when approaching limit
+COLOR_TOKEN_EXCEEDED = COLOR_ERROR_RED # Red when exceeding limit
+TOKEN_WARNING_THRESHOLD_PERCENT = 80 # Show warning color when exceeding this percentage of context window
+TOKENIZER_MODEL_NAME = "gpt2" # Hugging Face tokenizer used to estimate token counts
+
+# --- Large-File Mode (plain-text input) ---
+# .txt files at least this big are memory-mapped and shown as a read-only, paged preview
+# instead of being loaded into the editor. Their text is streamed to the AI in segments.
+LARGE_FILE_THRESHOLD_BYTES = 10 * 1024 * 1024
+LARGE_FILE_PREVIEW_PAGE_BYTES = 64 * 1024 # Size of one preview page
+LARGE_FILE_SEGMENT_BYTES = 12000 # Max size of one AI request segment (~3000 tokens)
+LARGE_FILE_STATS_CHUNK_BYTES = 1024 * 1024 # Chunk size for the background statistics scan
+
+# --- Extraction Engine ---
+# "xml" streams the DOCX/PPTX XML parts straight out of the zip (fast, constant memory, no extra
+# dependencies). "library" uses python-docx/python-pptx. Both produce the same Documents.
+EXTRACTION_ENGINE = "xml"
+
+# --- Extraction Cache ---
+# Extracted DOCX/PPTX documents are stored on disk, keyed by path, size, mtime and content
+# hash, so reopening an unchanged file skips parsing. Least recently used entries are evicted.
+EXTRACTION_CACHE_ENABLED = True
+EXTRACTION_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".formatai_pdf", "extraction_cache")
+EXTRACTION_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# --- Local HTTP Service (service.py) ---
+# A headless, long-running conversion service that keeps the tokenizer, HTTP session,
+# PDF styles and extraction cache warm for every client. Binds to localhost by default.
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_WORKER_THREADS = 2 # Jobs processed concurrently
+SERVICE_MAX_REQUEST_BYTES = 100 * 1024 * 1024 # Largest accepted POST body
+SERVICE_MAX_FINISHED_JOBS = 200 # Finished jobs (and their PDFs) kept for download; oldest are dropped
+SERVICE_WORK_DIR = os.path.join(os.path.expanduser("~"), ".formatai_pdf", "service")
+
+# --- Processing Mode ---
+# "AI Format" always sends the text to the LLM. "Direct Render" skips the LLM and renders the
+# extracted/pasted markup as-is. "Auto" renders directly when the text already scores as
+# well-structured (see format_validator.score_structure), and uses the LLM otherwise.
+PROCESSING_MODE_AI = "AI Format"
+PROCESSING_MODE_AUTO = "Auto"
+PROCESSING_MODE_DIRECT = "Direct Render"
+PROCESSING_MODE_OPTIONS = [PROCESSING_MODE_AI, PROCESSING_MODE_AUTO, PROCESSING_MODE_DIRECT]
+PROCESSING_MODE_DEFAULT = PROCESSING_MODE_AI
+DIRECT_RENDER_SCORE_THRESHOLD = 0.75 # Minimum structure score for "Auto" to skip the LLM
+DIRECT_RENDER_MAX_PARAGRAPH_CHARS = 3000 # Paragraphs longer than this count against the structure score
+
+# --- Default Prompt ---
+DEFAULT_PROMPT = DEFAULT_PROMPT_TEXT
+
+# --- PDF Generation Defaults (ReportLab) ---
+PDF_PAGE_SIZE_OPTIONS = ["Letter", "A4"]
+PDF_PAGE_SIZE_DEFAULT = "Letter"
+
+PDF_FONT_SIZE_OPTIONS = [10, 11, 12, 14, 16]
+PDF_FONT_SIZE_DEFAULT = 12
+
+PDF_FONT_NAME_DEFAULT = "Helvetica"
+
+PDF_PARAGRAPH_SPACE_INCHES = 0.1
+PDF_HEADING_SPACE_AFTER_INCHES = 0.15
+PDF_BULLET_INDENT_POINTS = 20
+PDF_MAX_PARAGRAPH_CHARS = 4000 # Longer paragraphs/list items are split at sentence boundaries into chained Paragraphs before layout
+
+PDF_PAGE_NUMBERS_DEFAULT = False # Draw a centred page number at the bottom of each page
+PDF_OUTLINE_DEFAULT = False # Add H1/H2 headings to the PDF outline (bookmarks)
+PDF_REPRODUCIBLE = False # Fixed creation date and document ID for every PDF (PDFs of resumable large-file jobs always get them)
+
+# --- Preview ---
+PDF_PREVIEW_MAX_PAGES = 1 # Pages laid out for the fast preview
+PDF_PREVIEW_ON_GENERATE = True # Show a first-page preview on the status page while the full PDF builds
+PDF_PREVIEW_IMAGE_WIDTH = 320 # Width (px) of the preview image on the status page
+
+# --- Parallel PDF Rendering (requires pypdf) ---
+PDF_PARALLEL_RENDER_DEFAULT = False # Initial state of the "Parallel Render" checkbox
+PDF_PARALLEL_MAX_WORKERS = None # None = one process per CPU core
+PDF_PARALLEL_MIN_CHUNK_CHARS = 20000 # H1/H2 sections are grouped into chunks of at least this size; each chunk starts a new page
+
+# --- Startup ---
+# Time-to-first-window budget checked by `python main.py --startup-check`.
+# Heavy libraries (transformers, requests, reportlab, python-docx/pptx) are imported on first use.
+STARTUP_BUDGET_SECONDS = 1.5
+
+# --- Profiling (main.py/batch.py/service.py --profile) ---
+# Per job: a cProfile dump per pipeline stage, a collapsed-stack file for flame graphs and a report
+PROFILING_ENABLED = False
+PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".formatai_pdf", "profiles")
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005 # Stack sampling period for the collapsed-stack file
+PROFILE_TOP_FUNCTIONS = 25 # Functions listed per stage in report.txt
+
+# --- UI Dimensions and Spacing ---
+WINDOW_WIDTH = 750
+WINDOW_HEIGHT = 650
+LAYOUT_MARGIN = 20
+LAYOUT_SPACING = 15
+PROMPT_INPUT_MIN_HEIGHT = 80
+ORIGINAL_TEXT_INPUT_MIN_HEIGHT = 200
+BUTTON_MIN_HEIGHT = 35
+PROCESS_BUTTON_MIN_WIDTH = 250
+LOAD_FILE_BUTTON_MIN_WIDTH = 140
+SETTINGS_FRAME_HEIGHT = 60
+LOG_AREA_MIN_HEIGHT = 100
+
+# --- Separator Style ---
+SEPARATOR_COLOR = COLOR_HIGHLIGHT_CYAN
+SEPARATOR_HEIGHT_PX = 1
 SEPARATOR_MARGIN_V = 8
\ No newline at end of file
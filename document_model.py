@@ -0,0 +1,142 @@
+# document_model.py
+
+# Compact in-memory representation of a formatted document.
+# Extractors build it directly, pdf_generator renders it without re-parsing text,
+# and it is serialized to the LLM markup ('# ', '* ', <b>/<i>/<u>) only when needed.
+
+# Block kinds
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+BULLET = "bullet"
+BLANK = "blank"
+
+HEADING_PREFIXES = {1: "# ", 2: "## ", 3: "### "}
+
+class Run:
+    """
+    A piece of inline text with emphasis flags.
+    `text` must already be safe to use as ReportLab/LLM markup (escaped by the extractor).
+    """
+    __slots__ = ("text", "bold", "italic", "underline")
+
+    def __init__(self, text, bold=False, italic=False, underline=False):
+        self.text = text
+        self.bold = bold
+        self.italic = italic
+        self.underline = underline
+
+    def to_markup(self):
+        if not (self.bold or self.italic or self.underline): return self.text
+        prefix = ""; suffix = ""
+        if self.bold: prefix += "<b>"; suffix = "</b>" + suffix
+        if self.italic: prefix += "<i>"; suffix = "</i>" + suffix
+        if self.underline: prefix += "<u>"; suffix = "</u>" + suffix
+        return prefix + self.text + suffix
+
+    def __repr__(self):
+        return f"Run({self.text!r}, bold={self.bold}, italic={self.italic}, underline={self.underline})"
+
+class Block:
+    """One line of the document: a heading (level 1-3), a paragraph line, a bullet item or a blank line."""
+    __slots__ = ("kind", "level", "runs")
+
+    def __init__(self, kind, runs=None, level=0):
+        self.kind = kind
+        self.level = level
+        self.runs = runs if runs is not None else []
+
+    def inline_markup(self):
+        """The block's text with inline tags, without the line prefix."""
+        if len(self.runs) == 1: return self.runs[0].to_markup().strip()
+        return "".join(run.to_markup() for run in self.runs).strip()
+
+    def char_count(self):
+        return sum(len(run.text) for run in self.runs)
+
+    def to_markup(self):
+        if self.kind == HEADING: return HEADING_PREFIXES[self.level] + self.inline_markup()
+        if self.kind == BULLET: return "* " + self.inline_markup()
+        if self.kind == BLANK: return ""
+        return self.inline_markup()
+
+    def __repr__(self):
+        return f"Block({self.kind!r}, level={self.level}, runs={self.runs!r})"
+
+def _as_runs(content):
+    """Accepts a markup string or a list of Runs."""
+    return [Run(content)] if isinstance(content, str) else list(content)
+
+class Document:
+    """An ordered list of Blocks. The markup serialization is computed once and cached."""
+    __slots__ = ("blocks", "_markup")
+
+    def __init__(self, blocks=None):
+        self.blocks = blocks if blocks is not None else []
+        self._markup = None
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def _append(self, block):
+        self.blocks.append(block); self._markup = None
+
+    def add_heading(self, level, content):
+        self._append(Block(HEADING, _as_runs(content), level))
+
+    def add_paragraph(self, content):
+        self._append(Block(PARAGRAPH, _as_runs(content)))
+
+    def add_bullet(self, content):
+        self._append(Block(BULLET, _as_runs(content)))
+
+    def add_blank(self):
+        """Adds a paragraph break. Leading and repeated breaks are dropped."""
+        if self.blocks and self.blocks[-1].kind != BLANK: self._append(Block(BLANK))
+
+    def char_count(self):
+        return sum(block.char_count() for block in self.blocks)
+
+    def to_markup(self):
+        """Serializes to the markup format understood by the LLM prompts and the PDF parser."""
+        if self._markup is None:
+            lines = [block.to_markup() for block in self.blocks]
+            while lines and self.blocks[len(lines) - 1].kind == BLANK: lines.pop()
+            self._markup = "\n".join(lines).strip()
+        return self._markup
+
+def document_to_data(document):
+    """Compact JSON-serializable form: [kind, level, [[text, bold, italic, underline], ...]] per block."""
+    return [[block.kind, block.level, [[run.text, run.bold, run.italic, run.underline] for run in block.runs]] for block in document.blocks]
+
+def document_from_data(data):
+    """Inverse of document_to_data."""
+    return Document([Block(kind, [Run(text, bold, italic, underline) for text, bold, italic, underline in runs], level) for kind, level, runs in data])
+
+def parse_markup(text):
+    """
+    Parses markup text (e.g. LLM output) into a Document, one Block per line.
+    Recognizes '# ', '## ', '### ' headings and '* ' / '- ' bullet items;
+    numbered lines ("1. Item") stay paragraphs. Inline tags are kept as-is.
+    """
+    document = Document()
+    blocks = document.blocks
+    for line in text.strip().split('\n'):
+        cleaned_line = line.strip()
+        if cleaned_line.startswith('# '): blocks.append(Block(HEADING, [Run(cleaned_line[2:].strip())], 1))
+        elif cleaned_line.startswith('## '): blocks.append(Block(HEADING, [Run(cleaned_line[3:].strip())], 2))
+        elif cleaned_line.startswith('### '): blocks.append(Block(HEADING, [Run(cleaned_line[4:].strip())], 3))
+        elif cleaned_line.startswith(('* ', '- ')): blocks.append(Block(BULLET, [Run(cleaned_line[2:].strip())]))
+        elif cleaned_line == "": blocks.append(Block(BLANK))
+        else: blocks.append(Block(PARAGRAPH, [Run(cleaned_line)]))
+    document._markup = text.strip() # The source text already is the serialization
+    return document
+
+def as_document(text_or_document):
+    """Returns a Document for either a Document or a markup string."""
+    if isinstance(text_or_document, Document): return text_or_document
+    return parse_markup(text_or_document)
+
+def as_markup(text_or_document):
+    """Returns the markup string for either a Document or a markup string."""
+    if isinstance(text_or_document, Document): return text_or_document.to_markup()
+    return text_or_document
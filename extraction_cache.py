@@ -0,0 +1,87 @@
+# extraction_cache.py
+
+import os
+import json
+import time
+import hashlib
+
+from document_model import document_to_data, document_from_data
+from config import EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_MAX_BYTES
+
+# Bump when the on-disk entry layout changes (independent of the extractor version)
+CACHE_FORMAT_VERSION = 1
+HASH_CHUNK_BYTES = 1024 * 1024
+
+def _content_hash(file_path):
+    """blake2b of the file contents, read in chunks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""): digest.update(chunk)
+    return digest.hexdigest()
+
+def _entry_path(file_path, extractor_version, cache_dir):
+    """
+    Cache entry for a file identity: absolute path, size, mtime and content hash,
+    plus the extractor and cache format versions. Any change gives a new key.
+    """
+    stat = os.stat(file_path)
+    identity = f"{CACHE_FORMAT_VERSION}|{extractor_version}|{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{_content_hash(file_path)}"
+    return os.path.join(cache_dir, hashlib.sha256(identity.encode('utf-8')).hexdigest() + ".json")
+
+def _evict(cache_dir, max_bytes):
+    """Deletes least recently used entries (by mtime, refreshed on every hit) until the cache fits max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"): continue
+        path = os.path.join(cache_dir, name)
+        try: stat = os.stat(path)
+        except OSError: continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes: break
+        try: os.remove(path); total -= size
+        except OSError: pass
+
+def load_or_extract(file_path, extractor, extractor_version, cache_dir=EXTRACTION_CACHE_DIR, max_bytes=EXTRACTION_CACHE_MAX_BYTES):
+    """
+    Returns the Document for file_path from the on-disk cache, or runs extractor(file_path)
+    and stores the result. Cache problems (unreadable/corrupt entries, full disk) are
+    reported and ignored; they never make the extraction itself fail.
+
+    Returns:
+        tuple: (document: Document, cache_hit: bool)
+    """
+    entry_path = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        entry_path = _entry_path(file_path, extractor_version, cache_dir)
+        if os.path.exists(entry_path):
+            with open(entry_path, 'r', encoding='utf-8') as f: entry = json.load(f)
+            os.utime(entry_path) # Mark as recently used for eviction
+            return document_from_data(entry["blocks"]), True
+    except Exception as e:
+        print(f"WARNING (extraction_cache): Cache lookup failed for '{file_path}': {e}")
+
+    document = extractor(file_path)
+
+    if entry_path:
+        try:
+            entry = {"source": os.path.abspath(file_path), "extractor_version": extractor_version, "created": time.time(), "blocks": document_to_data(document)}
+            temp_path = entry_path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f: json.dump(entry, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, entry_path) # Atomic: readers never see a partial entry
+            _evict(cache_dir, max_bytes)
+        except Exception as e:
+            print(f"WARNING (extraction_cache): Could not store cache entry for '{file_path}': {e}")
+    return document, False
+
+def clear_cache(cache_dir=EXTRACTION_CACHE_DIR):
+    """Removes all cache entries. Returns the number of files deleted."""
+    removed = 0
+    if not os.path.isdir(cache_dir): return removed
+    for name in os.listdir(cache_dir):
+        if name.endswith((".json", ".tmp")):
+            try: os.remove(os.path.join(cache_dir, name)); removed += 1
+            except OSError: pass
+    return removed
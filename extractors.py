@@ -0,0 +1,195 @@
+# extractors.py
+
+import os
+import re
+import html
+import importlib.util
+
+from document_model import Document, Run
+import profiling
+from config import EXTRACTION_CACHE_ENABLED, EXTRACTION_ENGINE
+
+# Bump whenever extraction output changes, so cached documents from older versions are not reused
+EXTRACTOR_VERSION = 1
+
+# --- Optional Extractor Libraries (discovered by capability, imported on first use) ---
+# python-docx and python-pptx are slow to import, so startup only checks whether they are
+# installed. The modules are imported by the first extraction that needs them.
+EXTRACTOR_REQUIREMENTS = {
+    ".docx": ("docx", "python-docx"),
+    ".pptx": ("pptx", "python-pptx"),
+}
+_availability = {}
+
+def is_available(file_extension, engine=EXTRACTION_ENGINE):
+    """
+    True if this extension can be extracted with the given engine (.txt is always available).
+    The "xml" engine only needs the standard library; "library" needs python-docx/python-pptx.
+    """
+    requirement = EXTRACTOR_REQUIREMENTS.get(file_extension)
+    if requirement is None: return file_extension == ".txt"
+    if engine == "xml": return True
+    module_name, _ = requirement
+    if module_name not in _availability:
+        try: _availability[module_name] = importlib.util.find_spec(module_name) is not None
+        except (ImportError, ValueError): _availability[module_name] = False
+    return _availability[module_name]
+
+def missing_library(file_extension):
+    """pip name of the library an extension needs, or None."""
+    requirement = EXTRACTOR_REQUIREMENTS.get(file_extension)
+    return requirement[1] if requirement else None
+
+WD_UNDERLINE = None # Set when python-docx is first imported
+
+def _import_docx():
+    global WD_UNDERLINE
+    import docx
+    from docx.enum.text import WD_UNDERLINE as underline_enum
+    WD_UNDERLINE = underline_enum
+    return docx
+
+def _import_pptx():
+    # The PPTX underline check uses WD_UNDERLINE.NONE when python-docx is installed
+    if WD_UNDERLINE is None and is_available(".docx", "library"): _import_docx()
+    from pptx import Presentation
+    return Presentation
+
+LIST_BULLET_PATTERN = re.compile(r"^\s*(\*|-|•|▪|o)\s+")
+LIST_NUMBER_PATTERN = re.compile(r"^\s*(\d+\.|[a-zA-Z][\.\)])\s+")
+LIST_PREFIX_PATTERN = re.compile(r"^\s*(\*|-|•|▪|o|\d+\.|[a-zA-Z][\.\)])\s+")
+
+def _is_underlined(underline, strike=False):
+    """Interprets a python-docx/python-pptx underline value (None, bool or enum member)."""
+    if not underline or strike: return False
+    if WD_UNDERLINE: return underline != WD_UNDERLINE.NONE
+    return True
+
+def add_docx_paragraph(document, style_name, runs):
+    """
+    Adds one DOCX paragraph to the Document. style_name is the paragraph style's UI name
+    ("Heading 1", "List Bullet", ...) and runs are its non-empty Runs. Shared by the
+    python-docx and XML extraction engines.
+    """
+    paragraph = Run("".join(run.to_markup() for run in runs).strip())
+    style_name_lower = style_name.lower()
+    is_list_style_by_name = 'list paragraph' in style_name_lower or 'list bullet' in style_name_lower or 'list number' in style_name_lower
+    if style_name.startswith('Heading 1'):
+        document.add_blank(); document.add_heading(1, [paragraph])
+    elif style_name.startswith('Heading 2'):
+        document.add_blank(); document.add_heading(2, [paragraph])
+    elif style_name.startswith('Heading 3'):
+        document.add_blank(); document.add_heading(3, [paragraph])
+    elif paragraph.text and (is_list_style_by_name or LIST_BULLET_PATTERN.match(paragraph.text) or LIST_NUMBER_PATTERN.match(paragraph.text)):
+        document.add_bullet(LIST_PREFIX_PATTERN.sub("", paragraph.text).strip())
+    elif paragraph.text: document.add_paragraph([paragraph])
+    else: document.add_blank()
+
+def add_pptx_slide(document, slide_number, notes_text, title_text, shape_paragraphs):
+    """
+    Adds one slide to the Document: speaker notes, the title and the text of the other shapes.
+    notes_text and title_text are the raw text frame texts (or None); shape_paragraphs holds,
+    per shape, a list of (level, runs) with unescaped Run texts. Shared by both engines.
+    """
+    document.add_blank()
+
+    # Add notes first
+    if notes_text and notes_text.strip():
+        document.add_blank()
+        document.add_heading(3, f"Speaker Notes (Slide {slide_number}):")
+        for note_para in notes_text.strip().split('\n'):
+            if note_para.strip():
+                document.add_paragraph(html.escape(note_para.strip())) # Escape notes text
+        document.add_blank()
+
+    # Add slide title
+    if title_text and title_text.strip():
+         document.add_blank()
+         document.add_heading(2, f"Slide {slide_number}: {html.escape(title_text.strip())}")
+
+    # Text from other shapes
+    for paragraphs in shape_paragraphs:
+        shape_started = False
+        for level, runs in paragraphs:
+            para_full_text = "".join(Run(html.escape(run.text), run.bold, run.italic, run.underline).to_markup() for run in runs if run.text).strip() # Escape text content
+            if not para_full_text: continue
+            # Separate shapes from each other (and from the title/notes) by a blank line
+            if not shape_started: document.add_blank(); shape_started = True
+            # Prefix list items based on indentation level
+            if level > 0: document.add_bullet(para_full_text)
+            else: document.add_paragraph(para_full_text)
+
+def extract_docx(file_path):
+    """
+    Extracts a DOCX file into a Document.
+    Heading 1-3 styles become headings, list styles and list-like text become
+    bullet items, and run-level bold/italic/underline is kept.
+    Raises on read errors; requires python-docx.
+    """
+    if not is_available(".docx", "library"): raise RuntimeError("python-docx library not installed.")
+    docx = _import_docx()
+    doc_obj = docx.Document(file_path); document = Document()
+    for para in doc_obj.paragraphs:
+        runs = []
+        for run in para.runs:
+            run_text = run.text
+            if run_text:
+                runs.append(Run(run_text, bool(run.bold), bool(run.italic), _is_underlined(run.underline, run.font.strike)))
+        add_docx_paragraph(document, para.style.name if para.style and para.style.name else "", runs)
+    return document
+
+def extract_pptx(file_path):
+    """
+    Extracts a PPTX file slide by slide into a Document: speaker notes, the
+    slide title and the text of every other shape (indented paragraphs become
+    bullet items). Raises on read errors; requires python-pptx.
+    """
+    if not is_available(".pptx", "library"): raise RuntimeError("python-pptx library not installed.")
+    Presentation = _import_pptx()
+    prs = Presentation(file_path); document = Document()
+    for i, slide in enumerate(prs.slides):
+        notes_text = None
+        if slide.has_notes_slide:
+            notes_frame = slide.notes_slide.notes_text_frame
+            if notes_frame: notes_text = notes_frame.text
+
+        title_text = None
+        if slide.shapes.title and slide.shapes.title.has_text_frame: title_text = slide.shapes.title.text
+
+        # Extract text from other shapes
+        shape_paragraphs = []
+        for shape in slide.shapes:
+            if not shape.has_text_frame: continue
+            if shape == slide.shapes.title: continue
+            if slide.has_notes_slide and shape.is_placeholder and shape.name.startswith("Notes Placeholder"): continue
+            shape_paragraphs.append([
+                (paragraph.level, [Run(run.text, bool(run.font.bold), bool(run.font.italic), _is_underlined(run.font.underline)) for run in paragraph.runs])
+                for paragraph in shape.text_frame.paragraphs
+            ])
+        add_pptx_slide(document, i + 1, notes_text, title_text, shape_paragraphs)
+    return document
+
+EXTRACTORS = {".docx": extract_docx, ".pptx": extract_pptx}
+
+def get_extractor(file_extension, engine=EXTRACTION_ENGINE):
+    """Extraction function for an extension and engine ("xml" or "library"), or None if unsupported."""
+    if file_extension not in EXTRACTORS: return None
+    if engine == "xml":
+        from xml_extractors import XML_EXTRACTORS
+        return XML_EXTRACTORS[file_extension]
+    return EXTRACTORS[file_extension]
+
+def extract_file(file_path, use_cache=EXTRACTION_CACHE_ENABLED, engine=EXTRACTION_ENGINE):
+    """
+    Extracts a DOCX/PPTX file, reusing the on-disk extraction cache when the file is unchanged.
+
+    Returns:
+        tuple: (document: Document, cache_hit: bool)
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    extractor = get_extractor(extension, engine)
+    if extractor is None: raise ValueError(f"Unsupported file type: {extension}")
+    with profiling.stage("extract"):
+        if not use_cache: return extractor(file_path), False
+        from extraction_cache import load_or_extract
+        return load_or_extract(file_path, extractor, f"{EXTRACTOR_VERSION}-{engine}")
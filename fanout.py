@@ -0,0 +1,91 @@
+# fanout.py
+
+# Multi-prompt fan-out: one source document rendered in several styles (one PDF per prompt).
+# The source is extracted, serialized and token-counted once. The AI requests run concurrently
+# on a thread pool (they mostly wait on LM Studio), and every response is handed straight to a
+# process pool that lays out its PDF while the remaining requests are still running. With enough
+# parallel slots in LM Studio, the wall time approaches that of the slowest single prompt.
+
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from config import (FANOUT_MAX_CONCURRENT_REQUESTS, FANOUT_RENDER_PROCESSES, PDF_PAGE_SIZE_DEFAULT,
+                    PDF_FONT_SIZE_DEFAULT, PDF_PAGE_NUMBERS_DEFAULT, PDF_OUTLINE_DEFAULT, INPUT_COMPACTION_ENABLED)
+from prompts import PREDEFINED_PROMPTS
+from document_model import as_markup
+from tokens import estimate_tokens
+
+def output_path(output_dir, base_name, prompt_name):
+    """PDF path for one prompt, e.g. out/report-formal_report_summary.pdf."""
+    slug = re.sub(r"[^a-z0-9]+", "_", prompt_name.lower()).strip("_") or "prompt"
+    return os.path.join(output_dir, f"{base_name}-{slug}.pdf")
+
+def _format_one(markup, text_tokens, prompt_name, prompt_instruction, progress_callback, compact):
+    """Runs one prompt. Returns (success, result, repair_stats, seconds)."""
+    from ai_processor import process_text_with_ai
+    start_time = time.perf_counter(); repair_stats = {}
+    prefixed_progress = (lambda message: progress_callback(f"[{prompt_name}] {message}")) if progress_callback else None
+    success, result = process_text_with_ai(markup, prompt_instruction, progress_callback=prefixed_progress, stats=repair_stats, text_tokens=text_tokens, compact=compact)
+    return success, result, repair_stats, time.perf_counter() - start_time
+
+def fan_out(source, prompt_names, output_dir, base_name="document", page_size_name=PDF_PAGE_SIZE_DEFAULT, font_size=PDF_FONT_SIZE_DEFAULT,
+            page_numbers=PDF_PAGE_NUMBERS_DEFAULT, outline=PDF_OUTLINE_DEFAULT, progress_callback=None, is_cancelled=None,
+            max_requests=FANOUT_MAX_CONCURRENT_REQUESTS, render_processes=FANOUT_RENDER_PROCESSES, compact=INPUT_COMPACTION_ENABLED):
+    """
+    Formats one source with every prompt in prompt_names (keys of PREDEFINED_PROMPTS) and writes one PDF per prompt.
+
+    Args:
+        source (str or Document): The extracted document or markup text.
+        progress_callback (function, optional): Called with status messages, from worker threads.
+        is_cancelled (function, optional): Returns True to skip the PDFs of responses that arrive afterwards.
+            Requests already sent are not interrupted.
+        compact (bool): Compact the source before sending it (computed once and shared by the prompts).
+
+    Returns:
+        tuple: (results: list of dicts in prompt order with prompt, success, message, pdf_path,
+                         ai_seconds and repairs; summary: dict with input_tokens, wall_seconds, ai_seconds
+                         (sum over prompts) and slowest_ai_seconds)
+    """
+    prompt_names = list(dict.fromkeys(prompt_names))
+    unknown = [name for name in prompt_names if name not in PREDEFINED_PROMPTS]
+    if unknown: raise ValueError(f"Unknown prompt(s): {', '.join(unknown)}")
+    from pdf_generator import generate_pdf
+    start_time = time.perf_counter()
+    markup = as_markup(source); text_tokens = estimate_tokens(markup) # Shared by every request
+    os.makedirs(output_dir, exist_ok=True)
+    results = {name: {"prompt": name, "success": False, "message": "", "pdf_path": None, "ai_seconds": None, "repairs": {}} for name in prompt_names}
+    if progress_callback: progress_callback(f"Fan-out: {len(prompt_names)} prompt(s), ~{text_tokens} source tokens, up to {max_requests} concurrent request(s).")
+
+    render_workers = min(len(prompt_names), render_processes or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_requests, len(prompt_names))), thread_name_prefix="fanout-ai") as ai_pool, \
+         ProcessPoolExecutor(max_workers=max(1, render_workers)) as render_pool:
+        ai_futures = {ai_pool.submit(_format_one, markup, text_tokens, name, PREDEFINED_PROMPTS[name], progress_callback, compact): name for name in prompt_names}
+        render_futures = {}
+        for future in as_completed(ai_futures):
+            name = ai_futures[future]; entry = results[name]
+            try: success, result, entry["repairs"], entry["ai_seconds"] = future.result()
+            except Exception as e: success, result = False, f"Unexpected error: {e}"
+            if not success: entry["message"] = f"AI failed: {result}"; continue
+            if is_cancelled and is_cancelled(): entry["message"] = "Cancelled before rendering."; continue
+            if progress_callback: progress_callback(f"[{name}] AI done in {entry['ai_seconds']:.1f}s, rendering PDF...")
+            pdf_path = output_path(output_dir, base_name, name)
+            render_futures[render_pool.submit(generate_pdf, result, pdf_path, page_size_name, font_size, page_numbers, outline)] = (name, pdf_path)
+        for future in as_completed(render_futures):
+            name, pdf_path = render_futures[future]; entry = results[name]
+            try: pdf_success, message = future.result()
+            except Exception as e: pdf_success, message = False, f"Unexpected error: {e}"
+            entry["success"] = pdf_success; entry["message"] = message if pdf_success else f"PDF failed: {message}"
+            if pdf_success: entry["pdf_path"] = pdf_path
+            if progress_callback: progress_callback(f"[{name}] {entry['message']}")
+
+    ai_times = [entry["ai_seconds"] for entry in results.values() if entry["ai_seconds"] is not None]
+    summary = {"input_tokens": text_tokens, "wall_seconds": time.perf_counter() - start_time, "ai_seconds": sum(ai_times), "slowest_ai_seconds": max(ai_times, default=0.0)}
+    return [results[name] for name in prompt_names], summary
+
+def summary_message(results, summary):
+    """One-line outcome of a fan-out run."""
+    succeeded = sum(1 for entry in results if entry["success"])
+    return (f"Fan-out: {succeeded}/{len(results)} PDF(s) in {summary['wall_seconds']:.1f}s "
+            f"(slowest prompt {summary['slowest_ai_seconds']:.1f}s, sequential AI time would be {summary['ai_seconds']:.1f}s).")
@@ -0,0 +1,143 @@
+# format_validator.py
+
+import re
+
+from document_model import HEADING, PARAGRAPH, BULLET, BLANK, as_document
+from config import DIRECT_RENDER_MAX_PARAGRAPH_CHARS
+
+ALLOWED_TAGS = ("b", "i", "u")
+
+# Markdown and other conventions that FORMATTING_RULES prohibits
+MARKDOWN_PATTERNS = (
+    (re.compile(r"\*\*[^*\n]+\*\*"), "markdown bold (**text**)"),
+    (re.compile(r"(?<![\w*])\*[^*\s][^*\n]*\*(?![\w*])"), "markdown italics (*text*)"),
+    (re.compile(r"(?<!\w)__[^_\n]+__(?!\w)"), "markdown bold (__text__)"),
+    (re.compile(r"`"), "markdown code (`)"),
+    (re.compile(r"\[[^\]\n]+\]\([^)\n]+\)"), "markdown link"),
+)
+TAG_PATTERN = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^<>]*?(/?)>")
+STRAY_LT_PATTERN = re.compile(r"<(?!/?[a-zA-Z])")
+# Lines that look like an attempt at structure the PDF parser will not recognize
+MALFORMED_LINE_PATTERN = re.compile(r"^(#{1,6}(?=[^#\s])|#{4,}\s|\+\s|>\s|-{3,}$|={3,}$|\|.*\|$)")
+
+def find_inline_issues(markup):
+    """
+    Returns a list of human-readable problems in one line/block of inline markup:
+    markdown emphasis, tags other than <b>/<i>/<u>, unbalanced tags and stray '<'.
+    An empty list means the markup follows FORMATTING_RULES.
+    """
+    issues = []
+    for pattern, description in MARKDOWN_PATTERNS:
+        if pattern.search(markup): issues.append(description)
+    open_tags = []
+    for closing, name, self_closing in TAG_PATTERN.findall(markup):
+        name = name.lower()
+        if name not in ALLOWED_TAGS:
+            issues.append(f"disallowed tag <{name}>"); continue
+        if self_closing: continue
+        if not closing: open_tags.append(name)
+        elif open_tags and open_tags[-1] == name: open_tags.pop()
+        else: issues.append(f"unbalanced </{name}>"); break
+    if open_tags: issues.append(f"unclosed <{open_tags[-1]}>")
+    if STRAY_LT_PATTERN.search(markup): issues.append("unescaped '<'")
+    return list(dict.fromkeys(issues)) # Report each problem once
+
+def score_structure(text_or_document):
+    """
+    Scores how well the text already follows the app's markup (0.0 - 1.0), so
+    it can be rendered directly without an LLM pass.
+
+    The score is the share of characters in blocks without formatting issues,
+    weighted by how much structure is present (headings, paragraph breaks,
+    lists) and reduced for overly long paragraphs.
+
+    Returns:
+        tuple: (score: float, reasons: list of str) - reasons explain deductions.
+    """
+    document = as_document(text_or_document)
+    total_chars = 0; clean_chars = 0; long_paragraph_chars = 0; paragraph_chars = 0
+    has_headings = False; has_breaks = False; has_lists = False
+    reasons = []; issue_count = 0
+    for block in document.blocks:
+        kind = block.kind
+        if kind == BLANK:
+            has_breaks = True
+            if paragraph_chars > DIRECT_RENDER_MAX_PARAGRAPH_CHARS: long_paragraph_chars += paragraph_chars
+            paragraph_chars = 0
+            continue
+        block_markup = block.inline_markup()
+        block_chars = len(block_markup); total_chars += block_chars
+        if kind == HEADING: has_headings = True
+        elif kind == BULLET: has_lists = True
+        if kind == PARAGRAPH: paragraph_chars += block_chars
+        else:
+            if paragraph_chars > DIRECT_RENDER_MAX_PARAGRAPH_CHARS: long_paragraph_chars += paragraph_chars
+            paragraph_chars = 0
+        issues = find_inline_issues(block_markup)
+        if kind == PARAGRAPH and MALFORMED_LINE_PATTERN.match(block_markup): issues.append("unrecognized line prefix")
+        if issues:
+            issue_count += 1
+            if issue_count <= 5: reasons.append(f"'{block_markup[:40]}': {', '.join(issues)}")
+        else: clean_chars += block_chars
+    if paragraph_chars > DIRECT_RENDER_MAX_PARAGRAPH_CHARS: long_paragraph_chars += paragraph_chars
+
+    if not total_chars: return 0.0, ["no text"]
+    if issue_count > 5: reasons.append(f"... {issue_count - 5} more blocks with formatting issues")
+    structure_weight = 0.5 + (0.3 if has_headings else 0.0) + (0.2 if (has_breaks or has_lists) else 0.0)
+    if not has_headings: reasons.append("no headings")
+    if not (has_breaks or has_lists): reasons.append("no paragraph breaks or lists")
+    long_ratio = long_paragraph_chars / total_chars
+    if long_ratio: reasons.append(f"{long_ratio:.0%} of the text is in paragraphs over {DIRECT_RENDER_MAX_PARAGRAPH_CHARS} characters")
+    score = (clean_chars / total_chars) * structure_weight * (1.0 - long_ratio)
+    return round(score, 3), reasons
+
+def _reportlab_rejects(markup):
+    """
+    True if ReportLab's Paragraph parser rejects the markup. Returns False when
+    ReportLab is not installed (the regex checks above still apply).
+    """
+    global _check_style
+    try: from reportlab.platypus import Paragraph; from reportlab.lib.styles import ParagraphStyle
+    except ImportError: return False
+    if _check_style is None: _check_style = ParagraphStyle(name='ValidatorCheck')
+    try: Paragraph(markup, _check_style)
+    except Exception: return True
+    return False
+_check_style = None
+
+def _line_kind(line):
+    """Block kind and inline content of one markup line, using the PDF parser's prefix rules."""
+    if line.startswith(('# ', '## ', '### ')): return HEADING, line.split(' ', 1)[1].strip()
+    if line.startswith(('* ', '- ')): return BULLET, line[2:].strip()
+    if not line: return BLANK, ""
+    return PARAGRAPH, line
+
+def find_violations(markup, check_reportlab=True):
+    """
+    Finds the blocks of AI output that break FORMATTING_RULES, as rendered by
+    pdf_generator: a heading or bullet line, or a run of consecutive paragraph lines
+    (which become one Paragraph). Optionally also asks ReportLab to parse each block.
+
+    Returns:
+        list of tuples: (start_line, end_line, issues) - line indices into
+        markup.split('\n'), end exclusive, and the list of problems found.
+    """
+    lines = markup.split('\n'); violations = []
+    index = 0
+    while index < len(lines):
+        kind, content = _line_kind(lines[index].strip())
+        if kind == BLANK: index += 1; continue
+        start = index; index += 1
+        if kind == PARAGRAPH:
+            contents = [content]
+            while index < len(lines):
+                next_kind, next_content = _line_kind(lines[index].strip())
+                if next_kind != PARAGRAPH: break
+                contents.append(next_content); index += 1
+            issues = find_inline_issues(" ".join(contents))
+            if any(MALFORMED_LINE_PATTERN.match(line_content) for line_content in contents): issues.append("unrecognized line prefix")
+            content = " ".join(contents)
+        else: issues = find_inline_issues(content)
+        if not issues and check_reportlab and _reportlab_rejects(content): issues.append("rejected by the PDF parser")
+        if issues: violations.append((start, index, issues))
+    return violations
@@ -0,0 +1,122 @@
+# large_file.py
+
+import os
+import mmap
+
+from config import (LARGE_FILE_PREVIEW_PAGE_BYTES, LARGE_FILE_SEGMENT_BYTES,
+                    LARGE_FILE_STATS_CHUNK_BYTES)
+
+def _utf8_boundary(buffer, position, lower_bound):
+    """Moves position back so it does not split a UTF-8 multi-byte sequence."""
+    while position > lower_bound and (buffer[position] & 0xC0) == 0x80:
+        position -= 1
+    return position
+
+class LargeTextFile:
+    """
+    Read-only, memory-mapped view of a (potentially huge) plain-text file.
+    Nothing is decoded until a page or segment is requested, so the file never
+    has to fit in memory or in a QTextEdit.
+
+    Pages and segments end just after a newline when one is available within their size,
+    and otherwise at a UTF-8 character boundary.
+    '\\n' never occurs inside a UTF-8 multi-byte sequence, so every piece can be
+    decoded on its own.
+    """
+    def __init__(self, file_path, page_bytes=LARGE_FILE_PREVIEW_PAGE_BYTES):
+        self.file_path = file_path
+        self.page_bytes = page_bytes
+        self._file = open(file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    @property
+    def name(self):
+        return os.path.basename(self.file_path)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap): self._map.close()
+        self._file.close()
+
+    def _decode(self, start, end):
+        return self._map[start:end].decode('utf-8', errors='ignore')
+
+    # --- Paged preview ---
+    @property
+    def page_count(self):
+        return max(1, -(-self.size // self.page_bytes))
+
+    def _page_start(self, index):
+        """
+        Start of page `index`: just after the first newline within half a page of the nominal
+        start, or the nominal start itself (moved back to a UTF-8 character boundary) for long lines.
+        Pages are therefore never empty and at most 1.5 page sizes long.
+        """
+        if index <= 0: return 0
+        nominal = index * self.page_bytes
+        if nominal >= self.size: return self.size
+        newline = self._map.find(b'\n', nominal, min(nominal + self.page_bytes // 2, self.size))
+        if newline != -1: return newline + 1
+        return _utf8_boundary(self._map, nominal, nominal - self.page_bytes + 1)
+
+    def read_page(self, index):
+        """Decoded text of preview page `index` (0-based)."""
+        index = min(max(index, 0), self.page_count - 1)
+        return self._decode(self._page_start(index), self._page_start(index + 1))
+
+    # --- Streaming ---
+    def iter_segments(self, max_bytes=LARGE_FILE_SEGMENT_BYTES):
+        """
+        Yields decoded text segments of at most max_bytes bytes, split at a
+        paragraph break (blank line) if possible, else at a line break.
+        """
+        position = 0
+        while position < self.size:
+            end = min(position + max_bytes, self.size)
+            if end < self.size:
+                split = self._map.rfind(b'\n\n', position, end)
+                if split != -1: end = split + 2
+                else:
+                    split = self._map.rfind(b'\n', position, end)
+                    end = split + 1 if split != -1 else _utf8_boundary(self._map, end, position + 1)
+            segment = self._decode(position, end).strip()
+            if segment: yield segment
+            position = end
+
+    def segment_count(self, max_bytes=LARGE_FILE_SEGMENT_BYTES):
+        return sum(1 for _ in self.iter_segments(max_bytes))
+
+    def compute_stats(self, count_tokens, progress_callback=None, should_stop=None,
+                      chunk_bytes=LARGE_FILE_STATS_CHUNK_BYTES):
+        """
+        Scans the file once and returns a dict with size, line, word and token counts.
+
+        Args:
+            count_tokens (function): Takes a string, returns its token count.
+            progress_callback (function, optional): Called with the percentage scanned (int).
+            should_stop (function, optional): Returns True to abort the scan early.
+        """
+        stats = {"bytes": self.size, "lines": 0, "words": 0, "tokens": 0, "complete": False}
+        position = 0
+        while position < self.size:
+            if should_stop and should_stop(): return stats
+            end = min(position + chunk_bytes, self.size)
+            if end < self.size:
+                newline = self._map.rfind(b'\n', position, end)
+                end = newline + 1 if newline != -1 else _utf8_boundary(self._map, end, position + 1)
+            raw = self._map[position:end]
+            stats["lines"] += raw.count(b'\n')
+            chunk_text = raw.decode('utf-8', errors='ignore')
+            stats["words"] += len(chunk_text.split())
+            stats["tokens"] += count_tokens(chunk_text)
+            position = end
+            if progress_callback: progress_callback(int(position * 100 / self.size))
+        if self.size and self._map[self.size - 1:self.size] != b'\n': stats["lines"] += 1
+        stats["complete"] = True
+        return stats
+
+def is_large_file(file_path, threshold_bytes):
+    """True if the file is big enough to be opened in large-file mode."""
+    try: return os.path.getsize(file_path) >= threshold_bytes
+    except OSError: return False
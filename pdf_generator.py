@@ -1,174 +1,546 @@
-# pdf_generator.py
-
-import os
-import re
-import traceback # Import traceback for detailed errors
-
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle 
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import letter, A4 
-from reportlab.lib.enums import TA_LEFT
-
-from config import (
-    PDF_FONT_NAME_DEFAULT, 
-    PDF_FONT_SIZE_DEFAULT,  
-    PDF_PARAGRAPH_SPACE_INCHES, 
-    PDF_HEADING_SPACE_AFTER_INCHES,
-    PDF_BULLET_INDENT_POINTS
-)
-
-PAGE_SIZES = { 
-    "Letter": letter,
-    "A4": A4,
-}
-
-def generate_pdf(text, filename="output.pdf", page_size_name="Letter", font_size=PDF_FONT_SIZE_DEFAULT):
-    """
-    Generates a formatted PDF from a text string using ReportLab's platypus.
-    Parses simple Markdown-like headings (#, ##, ###) and bullet list items (*, -).
-    Lines starting with numbers (e.g., "1. Item") are treated as normal paragraphs.
-    Includes enhanced error reporting.
-    """
-    print(f"DEBUG (pdf_generator): generate_pdf started for '{filename}' with font_size {font_size}.") # DEBUG
-    
-    if page_size_name not in PAGE_SIZES:
-        print(f"DEBUG (pdf_generator): Unknown page size '{page_size_name}'. Using default 'Letter'.")
-        page_size_name = "Letter"
-
-    current_page_size = PAGE_SIZES[page_size_name]
-    
-    # --- Ensure filename path exists (ReportLab doesn't create directories) ---
-    output_dir = os.path.dirname(filename)
-    if output_dir and not os.path.exists(output_dir):
-        try:
-            os.makedirs(output_dir)
-            print(f"DEBUG (pdf_generator): Created directory '{output_dir}'")
-        except Exception as e:
-            error_msg = f"Failed to create directory for PDF '{output_dir}': {e}"
-            print(f"ERROR (pdf_generator): {error_msg}")
-            return False, error_msg
-            
-    doc = SimpleDocTemplate(filename, pagesize=current_page_size)
-    
-    try: # Wrap style definition in try block in case of font issues later
-        styles = getSampleStyleSheet() 
-        normal_style = ParagraphStyle( name='Normal', parent=styles['Normal'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size, leading=font_size * 1.2, spaceAfter=0 )
-        heading1_style = ParagraphStyle( name='Heading1', parent=styles['Heading1'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size * 1.8, leading=font_size * 1.8 * 1.2, spaceBefore=font_size * 1.2, spaceAfter=PDF_HEADING_SPACE_AFTER_INCHES * inch, keepWithNext=True )
-        heading2_style = ParagraphStyle( name='Heading2', parent=styles['Heading2'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size * 1.4, leading=font_size * 1.4 * 1.2, spaceBefore=font_size * 1.0, spaceAfter=PDF_HEADING_SPACE_AFTER_INCHES * inch * 0.75, keepWithNext=True )
-        heading3_style = ParagraphStyle( name='Heading3', parent=styles['Heading3'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size * 1.2, leading=font_size * 1.2 * 1.2, spaceBefore=font_size * 0.8, spaceAfter=PDF_HEADING_SPACE_AFTER_INCHES * inch * 0.5, keepWithNext=True )
-        list_item_paragraph_style = ParagraphStyle( name='ListItemParagraph', parent=normal_style, spaceBefore=0, spaceAfter=0, leftIndent=0, firstLineIndent=0, bulletIndent=0, alignment=TA_LEFT )
-    except Exception as e:
-        error_msg = f"Error setting up ReportLab styles (check font '{PDF_FONT_NAME_DEFAULT}?): {e}"
-        print(f"ERROR (pdf_generator): {error_msg}")
-        return False, error_msg
-
-    story = []
-    lines = text.strip().split('\n')
-    paragraph_buffer = []
-    current_bullet_list_items = [] 
-
-    # --- Helper Functions (No changes needed here) ---
-    def add_paragraph_buffer_to_story():
-        nonlocal paragraph_buffer
-        if paragraph_buffer:
-            para_text = " ".join(paragraph_buffer).strip()
-            if para_text:
-                try: story.append(Paragraph(para_text, normal_style))
-                except Exception as e: print(f"WARNING (pdf_generator): Skipping paragraph due to error: {e}. Text: '{para_text[:100]}...'"); # Skip bad paras
-                story.append(Spacer(1, PDF_PARAGRAPH_SPACE_INCHES * inch))
-            paragraph_buffer = []
-    def add_bullet_list_to_story(): 
-        nonlocal current_bullet_list_items
-        if current_bullet_list_items:
-            list_elements = []
-            for item_text in current_bullet_list_items:
-                try: p_item = Paragraph(item_text, list_item_paragraph_style)
-                except Exception as e: print(f"WARNING (pdf_generator): Skipping list item due to error: {e}. Text: '{item_text[:100]}...'"); continue # Skip bad items
-                list_elements.append(ListItem(p_item))
-            if list_elements: # Only add if there are valid elements
-                list_flowable = ListFlowable( list_elements, bulletType='bullet', bulletText='•', leftIndent=PDF_BULLET_INDENT_POINTS, )
-                story.append(list_flowable)
-                story.append(Spacer(1, PDF_PARAGRAPH_SPACE_INCHES * inch * 0.5))
-            current_bullet_list_items = []
-
-    # --- Parsing Loop ---        
-    for line_idx, line in enumerate(lines):
-        # print(f"DEBUG (pdf_generator): Processing line {line_idx}: '{line[:80]}...'") # Optional: Very verbose debug
-        cleaned_line = line.strip()
-        next_line_is_bullet_item = False
-        if line_idx + 1 < len(lines):
-            next_cleaned_line = lines[line_idx+1].strip()
-            if next_cleaned_line.startswith(('* ', '- ')): next_line_is_bullet_item = True
-        if not cleaned_line.startswith(('* ', '- ')) and current_bullet_list_items: add_bullet_list_to_story()
-
-        try: # Wrap parsing actions in try block to catch errors related to content
-            if cleaned_line.startswith('# '):
-                add_paragraph_buffer_to_story(); add_bullet_list_to_story() 
-                heading_text = cleaned_line[2:].strip()
-                if heading_text: story.append(Paragraph(heading_text, heading1_style))
-                continue
-            if cleaned_line.startswith('## '):
-                add_paragraph_buffer_to_story(); add_bullet_list_to_story()
-                heading_text = cleaned_line[3:].strip()
-                if heading_text: story.append(Paragraph(heading_text, heading2_style))
-                continue
-            if cleaned_line.startswith('### '):
-                add_paragraph_buffer_to_story(); add_bullet_list_to_story()
-                heading_text = cleaned_line[4:].strip()
-                if heading_text: story.append(Paragraph(heading_text, heading3_style))
-                continue
-
-            if cleaned_line.startswith(('* ', '- ')):
-                add_paragraph_buffer_to_story() 
-                bullet_text = cleaned_line[2:].strip()
-                if bullet_text: current_bullet_list_items.append(bullet_text)
-                if not next_line_is_bullet_item: add_bullet_list_to_story()
-                continue
-                
-            if cleaned_line == "": add_paragraph_buffer_to_story()
-            else: paragraph_buffer.append(line) 
-        except Exception as e:
-             print(f"WARNING (pdf_generator): Error processing line {line_idx+1} ('{line[:80]}...'): {e}. Skipping effects of this line.")
-             # Optionally clear buffers if error occurs?
-             paragraph_buffer = [] 
-             current_bullet_list_items = []
-
-    # --- Final cleanup ---
-    try:
-        add_paragraph_buffer_to_story()
-        add_bullet_list_to_story() 
-    except Exception as e:
-        print(f"WARNING (pdf_generator): Error during final buffer cleanup: {e}")
-
-
-    if not story:
-        story.append(Paragraph("The processed text was empty or resulted in no valid PDF content.", normal_style))
-        print("DEBUG (pdf_generator): Story was empty, added default paragraph.") 
-    
-    print(f"DEBUG (pdf_generator): Attempting doc.build(story) with {len(story)} flowables...") 
-    
-    # --- Build Phase ---
-    try:
-        doc.build(story)
-        print(f"DEBUG (pdf_generator): doc.build successful for '{filename}'") 
-        return True, f"PDF successfully created: {os.path.basename(filename)}"
-    except Exception as e:
-        # --- More Detailed Error Reporting ---
-        error_details = traceback.format_exc() 
-        full_error_msg = f"Error creating PDF (ReportLab doc.build failed for '{filename}'): {e}\nDetails:\n{error_details}"
-        print(f"ERROR (pdf_generator): {full_error_msg}") 
-        # Try to provide a snippet of the story around where it might have failed (advanced)
-        # story_repr = [repr(f)[:100] + ('...' if len(repr(f)) > 100 else '') for f in story]
-        # print(f"DEBUG (pdf_generator): Story content (first/last few items):\n{story_repr[:5]}\n...\n{story_repr[-5:]}")
-        return False, f"Error creating PDF (ReportLab build failed): {e}" # Return simpler message to UI
-
-
-# --- Standalone Test ---
-if __name__ == '__main__':
-    # ... (standalone test code remains the same) ...
-    print("Running PDF generator standalone test...")
-    sample_formatted_text = """# Title\n\nPara 1.\n\n* Item 1\n* Item 2 with <b>bold</b>\n\n## H2\n\nPara 2."""
-    output_file = "standalone_pdf_test_debug.pdf"
-    success, message = generate_pdf(sample_formatted_text, output_file, page_size_name="A4", font_size=11)
-    print(message)
\ No newline at end of file
+# pdf_generator.py
+
+import os
+import io
+import re
+import html
+import math
+import shutil
+import tempfile
+import functools
+import traceback # Import traceback for detailed errors
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, ListFlowable, ListItem
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.enums import TA_LEFT
+from reportlab.pdfgen import canvas as rl_canvas
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+# Optional: pypdf is only needed to merge the section files of a parallel render
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:
+    PdfReader = None
+    PdfWriter = None
+
+from document_model import Document, HEADING, PARAGRAPH, BULLET, BLANK, as_document
+import profiling
+from config import (
+    PDF_FONT_NAME_DEFAULT,
+    PDF_FONT_SIZE_DEFAULT,
+    PDF_PARAGRAPH_SPACE_INCHES,
+    PDF_HEADING_SPACE_AFTER_INCHES,
+    PDF_BULLET_INDENT_POINTS,
+    PDF_MAX_PARAGRAPH_CHARS,
+    PDF_PAGE_NUMBERS_DEFAULT,
+    PDF_OUTLINE_DEFAULT,
+    PDF_REPRODUCIBLE,
+    PDF_PARALLEL_MAX_WORKERS,
+    PDF_PARALLEL_MIN_CHUNK_CHARS,
+    PDF_PREVIEW_MAX_PAGES
+)
+
+PAGE_SIZES = {
+    "Letter": letter,
+    "A4": A4,
+}
+
+# Heading style name -> outline level (H3 is left out of the outline on purpose)
+OUTLINE_LEVELS = {"Heading1": 0, "Heading2": 1}
+
+
+@functools.lru_cache(maxsize=16)
+def _build_styles(font_size):
+    """
+    Creates the paragraph styles used by the story. Returns a dict keyed by role.
+    Cached per font size; the styles are only read during layout, so they are shared.
+    """
+    styles = getSampleStyleSheet()
+    normal_style = ParagraphStyle( name='Normal', parent=styles['Normal'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size, leading=font_size * 1.2, spaceAfter=0 )
+    heading1_style = ParagraphStyle( name='Heading1', parent=styles['Heading1'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size * 1.8, leading=font_size * 1.8 * 1.2, spaceBefore=font_size * 1.2, spaceAfter=PDF_HEADING_SPACE_AFTER_INCHES * inch, keepWithNext=True )
+    heading2_style = ParagraphStyle( name='Heading2', parent=styles['Heading2'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size * 1.4, leading=font_size * 1.4 * 1.2, spaceBefore=font_size * 1.0, spaceAfter=PDF_HEADING_SPACE_AFTER_INCHES * inch * 0.75, keepWithNext=True )
+    heading3_style = ParagraphStyle( name='Heading3', parent=styles['Heading3'], fontName=PDF_FONT_NAME_DEFAULT, fontSize=font_size * 1.2, leading=font_size * 1.2 * 1.2, spaceBefore=font_size * 0.8, spaceAfter=PDF_HEADING_SPACE_AFTER_INCHES * inch * 0.5, keepWithNext=True )
+    list_item_paragraph_style = ParagraphStyle( name='ListItemParagraph', parent=normal_style, spaceBefore=0, spaceAfter=0, leftIndent=0, firstLineIndent=0, bulletIndent=0, alignment=TA_LEFT )
+    return {
+        "normal": normal_style,
+        "h1": heading1_style,
+        "h2": heading2_style,
+        "h3": heading3_style,
+        "list_item": list_item_paragraph_style,
+    }
+
+
+# Tags and whitespace runs: the only places split_long_markup looks at
+MARKUP_EVENT_PATTERN = re.compile(r"<[^<>]*>|\s+")
+TAG_NAME_PATTERN = re.compile(r"<\s*(/?)\s*([a-zA-Z][a-zA-Z0-9]*)")
+
+def split_long_markup(markup, max_chars=PDF_MAX_PARAGRAPH_CHARS):
+    """
+    Splits paragraph markup longer than max_chars into chunks of about max_chars, in one
+    linear pass. Cuts go at a sentence end (whitespace after . ! ?) in the second half
+    of the chunk if there is one, otherwise at the last whitespace. Inline tags open at
+    a cut are closed at the end of the chunk and reopened at the start of the next one,
+    so every chunk is valid ReportLab markup. Text without any whitespace is never cut.
+    """
+    if len(markup) <= max_chars: return [markup]
+    chunks = []; open_tags = [] # (name, full opening tag)
+    chunk_start = 0; reopen_prefix = ""
+    last_sentence_break = None; last_space_break = None # (start, end, open tags at that point)
+
+    def cut(candidate):
+        nonlocal chunk_start, reopen_prefix, last_sentence_break, last_space_break
+        start, end, tags = candidate
+        chunks.append(reopen_prefix + markup[chunk_start:start] + "".join(f"</{name}>" for name, _ in reversed(tags)))
+        reopen_prefix = "".join(tag for _, tag in tags)
+        chunk_start = end; last_sentence_break = None; last_space_break = None
+
+    for match in MARKUP_EVENT_PATTERN.finditer(markup):
+        token = match.group()
+        if token[0] == '<':
+            tag_match = TAG_NAME_PATTERN.match(token)
+            if not tag_match or token.endswith('/>'): continue
+            closing, name = tag_match.group(1), tag_match.group(2).lower()
+            if not closing: open_tags.append((name, token))
+            elif open_tags and open_tags[-1][0] == name: open_tags.pop()
+            continue
+        position = match.start()
+        if position - chunk_start > max_chars:
+            if last_sentence_break and last_sentence_break[0] - chunk_start >= max_chars // 2: cut(last_sentence_break)
+            elif last_space_break: cut(last_space_break)
+        if position <= chunk_start: continue
+        candidate = (position, match.end(), tuple(open_tags))
+        last_space_break = candidate
+        if markup[position - 1] in ".!?": last_sentence_break = candidate
+    chunks.append(reopen_prefix + markup[chunk_start:])
+    return chunks
+
+
+def _build_story(document, styles):
+    """
+    Turns a Document into a list of ReportLab flowables.
+    Consecutive paragraph lines are joined into one Paragraph until a blank line,
+    heading or bullet item; consecutive bullet items form one bulleted list.
+    Paragraphs and list items longer than PDF_MAX_PARAGRAPH_CHARS are laid out as
+    several chained Paragraphs (see split_long_markup) to keep wrapping cost linear.
+    """
+    normal_style = styles["normal"]; list_item_paragraph_style = styles["list_item"]
+    heading_styles = {1: styles["h1"], 2: styles["h2"], 3: styles["h3"]}
+
+    story = []
+    paragraph_buffer = []
+    current_bullet_list_items = []
+
+    # --- Helper Functions (No changes needed here) ---
+    def add_paragraph_buffer_to_story():
+        nonlocal paragraph_buffer
+        if paragraph_buffer:
+            para_text = " ".join(paragraph_buffer).strip()
+            if para_text:
+                for chunk_text in split_long_markup(para_text):
+                    try: story.append(Paragraph(chunk_text, normal_style))
+                    except Exception as e: print(f"WARNING (pdf_generator): Skipping paragraph due to error: {e}. Text: '{chunk_text[:100]}...'"); # Skip bad paras
+                story.append(Spacer(1, PDF_PARAGRAPH_SPACE_INCHES * inch))
+            paragraph_buffer = []
+    def add_bullet_list_to_story():
+        nonlocal current_bullet_list_items
+        if current_bullet_list_items:
+            list_elements = []
+            for item_text in current_bullet_list_items:
+                item_paragraphs = []
+                for chunk_text in split_long_markup(item_text):
+                    try: item_paragraphs.append(Paragraph(chunk_text, list_item_paragraph_style))
+                    except Exception as e: print(f"WARNING (pdf_generator): Skipping list item due to error: {e}. Text: '{chunk_text[:100]}...'"); # Skip bad items
+                if not item_paragraphs: continue
+                list_elements.append(ListItem(item_paragraphs[0] if len(item_paragraphs) == 1 else item_paragraphs))
+            if list_elements: # Only add if there are valid elements
+                list_flowable = ListFlowable( list_elements, bulletType='bullet', bulletText='•', leftIndent=PDF_BULLET_INDENT_POINTS, )
+                story.append(list_flowable)
+                story.append(Spacer(1, PDF_PARAGRAPH_SPACE_INCHES * inch * 0.5))
+            current_bullet_list_items = []
+
+    # --- Block Loop ---
+    for block_idx, block in enumerate(document.blocks):
+        kind = block.kind
+        if kind != BULLET and current_bullet_list_items: add_bullet_list_to_story()
+
+        try: # Wrap flowable creation in try block to catch errors related to content
+            if kind == HEADING:
+                add_paragraph_buffer_to_story(); add_bullet_list_to_story()
+                heading_text = block.inline_markup()
+                if heading_text: story.append(Paragraph(heading_text, heading_styles[block.level]))
+            elif kind == BULLET:
+                add_paragraph_buffer_to_story()
+                bullet_text = block.inline_markup()
+                if bullet_text: current_bullet_list_items.append(bullet_text)
+            elif kind == BLANK: add_paragraph_buffer_to_story()
+            else: paragraph_buffer.append(block.inline_markup())
+        except Exception as e:
+             print(f"WARNING (pdf_generator): Error processing block {block_idx+1} ('{block.to_markup()[:80]}...'): {e}. Skipping effects of this block.")
+             # Optionally clear buffers if error occurs?
+             paragraph_buffer = []
+             current_bullet_list_items = []
+
+    # --- Final cleanup ---
+    try:
+        add_paragraph_buffer_to_story()
+        add_bullet_list_to_story()
+    except Exception as e:
+        print(f"WARNING (pdf_generator): Error during final buffer cleanup: {e}")
+
+    return story
+
+
+def _outline_title(flowable):
+    """Plain-text title of a heading flowable (inline tags and entities removed)."""
+    return html.unescape(re.sub(r'<[^>]+>', '', flowable.text)).strip()
+
+
+class _TrackingDocTemplate(SimpleDocTemplate):
+    """
+    SimpleDocTemplate that records the page of every H1/H2 heading it lays out,
+    and optionally writes those headings to the PDF outline as it goes.
+    With reproducible, the creation date and document ID are fixed (ReportLab's invariant mode).
+    """
+    def __init__(self, filename, write_outline=False, reproducible=PDF_REPRODUCIBLE, **kw):
+        super().__init__(filename, invariant=1 if reproducible else None, **kw)
+        self.write_outline = write_outline
+        self.headings = [] # (level, title, page_number)
+
+    def afterFlowable(self, flowable):
+        style = getattr(flowable, 'style', None)
+        level = OUTLINE_LEVELS.get(getattr(style, 'name', None))
+        if level is None: return
+        title = _outline_title(flowable)
+        if not title: return
+        self.headings.append((level, title, self.page))
+        if self.write_outline:
+            key = f"heading_{len(self.headings)}"
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(title, key, level=level, closed=False)
+
+
+def _draw_page_number(canvas, doc):
+    """onPage callback: centred page number in the bottom margin."""
+    canvas.saveState()
+    canvas.setFont(PDF_FONT_NAME_DEFAULT, 9)
+    canvas.drawCentredString(doc.pagesize[0] / 2.0, 0.5 * inch, str(canvas.getPageNumber()))
+    canvas.restoreState()
+
+
+def _resolve_page_size(page_size_name):
+    if page_size_name not in PAGE_SIZES:
+        print(f"DEBUG (pdf_generator): Unknown page size '{page_size_name}'. Using default 'Letter'.")
+        page_size_name = "Letter"
+    return PAGE_SIZES[page_size_name]
+
+
+def _ensure_output_dir(filename):
+    """ReportLab doesn't create directories. Returns an error message or None."""
+    output_dir = os.path.dirname(filename)
+    if output_dir and not os.path.exists(output_dir):
+        try:
+            os.makedirs(output_dir)
+            print(f"DEBUG (pdf_generator): Created directory '{output_dir}'")
+        except Exception as e:
+            error_msg = f"Failed to create directory for PDF '{output_dir}': {e}"
+            print(f"ERROR (pdf_generator): {error_msg}")
+            return error_msg
+    return None
+
+
+def generate_pdf(text, filename="output.pdf", page_size_name="Letter", font_size=PDF_FONT_SIZE_DEFAULT,
+                 page_numbers=PDF_PAGE_NUMBERS_DEFAULT, outline=PDF_OUTLINE_DEFAULT, reproducible=PDF_REPRODUCIBLE):
+    """
+    Generates a formatted PDF from a text string using ReportLab's platypus.
+    Parses simple Markdown-like headings (#, ##, ###) and bullet list items (*, -).
+    Lines starting with numbers (e.g., "1. Item") are treated as normal paragraphs.
+    `text` may also be a Document (e.g. straight from an extractor), which is rendered without re-parsing.
+    reproducible fixes the creation date and document ID, so the same text gives a byte-identical file.
+    Includes enhanced error reporting.
+    """
+    print(f"DEBUG (pdf_generator): generate_pdf started for '{filename}' with font_size {font_size}.") # DEBUG
+
+    current_page_size = _resolve_page_size(page_size_name)
+
+    # --- Ensure filename path exists (ReportLab doesn't create directories) ---
+    dir_error = _ensure_output_dir(filename)
+    if dir_error: return False, dir_error
+
+    doc = _TrackingDocTemplate(filename, write_outline=outline, reproducible=reproducible, pagesize=current_page_size)
+
+    try: # Wrap style definition in try block in case of font issues later
+        styles = _build_styles(font_size)
+    except Exception as e:
+        error_msg = f"Error setting up ReportLab styles (check font '{PDF_FONT_NAME_DEFAULT}?): {e}"
+        print(f"ERROR (pdf_generator): {error_msg}")
+        return False, error_msg
+
+    with profiling.stage("layout"): story = _build_story(as_document(text), styles)
+
+    if not story:
+        story.append(Paragraph("The processed text was empty or resulted in no valid PDF content.", styles["normal"]))
+        print("DEBUG (pdf_generator): Story was empty, added default paragraph.")
+
+    print(f"DEBUG (pdf_generator): Attempting doc.build(story) with {len(story)} flowables...")
+
+    # --- Build Phase ---
+    try:
+        with profiling.stage("build"):
+            if page_numbers: doc.build(story, onFirstPage=_draw_page_number, onLaterPages=_draw_page_number)
+            else: doc.build(story)
+        print(f"DEBUG (pdf_generator): doc.build successful for '{filename}'")
+        return True, f"PDF successfully created: {os.path.basename(filename)}"
+    except Exception as e:
+        # --- More Detailed Error Reporting ---
+        error_details = traceback.format_exc()
+        full_error_msg = f"Error creating PDF (ReportLab doc.build failed for '{filename}'): {e}\nDetails:\n{error_details}"
+        print(f"ERROR (pdf_generator): {full_error_msg}")
+        # Try to provide a snippet of the story around where it might have failed (advanced)
+        # story_repr = [repr(f)[:100] + ('...' if len(repr(f)) > 100 else '') for f in story]
+        # print(f"DEBUG (pdf_generator): Story content (first/last few items):\n{story_repr[:5]}\n...\n{story_repr[-5:]}")
+        return False, f"Error creating PDF (ReportLab build failed): {e}" # Return simpler message to UI
+
+
+# --- Preview & Page-Count Estimate ---
+
+class _PreviewLimitReached(Exception):
+    """Raised by _PreviewDocTemplate to stop layout once enough pages are done."""
+
+class _PreviewDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that stops the build after max_pages pages."""
+    def __init__(self, filename, max_pages, **kw):
+        super().__init__(filename, **kw)
+        self.max_pages = max_pages
+
+    def handle_pageBegin(self):
+        # self.page is the number of pages already finished (and shown) at this point
+        if self.page >= self.max_pages: raise _PreviewLimitReached()
+        super().handle_pageBegin()
+
+
+def generate_preview(text, page_size_name="Letter", font_size=PDF_FONT_SIZE_DEFAULT, max_pages=PDF_PREVIEW_MAX_PAGES):
+    """
+    Lays out only the first max_pages pages of the document into an in-memory PDF.
+    The rest of the story is never laid out, so this is fast even for huge documents.
+
+    Returns:
+        tuple: (success: bool, pdf_bytes_or_error: bytes or str, pages_rendered: int)
+    """
+    buffer = io.BytesIO()
+    try:
+        doc = _PreviewDocTemplate(buffer, max_pages, pagesize=_resolve_page_size(page_size_name))
+        # Only the leading blocks can reach the first pages: 10,000 characters is more than
+        # one page holds at the smallest font size, so the rest is never turned into flowables.
+        document = as_document(text); char_budget = max_pages * 10000; used_chars = 0; block_count = 0
+        for block in document.blocks:
+            if used_chars > char_budget: break
+            used_chars += block.char_count(); block_count += 1
+        story = _build_story(Document(document.blocks[:block_count]), _build_styles(font_size))
+        if not story: return False, "Nothing to preview: the text produced no PDF content.", 0
+        try:
+            doc.build(story)
+        except _PreviewLimitReached:
+            doc.canv.save() # Finish the truncated document; the pending empty page is dropped
+        return True, buffer.getvalue(), min(doc.page, max_pages)
+    except Exception as e:
+        print(f"ERROR (pdf_generator): Preview failed: {e}\n{traceback.format_exc()}")
+        return False, f"Error creating preview: {e}", 0
+
+
+def estimate_page_count(text, page_size_name="Letter", font_size=PDF_FONT_SIZE_DEFAULT):
+    """
+    Fast page-count estimate without running the layout engine.
+    Each paragraph, heading or list item is assumed to wrap at the average
+    character width of the font; the resulting line heights plus spacing are
+    summed and divided by the frame height. Accuracy is typically within
+    10-15% for running text.
+    """
+    page_width, page_height = _resolve_page_size(page_size_name)
+    # SimpleDocTemplate defaults: 1 inch margins, 6pt frame padding on each side
+    frame_width = page_width - 2 * inch - 12; frame_height = page_height - 2 * inch - 12
+    styles = _build_styles(font_size)
+    sample = "The quick brown fox jumps over the lazy dog, then rests. 0123456789"
+    average_char_width = stringWidth(sample, PDF_FONT_NAME_DEFAULT, 1) / len(sample)
+    tag_pattern = re.compile(r'<[^>]+>')
+
+    def text_height(markup, style, width):
+        plain_length = len(tag_pattern.sub('', markup))
+        chars_per_line = max(1, int(width / (average_char_width * style.fontSize)))
+        return math.ceil(plain_length / chars_per_line) * style.leading
+
+    heading_styles = {1: styles["h1"], 2: styles["h2"], 3: styles["h3"]}
+    paragraph_space = PDF_PARAGRAPH_SPACE_INCHES * inch
+    total_height = 0.0; paragraph_parts = []; in_list = False
+
+    def flush_paragraph():
+        nonlocal total_height, paragraph_parts
+        if paragraph_parts:
+            total_height += text_height(" ".join(paragraph_parts), styles["normal"], frame_width) + paragraph_space
+            paragraph_parts = []
+
+    for block in as_document(text).blocks:
+        kind = block.kind
+        if in_list and kind != BULLET: total_height += paragraph_space * 0.5; in_list = False
+        if kind == PARAGRAPH: paragraph_parts.append(block.inline_markup()); continue
+        flush_paragraph()
+        if kind == HEADING:
+            heading_text = block.inline_markup()
+            if heading_text:
+                style = heading_styles[block.level]
+                total_height += style.spaceBefore + text_height(heading_text, style, frame_width) + style.spaceAfter
+        elif kind == BULLET:
+            total_height += text_height(block.inline_markup(), styles["list_item"], frame_width - PDF_BULLET_INDENT_POINTS); in_list = True
+    flush_paragraph()
+    return max(1, math.ceil(total_height / frame_height))
+
+
+# --- Parallel Rendering ---
+
+def split_into_sections(document, min_chunk_chars=PDF_PARALLEL_MIN_CHUNK_CHARS):
+    """
+    Splits a Document before every H1/H2 heading and groups consecutive
+    sections into chunks of at least min_chunk_chars characters.
+    Each chunk starts with a heading (except possibly the first) so it can be
+    laid out independently. Returns a list of Documents.
+    """
+    sections = []; current = []
+    for block in document.blocks:
+        if block.kind == HEADING and block.level <= 2 and current:
+            sections.append(current); current = []
+        current.append(block)
+    if current: sections.append(current)
+
+    chunks = []; buffer = []; buffer_chars = 0
+    for section in sections:
+        buffer.extend(section); buffer_chars += sum(block.char_count() for block in section)
+        if buffer_chars >= min_chunk_chars:
+            chunks.append(buffer); buffer = []; buffer_chars = 0
+    if buffer:
+        # A short tail is folded into the previous chunk rather than getting its own pages
+        if chunks: chunks[-1].extend(buffer)
+        else: chunks.append(buffer)
+    return [Document(blocks) for blocks in chunks]
+
+
+def _render_section(chunk_index, chunk_document, output_path, page_size_name, font_size):
+    """
+    Process pool entry point: lays out one chunk into its own PDF file.
+    Returns (chunk_index, page_count, headings, error_message_or_None).
+    """
+    try:
+        doc = _TrackingDocTemplate(output_path, pagesize=_resolve_page_size(page_size_name))
+        styles = _build_styles(font_size)
+        story = _build_story(chunk_document, styles)
+        if not story: return chunk_index, 0, [], None
+        doc.build(story)
+        return chunk_index, doc.page, doc.headings, None
+    except Exception as e:
+        return chunk_index, 0, [], f"{e}\n{traceback.format_exc()}"
+
+
+def _stamp_page_numbers(writer, work_dir):
+    """Overlays a centred, document-wide page number on every page of the merged writer."""
+    overlay_path = os.path.join(work_dir, "page_numbers.pdf")
+    overlay = rl_canvas.Canvas(overlay_path)
+    for page_number, page in enumerate(writer.pages, start=1):
+        width = float(page.mediabox.width); height = float(page.mediabox.height)
+        overlay.setPageSize((width, height))
+        overlay.setFont(PDF_FONT_NAME_DEFAULT, 9)
+        overlay.drawCentredString(width / 2.0, 0.5 * inch, str(page_number))
+        overlay.showPage()
+    overlay.save()
+    overlay_reader = PdfReader(overlay_path)
+    for page, overlay_page in zip(writer.pages, overlay_reader.pages):
+        page.merge_page(overlay_page)
+
+
+def generate_pdf_parallel(text, filename="output.pdf", page_size_name="Letter", font_size=PDF_FONT_SIZE_DEFAULT,
+                          page_numbers=PDF_PAGE_NUMBERS_DEFAULT, outline=PDF_OUTLINE_DEFAULT,
+                          max_workers=PDF_PARALLEL_MAX_WORKERS, min_chunk_chars=PDF_PARALLEL_MIN_CHUNK_CHARS, reproducible=PDF_REPRODUCIBLE):
+    """
+    Generates the same content as generate_pdf, with a page break before each H1/H2
+    chunk: the chunks are laid out in a process pool and the resulting pages are
+    merged with pypdf, so pagination differs from the serial path. Page numbers and
+    the outline are applied to the merged document afterwards, so they are document-wide.
+
+    Falls back to generate_pdf when pypdf is not installed or the document
+    only yields a single chunk.
+
+    Returns:
+        tuple: (success: bool, message: str), like generate_pdf.
+    """
+    with profiling.stage("layout"):
+        document = as_document(text)
+        chunks = split_into_sections(document, min_chunk_chars)
+    if PdfWriter is None or len(chunks) < 2:
+        reason = "pypdf not installed" if PdfWriter is None else "document has a single chunk"
+        print(f"DEBUG (pdf_generator): Parallel render skipped ({reason}). Using generate_pdf.")
+        return generate_pdf(document, filename, page_size_name=page_size_name, font_size=font_size, page_numbers=page_numbers, outline=outline, reproducible=reproducible)
+
+    print(f"DEBUG (pdf_generator): generate_pdf_parallel started for '{filename}' with {len(chunks)} chunks.") # DEBUG
+    dir_error = _ensure_output_dir(filename)
+    if dir_error: return False, dir_error
+
+    work_dir = tempfile.mkdtemp(prefix="formatai_pdf_")
+    try:
+        results = {}
+        with profiling.stage("build"), ProcessPoolExecutor(max_workers=max_workers) as executor: # Worker processes are timed, not profiled
+            futures = [
+                executor.submit(_render_section, idx, chunk, os.path.join(work_dir, f"chunk_{idx:05d}.pdf"), page_size_name, font_size)
+                for idx, chunk in enumerate(chunks)
+            ]
+            for future in as_completed(futures):
+                chunk_index, page_count, headings, error = future.result()
+                if error:
+                    print(f"ERROR (pdf_generator): Chunk {chunk_index} failed: {error}")
+                    for pending in futures: pending.cancel()
+                    return False, f"Error creating PDF (parallel render of section {chunk_index + 1} failed): {error.splitlines()[0]}"
+                results[chunk_index] = (page_count, headings)
+
+        # --- Merge Phase ---
+        writer = PdfWriter()
+        outline_entries = [] # (level, title, global_page_index)
+        for idx in range(len(chunks)):
+            page_count, headings = results[idx]
+            if not page_count: continue
+            page_offset = len(writer.pages)
+            for page in PdfReader(os.path.join(work_dir, f"chunk_{idx:05d}.pdf")).pages:
+                writer.add_page(page)
+            for level, title, page_number in headings:
+                outline_entries.append((level, title, page_offset + page_number - 1))
+
+        if not writer.pages:
+            return generate_pdf(document, filename, page_size_name=page_size_name, font_size=font_size, page_numbers=page_numbers, outline=outline, reproducible=reproducible)
+
+        if page_numbers: _stamp_page_numbers(writer, work_dir)
+        if outline:
+            parent = None
+            for level, title, page_index in outline_entries:
+                if level == 0: parent = writer.add_outline_item(title, page_index)
+                else: writer.add_outline_item(title, page_index, parent=parent)
+
+        with open(filename, "wb") as output_file:
+            writer.write(output_file)
+        print(f"DEBUG (pdf_generator): Parallel render merged {len(writer.pages)} pages into '{filename}'")
+        return True, f"PDF successfully created: {os.path.basename(filename)}"
+    except Exception as e:
+        error_details = traceback.format_exc()
+        print(f"ERROR (pdf_generator): Parallel render failed for '{filename}': {e}\nDetails:\n{error_details}")
+        return False, f"Error creating PDF (parallel render failed): {e}"
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# --- Standalone Test ---
+if __name__ == '__main__':
+    # ... (standalone test code remains the same) ...
+    print("Running PDF generator standalone test...")
+    sample_formatted_text = """# Title\n\nPara 1.\n\n* Item 1\n* Item 2 with <b>bold</b>\n\n## H2\n\nPara 2."""
+    output_file = "standalone_pdf_test_debug.pdf"
+    success, message = generate_pdf(sample_formatted_text, output_file, page_size_name="A4", font_size=11)
+    print(message)
+    success, message = generate_pdf_parallel(sample_formatted_text * 50, "standalone_pdf_test_parallel.pdf", page_size_name="A4", font_size=11, page_numbers=True, outline=True, min_chunk_chars=200)
+    print(message)
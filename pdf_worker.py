@@ -1,53 +1,89 @@
-# pdf_worker.py
-
-from PyQt6.QtCore import QThread, pyqtSignal
-import os
-import traceback # Import traceback
-
-# Import the PDF generation function
-from pdf_generator import generate_pdf
-
-class PDFWorker(QThread):
-    """
-    Worker thread for running PDF generation in the background.
-    """
-    finished = pyqtSignal(bool, str)
-
-    def __init__(self, text_to_convert, filename, page_size_name, font_size):
-        super().__init__()
-        self.text_to_convert = text_to_convert
-        self.filename = filename
-        self.page_size_name = page_size_name
-        self.font_size = font_size
-        self._is_running = True 
-
-    def run(self):
-        """
-        The main entry point for the thread. Calls the PDF generator.
-        """
-        print(f"DEBUG (PDFWorker): run() started for '{self.filename}'.") # DEBUG
-        if not self._is_running:
-            print("DEBUG (PDFWorker): cancelled before starting.") # DEBUG
-            self.finished.emit(False, "PDF generation cancelled before starting.")
-            return
-
-        try:
-            print(f"DEBUG (PDFWorker): Calling generate_pdf...") # DEBUG
-            # Perform the PDF generation
-            success, message = generate_pdf(
-                self.text_to_convert,
-                self.filename,
-                page_size_name=self.page_size_name,
-                font_size=self.font_size
-            )
-            print(f"DEBUG (PDFWorker): generate_pdf returned: success={success}, message='{message[:100]}...'") # DEBUG
-            self.finished.emit(success, message)
-            print(f"DEBUG (PDFWorker): finished signal emitted (success={success}).") # DEBUG
-
-        except Exception as e:
-            # Catch any unexpected errors DURING the generate_pdf call or thread execution
-            error_details = traceback.format_exc()
-            error_msg = f"Unexpected error during PDF generation thread: {e}\nDetails:\n{error_details}"
-            print(f"ERROR (PDFWorker): {error_msg}") # DEBUG
-            # Emit failure signal with detailed error for logging
-            self.finished.emit(False, f"Unexpected thread error: {e}") 
\ No newline at end of file
+# pdf_worker.py
+
+from PyQt6.QtCore import QThread, pyqtSignal
+import os
+import traceback # Import traceback
+
+import profiling
+from config import PDF_REPRODUCIBLE
+
+# The PDF generation functions are imported in run(): pdf_generator pulls in reportlab,
+# which should not slow down application startup.
+
+class PDFWorker(QThread):
+    """
+    Worker thread for running PDF generation in the background.
+    """
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self, text_to_convert, filename, page_size_name, font_size, parallel=False, reproducible=PDF_REPRODUCIBLE):
+        super().__init__()
+        self.text_to_convert = text_to_convert
+        self.filename = filename
+        self.page_size_name = page_size_name
+        self.font_size = font_size
+        self.parallel = parallel # Lay out sections in a process pool (generate_pdf_parallel)
+        self.reproducible = reproducible # Fixed creation date and document ID (see generate_pdf)
+        self._is_running = True 
+
+    def run(self):
+        """
+        The main entry point for the thread. Calls the PDF generator.
+        """
+        print(f"DEBUG (PDFWorker): run() started for '{self.filename}'.") # DEBUG
+        if not self._is_running:
+            print("DEBUG (PDFWorker): cancelled before starting.") # DEBUG
+            self.finished.emit(False, "PDF generation cancelled before starting.")
+            return
+
+        try:
+            from pdf_generator import generate_pdf, generate_pdf_parallel
+            generator = generate_pdf_parallel if self.parallel else generate_pdf
+            print(f"DEBUG (PDFWorker): Calling {generator.__name__}...") # DEBUG
+            # Perform the PDF generation
+            with profiling.job(f"pdf-{os.path.basename(self.filename)}") as profile:
+                success, message = generator(
+                    self.text_to_convert,
+                    self.filename,
+                    page_size_name=self.page_size_name,
+                    font_size=self.font_size,
+                    reproducible=self.reproducible
+                )
+            if profile and profile.directory: message += f" (profile: {profile.directory})"
+            print(f"DEBUG (PDFWorker): generate_pdf returned: success={success}, message='{message[:100]}...'") # DEBUG
+            self.finished.emit(success, message)
+            print(f"DEBUG (PDFWorker): finished signal emitted (success={success}).") # DEBUG
+
+        except Exception as e:
+            # Catch any unexpected errors DURING the generate_pdf call or thread execution
+            error_details = traceback.format_exc()
+            error_msg = f"Unexpected error during PDF generation thread: {e}\nDetails:\n{error_details}"
+            print(f"ERROR (PDFWorker): {error_msg}") # DEBUG
+            # Emit failure signal with detailed error for logging
+            self.finished.emit(False, f"Unexpected thread error: {e}")
+
+
+class PreviewWorker(QThread):
+    """
+    Worker thread that lays out only the first pages of the document (in memory)
+    and estimates the total page count, for quick feedback before a full build.
+    """
+    # Arguments: success (bool), pdf_bytes_or_error (object: bytes or str), estimated_pages (int)
+    finished = pyqtSignal(bool, object, int)
+
+    def __init__(self, text_to_convert, page_size_name, font_size, max_pages=1):
+        super().__init__()
+        self.text_to_convert = text_to_convert
+        self.page_size_name = page_size_name
+        self.font_size = font_size
+        self.max_pages = max_pages
+
+    def run(self):
+        try:
+            from pdf_generator import generate_preview, estimate_page_count
+            estimated_pages = estimate_page_count(self.text_to_convert, self.page_size_name, self.font_size)
+            success, pdf_bytes_or_error, _ = generate_preview(self.text_to_convert, self.page_size_name, self.font_size, self.max_pages)
+            self.finished.emit(success, pdf_bytes_or_error, estimated_pages)
+        except Exception as e:
+            print(f"ERROR (PreviewWorker): {e}\n{traceback.format_exc()}")
+            self.finished.emit(False, f"Unexpected preview error: {e}", 0)
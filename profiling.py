@@ -0,0 +1,216 @@
+# profiling.py
+
+# Opt-in profiling of the conversion pipeline (--profile on main.py, batch.py and service.py,
+# or PROFILING_ENABLED). One unit of work (a file load, an AI run, a PDF build, a service job)
+# is wrapped in profiling.job(label) and each pipeline stage inside it in profiling.stage(name):
+#   extract, tokenize, http, postprocess, layout, build
+# Every job gets its own directory under PROFILE_DIR with:
+#   <stage>.prof      cProfile dump of the stage (python -m pstats, snakeviz, ...)
+#   stacks.collapsed  sampled call stacks, "job;stage:name;module:function;... count" per line,
+#                     for flamegraph.pl, speedscope or inferno
+#   report.txt        wall/CPU time, calls, allocation growth and peak per stage, the top
+#                     functions of each stage and the largest allocation sites still alive
+# Nested stages pause the enclosing stage's profiler, so each stage reports its own time.
+# Memory figures come from tracemalloc and include other threads when jobs run concurrently.
+# From Python 3.12, cProfile hooks are process-wide and only one profiler can be active: a stage
+# entered while another job's profiler runs is timed but not profiled (noted in report.txt).
+# Stages run in worker processes (parallel PDF rendering) are timed but not profiled inside.
+#
+# When profiling is off, job() and stage() return a shared no-op context manager.
+
+import os
+import re
+import sys
+import time
+import threading
+import contextlib
+
+from config import PROFILING_ENABLED, PROFILE_DIR, PROFILE_SAMPLE_INTERVAL_SECONDS, PROFILE_TOP_FUNCTIONS
+
+_enabled = PROFILING_ENABLED
+_profile_dir = PROFILE_DIR
+_NULL_CONTEXT = contextlib.nullcontext()
+_local = threading.local() # .job: the JobProfile running on this thread
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0 # Jobs in progress; tracing stops with the last one
+_job_counter = 0
+
+FRAME_LABEL_UNSAFE = re.compile(r"[;\s]") # Separators of the collapsed-stack format, replaced in labels
+
+def enable(directory=None):
+    """Turns profiling on for the rest of the process. Dumps go to directory (default PROFILE_DIR)."""
+    global _enabled, _profile_dir
+    _enabled = True
+    if directory: _profile_dir = directory
+    print(f"DEBUG (profiling): Profiling enabled, writing to '{_profile_dir}'.")
+
+def is_enabled():
+    return _enabled
+
+def job(label):
+    """
+    Context manager profiling one job on the current thread. Yields the JobProfile (its
+    `directory` is set once the dumps are written), or None when profiling is off or a job
+    is already running on this thread (stages then count towards that job).
+    """
+    if not _enabled or getattr(_local, "job", None) is not None: return _NULL_CONTEXT
+    return JobProfile(label)
+
+def stage(name):
+    """Context manager timing and profiling one pipeline stage of the current thread's job."""
+    if not _enabled: return _NULL_CONTEXT
+    profile = getattr(_local, "job", None)
+    if profile is None: return _NULL_CONTEXT
+    return profile.stage(name)
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    import tracemalloc
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing(): tracemalloc.start()
+        _tracemalloc_users += 1
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    import tracemalloc
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0: tracemalloc.stop()
+
+def _try_enable(profiler):
+    """Enables a stage profiler. Returns False if another profiler is already active (Python 3.12+)."""
+    try: profiler.enable(); return True
+    except ValueError: return False
+
+class _StageStats:
+    __slots__ = ("profiler", "calls", "unprofiled_calls", "wall_seconds", "cpu_seconds", "alloc_bytes", "peak_bytes")
+
+    def __init__(self):
+        import cProfile
+        self.profiler = cProfile.Profile()
+        self.calls = 0; self.unprofiled_calls = 0 # Calls not (fully) profiled because another profiler was active
+        self.wall_seconds = 0.0; self.cpu_seconds = 0.0
+        self.alloc_bytes = 0; self.peak_bytes = 0
+
+class JobProfile:
+    """Collects the stage profiles and stack samples of one job and writes them on exit."""
+
+    def __init__(self, label):
+        self.label = label
+        self.directory = None
+        self.stages = {} # name -> _StageStats, in first-use order
+        self._active = [] # [name, traced bytes at entry, peak seen so far, profiler running] for each open stage
+        self._samples = {} # collapsed stack -> count
+        self._sampling = threading.Event()
+
+    # --- Job ---
+
+    def __enter__(self):
+        import tracemalloc
+        _start_tracemalloc()
+        self._start_snapshot = tracemalloc.take_snapshot()
+        self._thread_id = threading.get_ident()
+        self._start_wall = time.perf_counter(); self._start_cpu = time.thread_time()
+        self._sampler = threading.Thread(target=self._sample_stacks, name="profiling-sampler", daemon=True)
+        self._sampler.start()
+        _local.job = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        import tracemalloc
+        _local.job = None
+        wall_seconds = time.perf_counter() - self._start_wall; cpu_seconds = time.thread_time() - self._start_cpu
+        self._sampling.set(); self._sampler.join()
+        allocation_sites = tracemalloc.take_snapshot().compare_to(self._start_snapshot, "lineno")
+        _stop_tracemalloc()
+        try: self._write(wall_seconds, cpu_seconds, allocation_sites)
+        except OSError as e: print(f"WARNING (profiling): Could not write the profile for '{self.label}': {e}")
+        return False
+
+    # --- Stages ---
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if any(entry[0] == name for entry in self._active): yield; return # Re-entered stage: already measured
+        import tracemalloc
+        stats = self.stages.get(name)
+        if stats is None: stats = self.stages[name] = _StageStats()
+        traced, peak = tracemalloc.get_traced_memory()
+        if self._active:
+            outer = self._active[-1]
+            outer[2] = max(outer[2], peak)
+            if outer[3]: self.stages[outer[0]].profiler.disable()
+        tracemalloc.reset_peak()
+        entry = [name, traced, traced, False]; self._active.append(entry)
+        start_wall = time.perf_counter(); start_cpu = time.thread_time()
+        entry[3] = _try_enable(stats.profiler)
+        if not entry[3]: stats.unprofiled_calls += 1
+        try: yield
+        finally:
+            if entry[3]: stats.profiler.disable()
+            stats.calls += 1
+            stats.wall_seconds += time.perf_counter() - start_wall; stats.cpu_seconds += time.thread_time() - start_cpu
+            traced_after, peak = tracemalloc.get_traced_memory()
+            peak = max(entry[2], peak)
+            stats.alloc_bytes += traced_after - entry[1]
+            stats.peak_bytes = max(stats.peak_bytes, peak - entry[1])
+            self._active.pop()
+            if self._active:
+                outer = self._active[-1]
+                outer[2] = max(outer[2], peak)
+                if outer[3] and not _try_enable(self.stages[outer[0]].profiler):
+                    outer[3] = False; self.stages[outer[0]].unprofiled_calls += 1
+
+    # --- Stack Sampling ---
+
+    def _sample_stacks(self):
+        while not self._sampling.wait(PROFILE_SAMPLE_INTERVAL_SECONDS):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None: continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                module = os.path.basename(code.co_filename).removesuffix(".py")
+                frames.append(FRAME_LABEL_UNSAFE.sub("_", f"{module}:{code.co_name}"))
+                frame = frame.f_back
+            frames.reverse()
+            stage_names = [f"stage:{entry[0]}" for entry in list(self._active)] or ["stage:(job)"]
+            key = ";".join([FRAME_LABEL_UNSAFE.sub("_", self.label)] + stage_names + frames)
+            self._samples[key] = self._samples.get(key, 0) + 1
+
+    # --- Output ---
+
+    def _write(self, wall_seconds, cpu_seconds, allocation_sites):
+        global _job_counter
+        import io
+        import pstats
+        with _tracemalloc_lock: _job_counter += 1; number = _job_counter
+        safe_label = re.sub(r"[^\w.-]+", "_", self.label)[:60]
+        directory = os.path.join(_profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{number}-{safe_label}")
+        os.makedirs(directory, exist_ok=True)
+
+        with open(os.path.join(directory, "stacks.collapsed"), 'w', encoding='utf-8') as f:
+            for key, count in sorted(self._samples.items()): f.write(f"{key} {count}\n")
+
+        mib = 1024 * 1024
+        lines = [f"Profile: {self.label}",
+                 f"Wall time: {wall_seconds:.3f}s, CPU time (job thread): {cpu_seconds:.3f}s, stack samples: {sum(self._samples.values())}", "",
+                 f"{'Stage':<14} {'Calls':>6} {'Wall s':>9} {'CPU s':>9} {'Alloc MiB':>10} {'Peak MiB':>9}"]
+        for name, stats in self.stages.items():
+            lines.append(f"{name:<14} {stats.calls:>6} {stats.wall_seconds:>9.3f} {stats.cpu_seconds:>9.3f} {stats.alloc_bytes / mib:>10.2f} {stats.peak_bytes / mib:>9.2f}")
+        for name, stats in self.stages.items():
+            if stats.unprofiled_calls:
+                lines.append(f"Note: {stats.unprofiled_calls} of {stats.calls} '{name}' call(s) not profiled (another job's profiler was active); times and memory above are complete.")
+        for name, stats in self.stages.items():
+            stats.profiler.dump_stats(os.path.join(directory, f"{name}.prof"))
+            stream = io.StringIO()
+            try: pstats.Stats(stats.profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            except TypeError: stream.write("(no calls recorded)\n") # pstats refuses empty profiles
+            lines += ["", f"=== Stage '{name}': top functions by cumulative time ===", stream.getvalue().strip()]
+        lines += ["", "=== Largest allocation sites still alive at the end of the job ==="]
+        lines += [str(site) for site in allocation_sites[:PROFILE_TOP_FUNCTIONS]]
+        with open(os.path.join(directory, "report.txt"), 'w', encoding='utf-8') as f: f.write("\n".join(lines) + "\n")
+
+        self.directory = directory
+        print(f"DEBUG (profiling): Profile for '{self.label}' written to '{directory}'.")
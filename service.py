@@ -0,0 +1,277 @@
+# service.py
+
+# Local HTTP service exposing the conversion pipeline to several users and scripts.
+# One long-running process keeps the expensive state warm: the tokenizer, the HTTP session
+# to LM Studio (with a model warm-up at start), the cached PDF styles and the extraction cache.
+#
+#   python service.py [--host 127.0.0.1] [--port 8765] [--workers 2]
+#
+# API (JSON unless noted):
+#   POST /jobs              {"text": "..."} or {"filename": "memo.docx", "content_base64": "..."}
+#                           optional: "prompt" (predefined name), "prompt_text", "mode"
+#                           ("AI Format" / "Auto" / "Direct Render"), "page_size", "font_size",
+#                           "page_numbers", "outline", "compact"  ->  202 {"id": ..., "status": "queued"}
+#   GET  /jobs/<id>         job status
+#   GET  /jobs/<id>/pdf     the PDF (application/pdf) once the job is done
+#   GET  /health            queue length and warm-state flags
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import base64
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import (SERVICE_HOST, SERVICE_PORT, SERVICE_WORKER_THREADS, SERVICE_MAX_REQUEST_BYTES,
+                    SERVICE_MAX_FINISHED_JOBS, SERVICE_WORK_DIR, PDF_PAGE_SIZE_OPTIONS,
+                    PDF_PAGE_SIZE_DEFAULT, PDF_FONT_SIZE_DEFAULT, PDF_PAGE_NUMBERS_DEFAULT,
+                    PDF_OUTLINE_DEFAULT, PROCESSING_MODE_AI, PROCESSING_MODE_AUTO,
+                    PROCESSING_MODE_OPTIONS, DIRECT_RENDER_SCORE_THRESHOLD,
+                    DEFAULT_PROMPT, INPUT_COMPACTION_ENABLED)
+from prompts import PREDEFINED_PROMPTS
+from extractors import EXTRACTORS, extract_file
+from document_model import as_markup
+from format_validator import score_structure
+from tokens import get_tokenizer, is_tokenizer_loaded, count_tokens
+from ai_processor import process_text_with_ai, warm_up_model
+from pdf_generator import generate_pdf
+import profiling
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class Job:
+    """One conversion request and its outcome."""
+    def __init__(self, text, upload_path, prompt_instruction, mode, page_size, font_size, page_numbers, outline, compact=INPUT_COMPACTION_ENABLED):
+        self.id = uuid.uuid4().hex
+        self.text = text # Markup string, or None for an uploaded file
+        self.upload_path = upload_path # Stored upload (.docx/.pptx), or None
+        self.prompt_instruction = prompt_instruction
+        self.mode = mode
+        self.page_size = page_size
+        self.font_size = font_size
+        self.page_numbers = page_numbers
+        self.outline = outline
+        self.compact = compact # Input compaction before the AI request (see compaction.py)
+        self.status = QUEUED
+        self.message = ""
+        self.pdf_path = None
+        self.input_tokens = None
+        self.used_ai = None
+        self.repair_stats = {} # Formatting repair counts (see ai_processor.repair_formatting)
+        self.profile_dir = None # Set when the service runs with --profile
+        self.created = time.time(); self.started = None; self.finished = None
+
+    def to_dict(self):
+        return {
+            "id": self.id, "status": self.status, "message": self.message, "mode": self.mode,
+            "used_ai": self.used_ai, "input_tokens": self.input_tokens, "repairs": self.repair_stats, "compact": self.compact,
+            "created": self.created, "started": self.started, "finished": self.finished, "profile": self.profile_dir,
+        }
+
+class ConversionService:
+    """Job queue, worker threads and job table shared by all HTTP handler threads."""
+    def __init__(self, work_dir=SERVICE_WORK_DIR, worker_threads=SERVICE_WORKER_THREADS):
+        self.work_dir = work_dir
+        self.upload_dir = os.path.join(work_dir, "uploads"); self.output_dir = os.path.join(work_dir, "output")
+        os.makedirs(self.upload_dir, exist_ok=True); os.makedirs(self.output_dir, exist_ok=True)
+        self.jobs = {} # id -> Job, in submission order
+        self._jobs_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._render_lock = threading.Lock() # ReportLab keeps module-level state; LLM calls overlap, layouts do not
+        self._workers = [threading.Thread(target=self._worker_loop, name=f"job-worker-{i + 1}", daemon=True) for i in range(worker_threads)]
+        self.model_warm = False
+
+    def start(self):
+        for worker in self._workers: worker.start()
+        threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+
+    def _warm_up(self):
+        """Loads the tokenizer and primes the model once, so the first job does not pay for it."""
+        try: get_tokenizer(); print("Service: tokenizer loaded.")
+        except Exception as e: print(f"WARNING (service): Tokenizer unavailable, token counts are word estimates: {e}")
+        success, message = warm_up_model()
+        self.model_warm = success
+        print(f"Service: {message}")
+
+    # --- Jobs ---
+    def store_upload(self, filename, content):
+        """
+        Saves uploaded bytes under their content hash, so re-sending the same file
+        reuses the same path and therefore hits the extraction cache.
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension not in EXTRACTORS: raise ValueError(f"Unsupported file type: {extension or filename}")
+        upload_path = os.path.join(self.upload_dir, hashlib.sha256(content).hexdigest() + extension)
+        if not os.path.exists(upload_path):
+            temp_path = upload_path + ".tmp"
+            with open(temp_path, 'wb') as f: f.write(content)
+            os.replace(temp_path, upload_path)
+        return upload_path
+
+    def submit(self, job):
+        with self._jobs_lock: self.jobs[job.id] = job
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        with self._jobs_lock: return self.jobs.get(job_id)
+
+    def queued_count(self):
+        return self._queue.qsize()
+
+    def _prune_finished(self):
+        """Drops the oldest finished jobs (and their PDFs) beyond SERVICE_MAX_FINISHED_JOBS."""
+        with self._jobs_lock:
+            finished = [job for job in self.jobs.values() if job.status in (DONE, FAILED)]
+            for job in finished[:max(0, len(finished) - SERVICE_MAX_FINISHED_JOBS)]:
+                del self.jobs[job.id]
+                if job.pdf_path:
+                    try: os.remove(job.pdf_path)
+                    except OSError: pass
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            job.status = RUNNING; job.started = time.time()
+            try:
+                with profiling.job(f"job-{job.id}") as profile: self._run_job(job)
+                if profile: job.profile_dir = profile.directory
+            except Exception as e: job.status = FAILED; job.message = f"Unexpected error: {e}"
+            job.finished = time.time()
+            print(f"Service: job {job.id} {job.status} in {job.finished - job.started:.1f}s. {job.message}")
+            self._queue.task_done()
+            self._prune_finished()
+
+    def _run_job(self, job):
+        if job.upload_path: source, _ = extract_file(job.upload_path)
+        else: source = job.text
+        job.input_tokens = count_tokens(as_markup(source), get_tokenizer() if is_tokenizer_loaded() else None)
+
+        use_ai = job.mode == PROCESSING_MODE_AI
+        if job.mode == PROCESSING_MODE_AUTO:
+            score, _ = score_structure(source)
+            use_ai = score < DIRECT_RENDER_SCORE_THRESHOLD
+        job.used_ai = use_ai
+        if use_ai:
+            success, result = process_text_with_ai(source, job.prompt_instruction, stats=job.repair_stats, compact=job.compact)
+            if not success: job.status = FAILED; job.message = result; return
+            source = result
+
+        pdf_path = os.path.join(self.output_dir, f"{job.id}.pdf")
+        with self._render_lock:
+            success, message = generate_pdf(source, pdf_path, job.page_size, job.font_size, page_numbers=job.page_numbers, outline=job.outline)
+        job.message = message
+        if success: job.pdf_path = pdf_path; job.status = DONE
+        else: job.status = FAILED
+
+def job_from_request(service, body):
+    """Validates a POST /jobs body and builds the Job. Raises ValueError with a client-facing message."""
+    if not isinstance(body, dict): raise ValueError("Request body must be a JSON object.")
+    if body.get("content_base64") is not None:
+        filename = body.get("filename") or ""
+        try: content = base64.b64decode(body["content_base64"], validate=True)
+        except Exception: raise ValueError("content_base64 is not valid base64.")
+        text = None; upload_path = service.store_upload(filename, content)
+    elif isinstance(body.get("text"), str) and body["text"].strip(): text = body["text"].strip(); upload_path = None
+    else: raise ValueError("Provide 'text' or 'filename' + 'content_base64'.")
+
+    if body.get("prompt_text"): prompt_instruction = body["prompt_text"]
+    elif body.get("prompt"):
+        if body["prompt"] not in PREDEFINED_PROMPTS: raise ValueError(f"Unknown prompt '{body['prompt']}'.")
+        prompt_instruction = PREDEFINED_PROMPTS[body["prompt"]]
+    else: prompt_instruction = DEFAULT_PROMPT
+
+    mode = body.get("mode", PROCESSING_MODE_AI)
+    if mode not in PROCESSING_MODE_OPTIONS: raise ValueError(f"Unknown mode '{mode}'. Use one of: {', '.join(PROCESSING_MODE_OPTIONS)}.")
+    page_size = body.get("page_size", PDF_PAGE_SIZE_DEFAULT)
+    if page_size not in PDF_PAGE_SIZE_OPTIONS: raise ValueError(f"Unknown page size '{page_size}'.")
+    try: font_size = int(body.get("font_size", PDF_FONT_SIZE_DEFAULT))
+    except (TypeError, ValueError): raise ValueError("font_size must be a number.")
+    if not 6 <= font_size <= 48: raise ValueError("font_size must be between 6 and 48.")
+    return Job(text, upload_path, prompt_instruction, mode, page_size, font_size,
+               bool(body.get("page_numbers", PDF_PAGE_NUMBERS_DEFAULT)), bool(body.get("outline", PDF_OUTLINE_DEFAULT)),
+               bool(body.get("compact", INPUT_COMPACTION_ENABLED)))
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """Routes the HTTP API to the ConversionService attached to the server."""
+    server_version = "FormatAIPDF/1.0"
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json"); self.send_header("Content-Length", str(len(data)))
+        self.end_headers(); self.wfile.write(data)
+
+    def _job_or_404(self, job_id):
+        job = self.server.service.get(job_id)
+        if job is None: self._send_json(404, {"error": f"No job '{job_id}'."})
+        return job
+
+    def do_GET(self):
+        service = self.server.service
+        parts = [part for part in self.path.split('?')[0].split('/') if part]
+        if parts == ["health"]:
+            self._send_json(200, {"status": "ok", "queued": service.queued_count(), "tokenizer_loaded": is_tokenizer_loaded(), "model_warm": service.model_warm})
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self._job_or_404(parts[1])
+            if job: self._send_json(200, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "pdf":
+            job = self._job_or_404(parts[1])
+            if not job: return
+            if job.status != DONE: self._send_json(409, {"error": f"Job is {job.status}.", "status": job.status}); return
+            try:
+                with open(job.pdf_path, 'rb') as f: data = f.read()
+            except OSError: self._send_json(410, {"error": "PDF is no longer available."}); return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf"); self.send_header("Content-Length", str(len(data)))
+            self.send_header("Content-Disposition", f'attachment; filename="{job.id}.pdf"')
+            self.end_headers(); self.wfile.write(data)
+        else: self._send_json(404, {"error": "Not found."})
+
+    def do_POST(self):
+        if self.path.split('?')[0].rstrip('/') != "/jobs": self._send_json(404, {"error": "Not found."}); return
+        try: length = int(self.headers.get("Content-Length", 0))
+        except ValueError: length = -1
+        if length <= 0: self._send_json(411, {"error": "Content-Length required."}); return
+        if length > SERVICE_MAX_REQUEST_BYTES: self._send_json(413, {"error": f"Request larger than {SERVICE_MAX_REQUEST_BYTES} bytes."}); return
+        try:
+            body = json.loads(self.rfile.read(length).decode('utf-8'))
+            job = job_from_request(self.server.service, body)
+        except (UnicodeDecodeError, json.JSONDecodeError): self._send_json(400, {"error": "Body must be UTF-8 JSON."}); return
+        except ValueError as e: self._send_json(400, {"error": str(e)}); return
+        self.server.service.submit(job)
+        self._send_json(202, {"id": job.id, "status": job.status})
+
+    def log_message(self, format, *args):
+        print(f"Service: {self.address_string()} {format % args}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the FormatAI PDF conversion pipeline as a local HTTP service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=SERVICE_WORKER_THREADS, help="Jobs processed concurrently.")
+    parser.add_argument("--work-dir", default=SERVICE_WORK_DIR, help="Directory for uploads and generated PDFs.")
+    parser.add_argument("--profile", nargs="?", const="", metavar="DIR", help="Profile every job (dumps in DIR, default PROFILE_DIR).")
+    args = parser.parse_args(argv)
+    if args.profile is not None: profiling.enable(args.profile or None)
+
+    service = ConversionService(args.work_dir, max(1, args.workers)); service.start()
+    server = ThreadingHTTPServer((args.host, args.port), ServiceRequestHandler)
+    server.service = service
+    print(f"Service: listening on http://{args.host}:{args.port} with {max(1, args.workers)} worker thread(s).")
+    try: server.serve_forever()
+    except KeyboardInterrupt: print("Service: shutting down.")
+    finally: server.server_close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
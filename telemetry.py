@@ -0,0 +1,122 @@
+# telemetry.py
+
+# Persistent per-model throughput statistics for LM Studio requests.
+# Every completed request records its prompt/completion token counts, time to first token
+# and total time. The recent history gives prompt and generation speeds, which are used to
+# predict how long a job will take before it is sent (for the ETA on the status page) and
+# to produce a capacity report:
+#
+#   python telemetry.py [--prompt-tokens 3000] [--completion-tokens 1500]
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+
+from config import TELEMETRY_FILE, TELEMETRY_MAX_SAMPLES, LM_STUDIO_MODEL_NAME, AI_MAX_TOKENS
+
+# Used until a model has history of its own
+DEFAULT_PROMPT_TOKENS_PER_SECOND = 400.0
+DEFAULT_GENERATION_TOKENS_PER_SECOND = 20.0
+DEFAULT_REQUEST_OVERHEAD_SECONDS = 0.5
+DEFAULT_COMPLETION_RATIO = 1.0 # Completion tokens per prompt token (rewrites are about as long as the input)
+
+_lock = threading.Lock()
+_history = None # {model: [sample, ...]}, loaded on first use
+
+def _load():
+    global _history
+    if _history is None:
+        try:
+            with open(TELEMETRY_FILE, 'r', encoding='utf-8') as f: _history = json.load(f)
+            if not isinstance(_history, dict): _history = {}
+        except (OSError, ValueError): _history = {}
+    return _history
+
+def _save():
+    try:
+        os.makedirs(os.path.dirname(TELEMETRY_FILE), exist_ok=True)
+        temp_path = TELEMETRY_FILE + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f: json.dump(_history, f, separators=(',', ':'))
+        os.replace(temp_path, TELEMETRY_FILE)
+    except OSError as e:
+        print(f"WARNING (telemetry): Could not save telemetry to '{TELEMETRY_FILE}': {e}")
+
+def record_request(prompt_tokens, completion_tokens, first_token_seconds, total_seconds, model=LM_STUDIO_MODEL_NAME):
+    """
+    Stores one completed request. first_token_seconds may be None (non-streamed request),
+    in which case the sample only counts towards the overall time per token.
+    """
+    sample = {"time": time.time(), "prompt_tokens": int(prompt_tokens), "completion_tokens": int(completion_tokens),
+              "ttft": first_token_seconds, "total": total_seconds}
+    with _lock:
+        samples = _load().setdefault(model, [])
+        samples.append(sample)
+        del samples[:-TELEMETRY_MAX_SAMPLES]
+        _save()
+
+def model_stats(model=LM_STUDIO_MODEL_NAME):
+    """
+    Median throughput of a model's recent requests.
+
+    Returns:
+        dict: samples, prompt_tps, generation_tps, ttft (median seconds), completion_ratio.
+              Rates fall back to defaults when there is no usable history.
+    """
+    with _lock: samples = list(_load().get(model, []))
+    prompt_rates = []; generation_rates = []; ttfts = []; ratios = []
+    for sample in samples:
+        ttft = sample.get("ttft"); total = sample.get("total") or 0.0
+        prompt_tokens = sample.get("prompt_tokens", 0); completion_tokens = sample.get("completion_tokens", 0)
+        if ttft:
+            ttfts.append(ttft)
+            if prompt_tokens: prompt_rates.append(prompt_tokens / ttft)
+            if completion_tokens > 1 and total > ttft: generation_rates.append((completion_tokens - 1) / (total - ttft))
+        if prompt_tokens and completion_tokens: ratios.append(completion_tokens / prompt_tokens)
+    return {
+        "samples": len(samples),
+        "prompt_tps": statistics.median(prompt_rates) if prompt_rates else DEFAULT_PROMPT_TOKENS_PER_SECOND,
+        "generation_tps": statistics.median(generation_rates) if generation_rates else DEFAULT_GENERATION_TOKENS_PER_SECOND,
+        "ttft": statistics.median(ttfts) if ttfts else None,
+        "completion_ratio": statistics.median(ratios) if ratios else DEFAULT_COMPLETION_RATIO,
+    }
+
+def predict_request(prompt_tokens, max_tokens=AI_MAX_TOKENS, model=LM_STUDIO_MODEL_NAME, stats=None):
+    """
+    Predicts a request's timing from its prompt size.
+
+    Returns:
+        dict: first_token_seconds, completion_tokens (expected), generation_seconds, total_seconds.
+    """
+    stats = stats or model_stats(model)
+    completion_tokens = min(max_tokens, max(1, int(prompt_tokens * stats["completion_ratio"])))
+    first_token_seconds = DEFAULT_REQUEST_OVERHEAD_SECONDS + prompt_tokens / stats["prompt_tps"]
+    generation_seconds = completion_tokens / stats["generation_tps"]
+    return {"first_token_seconds": first_token_seconds, "completion_tokens": completion_tokens,
+            "generation_seconds": generation_seconds, "total_seconds": first_token_seconds + generation_seconds}
+
+def capacity_report(prompt_tokens=3000, completion_tokens=None):
+    """Text report of every model's recorded throughput and the jobs/hour it supports at the given size."""
+    with _lock: models = sorted(_load().keys())
+    if not models: return f"No telemetry recorded yet ({TELEMETRY_FILE})."
+    lines = [f"Telemetry: {TELEMETRY_FILE}", f"Job size: {prompt_tokens} prompt tokens, {completion_tokens if completion_tokens else 'expected'} completion tokens", ""]
+    lines.append(f"{'Model':<36} {'Samples':>7} {'Prompt t/s':>10} {'Gen t/s':>8} {'TTFT s':>7} {'Job s':>7} {'Jobs/h':>7}")
+    for model in models:
+        stats = model_stats(model)
+        prediction = predict_request(prompt_tokens, completion_tokens or AI_MAX_TOKENS, model, stats)
+        if completion_tokens: job_seconds = prediction["first_token_seconds"] + completion_tokens / stats["generation_tps"]
+        else: job_seconds = prediction["total_seconds"]
+        ttft = f"{stats['ttft']:.2f}" if stats["ttft"] is not None else "-"
+        lines.append(f"{model[:36]:<36} {stats['samples']:>7} {stats['prompt_tps']:>10.0f} {stats['generation_tps']:>8.1f} {ttft:>7} {job_seconds:>7.1f} {3600 / job_seconds:>7.1f}")
+    return "\n".join(lines)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Show recorded LM Studio throughput and a capacity estimate.")
+    parser.add_argument("--prompt-tokens", type=int, default=3000, help="Prompt size of a typical job.")
+    parser.add_argument("--completion-tokens", type=int, default=None, help="Completion size of a typical job (default: predicted from history).")
+    args = parser.parse_args()
+    print(capacity_report(args.prompt_tokens, args.completion_tokens))
+    sys.exit(0)
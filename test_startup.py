@@ -0,0 +1,38 @@
+# test_startup.py
+
+# Startup regression checks: time-to-first-window stays within STARTUP_BUDGET_SECONDS
+# (main.py --startup-check, run headless) and the heavy libraries stay out of the import of ui.
+# Each check runs in a fresh interpreter so nothing imported by the test runner counts.
+# Skipped when PyQt6 is not installed.
+
+import os
+import sys
+import json
+import subprocess
+import importlib.util
+import unittest
+
+from config import STARTUP_BUDGET_SECONDS
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PYQT6_AVAILABLE = importlib.util.find_spec("PyQt6") is not None
+LAZY_MODULES = ["transformers", "requests", "reportlab", "docx", "pptx"] # Imported on first use only
+
+def _run_python(args, timeout=120):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    return subprocess.run([sys.executable] + args, cwd=REPO_DIR, env=env, capture_output=True, text=True, timeout=timeout)
+
+@unittest.skipUnless(PYQT6_AVAILABLE, "needs PyQt6")
+class StartupTest(unittest.TestCase):
+
+    def test_first_window_within_budget(self):
+        result = _run_python(["main.py", "--startup-check", "--startup-budget", str(STARTUP_BUDGET_SECONDS)])
+        self.assertEqual(result.returncode, 0, f"\n{result.stdout}\n{result.stderr}")
+
+    def test_ui_import_leaves_heavy_libraries_unloaded(self):
+        result = _run_python(["-c", f"import sys, json, ui; print(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"])
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout.strip().splitlines()[-1]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+# test_xml_extractors.py
+
+# Parity of the two extraction engines: the streaming XML extractors must produce exactly the
+# Documents python-docx/python-pptx produce. Run with `python -m pytest` or `python -m unittest`.
+# Skipped when python-docx or python-pptx is not installed (they build the sample files).
+#
+# To compare both engines on your own files:
+#   python test_xml_extractors.py file.docx file.pptx ...
+
+import os
+import sys
+import difflib
+import tempfile
+import posixpath
+import unittest
+
+from extractors import EXTRACTORS, is_available
+from xml_extractors import XML_EXTRACTORS
+from document_model import document_to_data
+
+LIBRARIES_AVAILABLE = is_available(".docx", "library") and is_available(".pptx", "library")
+
+def build_sample_files(directory):
+    """
+    Writes sample.docx and sample.pptx with python-docx/python-pptx, covering headings, lists,
+    emphasis, strike-through, tables, line breaks, titles, notes and indented bullets. Returns their paths.
+    """
+    import docx
+    from pptx import Presentation
+    from pptx.util import Inches
+    document = docx.Document()
+    document.add_heading("Main <Title> & more", level=1)
+    paragraph = document.add_paragraph("Plain, ")
+    paragraph.add_run("bold").bold = True; paragraph.add_run(" and ").italic = False
+    paragraph.add_run("italic").italic = True; paragraph.add_run(" under").underline = True
+    struck = paragraph.add_run(" struck"); struck.underline = True; struck.font.strike = True
+    paragraph.add_run("\tline\nbreak")
+    document.add_heading("Section", level=2); document.add_heading("Sub", level=3)
+    document.add_paragraph("First item", style="List Bullet"); document.add_paragraph("Second item", style="List Number")
+    document.add_paragraph("- dash item"); document.add_paragraph("1. numbered item"); document.add_paragraph("")
+    table = document.add_table(rows=1, cols=2); table.cell(0, 0).text = "in a table"
+    document.add_paragraph("After the table.", style="Quote")
+    docx_path = os.path.join(directory, "sample.docx"); document.save(docx_path)
+
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+    slide.shapes.title.text = "Intro & <Goals>"
+    body = slide.placeholders[1].text_frame; body.text = "Top level"
+    for level, text in ((1, "Indented"), (2, "Deeper"), (0, "Back")):
+        paragraph = body.add_paragraph(); paragraph.level = level
+        run = paragraph.add_run(); run.text = text; run.font.bold = level == 1; run.font.underline = level == 2
+    box = slide.shapes.add_textbox(Inches(1), Inches(5), Inches(4), Inches(1)); box.text_frame.text = "Free text box"
+    slide.notes_slide.notes_text_frame.text = "First note\n\nSecond <note>"
+    blank = presentation.slides.add_slide(presentation.slide_layouts[6])
+    blank.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.text = "Only a text box"
+    pptx_path = os.path.join(directory, "sample.pptx"); presentation.save(pptx_path)
+    return docx_path, pptx_path
+
+def parity_diff(path):
+    """
+    Extracts path with both engines. Returns [] when the Documents are identical, else a
+    unified diff of their markup (or a note that only run formatting differs).
+    """
+    extension = posixpath.splitext(path)[1].lower()
+    library_document = EXTRACTORS[extension](path); xml_document = XML_EXTRACTORS[extension](path)
+    if document_to_data(library_document) == document_to_data(xml_document): return []
+    diff = list(difflib.unified_diff(library_document.to_markup().split("\n"), xml_document.to_markup().split("\n"), "library", "xml", lineterm=""))
+    return diff or ["(markup is identical; the block/run structure differs)"]
+
+@unittest.skipUnless(LIBRARIES_AVAILABLE, "needs python-docx and python-pptx")
+class ExtractionParityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._directory = tempfile.TemporaryDirectory()
+        cls.docx_path, cls.pptx_path = build_sample_files(cls._directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._directory.cleanup()
+
+    def test_docx_matches_library(self):
+        diff = parity_diff(self.docx_path)
+        self.assertEqual(diff, [], "\n" + "\n".join(diff))
+
+    def test_pptx_matches_library(self):
+        diff = parity_diff(self.pptx_path)
+        self.assertEqual(diff, [], "\n" + "\n".join(diff))
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and all(os.path.isfile(path) for path in sys.argv[1:]):
+        if not LIBRARIES_AVAILABLE: print("The parity check needs python-docx and python-pptx."); sys.exit(2)
+        mismatches = 0
+        for path in sys.argv[1:]:
+            diff = parity_diff(path)
+            print(f"{'MISMATCH' if diff else 'OK':<10}{path}")
+            for line in diff: print("  " + line)
+            mismatches += bool(diff)
+        sys.exit(1 if mismatches else 0)
+    unittest.main()
@@ -0,0 +1,46 @@
+# tokens.py
+
+import threading
+
+from config import TOKENIZER_MODEL_NAME
+import profiling
+
+# The Hugging Face tokenizer is loaded lazily (importing transformers is slow) and shared
+# by the UI thread and background workers. Access is serialized by the lock below.
+_tokenizer_instance = None
+_tokenizer_lock = threading.Lock()
+
+def get_tokenizer():
+    """
+    Returns the shared tokenizer, loading it on first use.
+    Raises whatever transformers raises if the tokenizer cannot be loaded.
+    """
+    global _tokenizer_instance
+    with _tokenizer_lock:
+        if _tokenizer_instance is None:
+            import logging; logging.getLogger("transformers").setLevel(logging.ERROR)
+            from transformers import AutoTokenizer
+            _tokenizer_instance = AutoTokenizer.from_pretrained(TOKENIZER_MODEL_NAME)
+        return _tokenizer_instance
+
+def is_tokenizer_loaded():
+    """True once get_tokenizer() has succeeded."""
+    return _tokenizer_instance is not None
+
+def count_tokens(text, tokenizer=None):
+    """
+    Counts tokens in text with the given tokenizer.
+    Falls back to a whitespace word count when no tokenizer is available.
+    """
+    if not text: return 0
+    if tokenizer is None: return len(text.split())
+    with profiling.stage("tokenize"): return len(tokenizer.encode(text, add_special_tokens=False))
+
+def estimate_tokens(text):
+    """
+    Token count for timing estimates: exact if the shared tokenizer is already
+    loaded, otherwise about four characters per token. Never loads the tokenizer.
+    """
+    if not text: return 0
+    if _tokenizer_instance is not None: return count_tokens(text, _tokenizer_instance)
+    return max(1, len(text) // 4)
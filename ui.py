@@ -1,426 +1,562 @@
-# ui.py
-
-# Standard Python imports
-import sys
-import os
-import time
-import re 
-import html # For escaping log messages
-
-# PyQt6 imports
-from PyQt6.QtWidgets import (QApplication,
-                             QMainWindow, QVBoxLayout, QHBoxLayout,
-                             QWidget, QLabel, QPushButton, QTextEdit,
-                             QLineEdit,
-                             QFileDialog, QMessageBox, QSizePolicy,
-                             QProgressDialog, QSpacerItem,
-                             QFrame,
-                             QComboBox,
-                             QSpinBox,
-                             QStackedWidget)
-from PyQt6.QtGui import QFont, QPixmap, QPalette, QColor, QBrush
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QRect, QTimer 
-
-# Other imports
-from transformers import AutoTokenizer
-# Assumes worker.py has the updated AIWorker with 3 args in finished signal
-from worker import AIWorker 
-# Assumes pdf_generator.py and pdf_worker.py have enhanced error reporting
-from pdf_generator import generate_pdf 
-from pdf_worker import PDFWorker 
-from config import * 
-from prompts import PREDEFINED_PROMPTS, PROMPT_NAMES
-
-# Import for DOCX handling
-try:
-    import docx
-    from docx.enum.style import WD_STYLE_TYPE 
-    from docx.enum.text import WD_UNDERLINE 
-except ImportError:
-    docx = None
-    WD_STYLE_TYPE = None 
-    WD_UNDERLINE = None 
-    print("Warning: python-docx library not found. DOCX file support will be unavailable.")
-
-# +++ Add python-pptx import +++
-try:
-    from pptx import Presentation
-except ImportError:
-    Presentation = None # Assign None if import fails
-    print("Warning: python-pptx library not found. PPTX file support will be unavailable.")
-
-
-# --- Tokenizer Initialization (Lazy Loading) ---
-class ModernHackerPDFConverterWindow(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("FormatAI PDF)")
-        self.setGeometry(100, 100, WINDOW_WIDTH, WINDOW_HEIGHT)
-        self.setStyleSheet(self._get_stylesheet())
-        self._tokenizer_instance = None
-        self.token_update_timer = QTimer(self); self.token_update_timer.setSingleShot(True); self.token_update_timer.setInterval(500); self.token_update_timer.timeout.connect(self._perform_token_update)
-        central_widget = QWidget(); central_widget.setObjectName("centralWidget"); self.setCentralWidget(central_widget)
-        central_layout = QVBoxLayout(central_widget); central_layout.setContentsMargins(LAYOUT_MARGIN, LAYOUT_MARGIN, LAYOUT_MARGIN, LAYOUT_MARGIN); central_layout.setSpacing(0) 
-        self.stacked_widget = QStackedWidget(); central_layout.addWidget(self.stacked_widget)
-        self._create_status_log_widgets() 
-        self.input_page = self._create_input_page()
-        self.status_page = self._create_status_page()
-        self.stacked_widget.addWidget(self.input_page)
-        self.stacked_widget.addWidget(self.status_page)
-        self.stacked_widget.setCurrentIndex(0)
-        self._apply_background_image()
-        self.ai_worker = None; self.pdf_worker = None; self.progress_dialog = None
-        self.log_message("Application started.")
-        if docx is None: self.log_message("python-docx not found. DOCX loading disabled.", COLOR_WARNING_YELLOW)
-        # +++ Added check for Presentation +++
-        if Presentation is None: self.log_message("python-pptx not found. PPTX loading disabled.", COLOR_WARNING_YELLOW) 
-
-
-    def _create_separator(self):
-        separator = QFrame(); separator.setFrameShape(QFrame.Shape.HLine); separator.setFrameShadow(QFrame.Shadow.Sunken); return separator
-    def _create_status_log_widgets(self):
-        self.status_label = QLabel("Status:"); self.status_display = QLineEdit(); self.status_display.setReadOnly(True); self.status_display.setPlaceholderText("Application ready.")
-        self.log_label = QLabel("Activity Log:"); self.log_display = QTextEdit(); self.log_display.setReadOnly(True); self.log_display.setMinimumHeight(LOG_AREA_MIN_HEIGHT); self.log_display.setPlaceholderText("Application events..."); self.log_display.setStyleSheet(f"QTextEdit {{ background-color: {COLOR_LOG_BACKGROUND}; color: {COLOR_TEXT_NEON_GREEN}; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; padding: 8px; font-size: 12px; border-radius: 4px; }}")
-    def _create_input_page(self):
-        page = QWidget(); page_layout = QVBoxLayout(page); page_layout.setContentsMargins(0, 0, 0, 0); page_layout.setSpacing(LAYOUT_SPACING)
-        prompt_select_layout = QHBoxLayout(); self.prompt_select_label = QLabel("Choose Prompt Template:"); prompt_select_layout.addWidget(self.prompt_select_label); self.prompt_combo = QComboBox(); self.prompt_combo.addItems(PROMPT_NAMES); self.prompt_combo.currentIndexChanged.connect(self._load_selected_prompt); prompt_select_layout.addWidget(self.prompt_combo); prompt_select_layout.addStretch(1); page_layout.addLayout(prompt_select_layout)
-        prompt_layout = QVBoxLayout(); self.prompt_label = QLabel("Editable Prompt Instructions:"); prompt_layout.addWidget(self.prompt_label); self.prompt_input = QTextEdit(); self.prompt_input.setPlaceholderText("Enter instructions..."); self.prompt_input.setMinimumHeight(PROMPT_INPUT_MIN_HEIGHT); prompt_layout.addWidget(self.prompt_input); page_layout.addLayout(prompt_layout)
-        page_layout.addWidget(self._create_separator())
-        settings_frame = QFrame(); settings_frame.setFrameShape(QFrame.Shape.StyledPanel); settings_frame.setMinimumHeight(SETTINGS_FRAME_HEIGHT); settings_layout = QHBoxLayout(settings_frame); settings_layout.setContentsMargins(10, 5, 10, 5); settings_layout.setSpacing(15); self.page_size_label = QLabel("Page Size:"); settings_layout.addWidget(self.page_size_label); self.page_size_combo = QComboBox(); self.page_size_combo.addItems(PDF_PAGE_SIZE_OPTIONS); self.page_size_combo.setCurrentText(PDF_PAGE_SIZE_DEFAULT); self.page_size_combo.setMinimumWidth(100); settings_layout.addWidget(self.page_size_combo); settings_layout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)); self.font_size_label = QLabel("Font Size:"); settings_layout.addWidget(self.font_size_label); self.font_size_spinbox = QSpinBox();
-        if PDF_FONT_SIZE_OPTIONS: self.font_size_spinbox.setRange(min(PDF_FONT_SIZE_OPTIONS), max(PDF_FONT_SIZE_OPTIONS)); self.font_size_spinbox.setValue(PDF_FONT_SIZE_DEFAULT if PDF_FONT_SIZE_DEFAULT in PDF_FONT_SIZE_OPTIONS else min(PDF_FONT_SIZE_OPTIONS))
-        else: self.font_size_spinbox.setRange(8, 24); self.font_size_spinbox.setValue(12)
-        self.font_size_spinbox.setSingleStep(1); self.font_size_spinbox.setToolTip("Base font size for the PDF."); self.font_size_spinbox.setMinimumWidth(60); settings_layout.addWidget(self.font_size_spinbox); settings_layout.addStretch(1); page_layout.addWidget(settings_frame)
-        page_layout.addWidget(self._create_separator())
-        original_text_layout = QVBoxLayout(); self.original_text_label = QLabel("Original Text (Paste or Load File):"); original_text_layout.addWidget(self.original_text_label); self.original_text_input = QTextEdit(); self.original_text_input.setPlaceholderText("Paste your original text here..."); self.original_text_input.setMinimumHeight(ORIGINAL_TEXT_INPUT_MIN_HEIGHT); 
-        self.original_text_input.textChanged.connect(self._request_token_update) 
-        original_text_layout.addWidget(self.original_text_input); token_count_layout = QHBoxLayout(); token_count_layout.addStretch(1); self.token_count_label = QLabel(f"Tokens: 0 / {LLM_CONTEXT_WINDOW}"); self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_NORMAL};"); self.token_count_label.setFont(QFont("Consolas", 10)); token_count_layout.addWidget(self.token_count_label); original_text_layout.addLayout(token_count_layout); page_layout.addLayout(original_text_layout) 
-        # REMOVED Conversion Mode Section
-        page_layout.addSpacerItem(QSpacerItem(20, 10, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding))
-        # --- Bottom Buttons Section --- (Adding Exit Button) ---
-        button_container = QWidget()
-        button_layout = QHBoxLayout(button_container)
-        button_layout.setContentsMargins(0, 0, 0, 0)
-        button_layout.setSpacing(10)
-        # +++ Add Exit Button +++
-        self.exit_button = QPushButton("Exit")
-        self.exit_button.setMinimumHeight(BUTTON_MIN_HEIGHT)
-        self.exit_button.clicked.connect(self.close) 
-        button_layout.addWidget(self.exit_button) 
-        button_layout.addStretch(1) # Push other buttons right
-        # Load File Button
-        self.load_file_button = QPushButton("Load File"); self.load_file_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.load_file_button.setMinimumWidth(LOAD_FILE_BUTTON_MIN_WIDTH); self.load_file_button.clicked.connect(self.load_file); button_layout.addWidget(self.load_file_button)
-        # Process Button
-        self.process_button = QPushButton("Process with AI & Generate PDF"); self.process_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.process_button.setMinimumWidth(PROCESS_BUTTON_MIN_WIDTH); self.process_button.clicked.connect(self.start_ai_processing); button_layout.addWidget(self.process_button)
-        page_layout.addWidget(button_container, alignment=Qt.AlignmentFlag.AlignBottom) # Align whole group bottom
-        # --- End Bottom Buttons ---
-        self._load_selected_prompt(self.prompt_combo.currentIndex()) 
-        self._request_token_update() 
-        return page
-    def _create_status_page(self):
-        page = QWidget(); page_layout = QVBoxLayout(page); page_layout.setContentsMargins(0, 0, 0, 0); page_layout.setSpacing(LAYOUT_SPACING); page_layout.addWidget(self.status_label); page_layout.addWidget(self.status_display); page_layout.addWidget(self.log_label); page_layout.addWidget(self.log_display); page_layout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)); back_button_container = QWidget(); back_button_layout = QHBoxLayout(back_button_container); back_button_layout.setContentsMargins(0,0,0,0); back_button_layout.addStretch(1); self.back_button = QPushButton("Back to Input"); self.back_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.back_button.setMinimumWidth(LOAD_FILE_BUTTON_MIN_WIDTH); self.back_button.clicked.connect(self._go_to_input_page); back_button_layout.addWidget(self.back_button); page_layout.addWidget(back_button_container, alignment=Qt.AlignmentFlag.AlignRight); return page
-    def _load_selected_prompt(self, index):
-        if hasattr(self, 'prompt_input') and self.prompt_input and self.prompt_input.isEnabled(): selected_prompt_name = self.prompt_combo.itemText(index); prompt_text = PREDEFINED_PROMPTS.get(selected_prompt_name, ""); self.prompt_input.setText(prompt_text); 
-        if hasattr(self, 'log_message'): self.log_message(f"Loaded prompt: '{selected_prompt_name}'.")
-    def _get_tokenizer(self):
-        if self._tokenizer_instance is None:
-            try:
-                self.log_message("Loading tokenizer...", color=COLOR_STATUS_DEFAULT); QApplication.processEvents() 
-                import logging; logging.getLogger("transformers").setLevel(logging.ERROR)
-                self._tokenizer_instance = AutoTokenizer.from_pretrained("gpt2")
-                self.log_message("Tokenizer loaded.", color=COLOR_STATUS_DEFAULT)
-            except Exception as e:
-                self._tokenizer_instance = None 
-                self.log_message(f"Error loading tokenizer: {e}", color=COLOR_ERROR_RED)
-                QMessageBox.warning(self, "Tokenizer Error", f"Could not load tokenizer: {e}\nToken counting may be inaccurate.")
-        return self._tokenizer_instance
-    def _get_token_count(self, text):
-        tokenizer = self._get_tokenizer()
-        if tokenizer:
-            try: token_ids = tokenizer.encode(text, add_special_tokens=False); return len(token_ids)
-            except Exception as e:
-                if not hasattr(self, '_tokenizer_error_logged'): self.log_message(f"Error during token counting: {e}", color=COLOR_ERROR_RED); self._tokenizer_error_logged = True
-                return 0 
-        else: return len(text.split()) if text else 0
-    def _request_token_update(self):
-        self.token_update_timer.start() 
-    def _perform_token_update(self):
-        if not hasattr(self, 'original_text_input') or not hasattr(self, 'token_count_label'): return 
-        input_text = self.original_text_input.toPlainText(); token_count = self._get_token_count(input_text)
-        self.token_count_label.setText(f"Tokens: {token_count} / {LLM_CONTEXT_WINDOW}")
-        base_style = "font-family: 'Consolas', 'Monaco', 'Courier New', monospace; font-size: 10px;"
-        if token_count > LLM_CONTEXT_WINDOW: self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_EXCEEDED}; {base_style}")
-        elif token_count > LLM_CONTEXT_WINDOW * (TOKEN_WARNING_THRESHOLD_PERCENT / 100.0): self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_WARNING}; {base_style}")
-        else: self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_NORMAL}; {base_style}")
-    def _get_stylesheet(self): 
-         return f""" QMainWindow {{ color: {COLOR_TEXT_NEON_GREEN}; font-family: 'Consolas', 'Monaco', 'Courier New', monospace; background-color: {COLOR_BACKGROUND_DARK}; }} QWidget#centralWidget {{ background-color: transparent; }} QWidget {{ background-color: transparent; font-family: 'Consolas', 'Monaco', 'Courier New', monospace; }} QFrame {{ border: 1px solid {COLOR_HIGHLIGHT_CYAN}; border-radius: 5px; background-color: #222222; }} QFrame[frameShape="4"] {{ border: none; background-color: transparent; min-height: {SEPARATOR_HEIGHT_PX}px; max-height: {SEPARATOR_HEIGHT_PX}px; margin-top: {SEPARATOR_MARGIN_V}px; margin-bottom: {SEPARATOR_MARGIN_V}px; background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 transparent, stop:0.2 {SEPARATOR_COLOR}, stop:0.8 {SEPARATOR_COLOR}, stop:1 transparent); }} QLabel {{ color: {COLOR_HIGHLIGHT_CYAN}; font-size: 14px; font-weight: bold; margin-bottom: 3px; background-color: transparent; }} QLabel:disabled {{ color: {COLOR_DISABLED_TEXT}; }} QTextEdit, QLineEdit, QSpinBox, QComboBox {{ background-color: {COLOR_INPUT_BACKGROUND}; color: {COLOR_TEXT_NEON_GREEN}; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; padding: 8px; selection-background-color: #004444; font-size: 13px; border-radius: 4px; }} QTextEdit:disabled, QLineEdit:disabled, QSpinBox:disabled, QComboBox:disabled {{ background-color: {COLOR_DISABLED_BG}; color: {COLOR_DISABLED_TEXT}; border: 1px solid {COLOR_DISABLED_BORDER}; }} QComboBox::drop-down {{ border-left: 1px solid {COLOR_HIGHLIGHT_CYAN}; }} QComboBox::drop-down:disabled {{ border-left: 1px solid {COLOR_DISABLED_BORDER}; }} QComboBox QAbstractItemView {{ background-color: {COLOR_INPUT_BACKGROUND}; color: {COLOR_TEXT_NEON_GREEN}; selection-background-color: #005555; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; }} QLineEdit {{ padding: 5px 8px; }} QSpinBox {{ padding: 5px 8px; }} QPushButton {{ background-color: {COLOR_BUTTON_GREEN_DARK}; color: {COLOR_TEXT_NEON_GREEN}; border: 2px solid {COLOR_TEXT_NEON_GREEN}; padding: 10px 15px; font-size: 14px; font-weight: bold; border-radius: 7px; }} QPushButton:hover {{ background-color: {COLOR_BUTTON_GREEN_HOVER}; border-color: #33ff33; }} QPushButton:pressed {{ background-color: {COLOR_BUTTON_GREEN_PRESSED}; }} QPushButton:disabled {{ background-color: {COLOR_DISABLED_BG}; color: {COLOR_DISABLED_TEXT}; border-color: {COLOR_DISABLED_BORDER}; }} QMessageBox {{ background-color: {COLOR_BACKGROUND_DARK}; }} QMessageBox QLabel {{ color: {COLOR_TEXT_NEON_GREEN}; font-size: 13px; }} QFileDialog {{ background-color: {COLOR_BACKGROUND_DARK}; }} QProgressDialog {{ background-color: {COLOR_BACKGROUND_DARK}; color: {COLOR_TEXT_NEON_GREEN}; border: 2px solid {COLOR_HIGHLIGHT_CYAN}; border-radius: 5px; }} QProgressDialog QLabel {{ color: {COLOR_HIGHLIGHT_CYAN}; font-size: 13px; font-weight: normal; }} QProgressDialog QProgressBar {{ border: 1px solid {COLOR_TEXT_NEON_GREEN}; border-radius: 3px; background-color: #333333; text-align: center; color: {COLOR_TEXT_NEON_GREEN}; }} QProgressDialog QProgressBar::chunk {{ background-color: {COLOR_TEXT_NEON_GREEN}; }} QProgressDialog QPushButton {{ padding: 5px 10px; font-size: 12px; }} """
-    def _apply_background_image(self):
-        central_widget = self.centralWidget();
-        if not central_widget or not os.path.exists(BACKGROUND_IMAGE_PATH):
-            if not os.path.exists(BACKGROUND_IMAGE_PATH) and hasattr(self, 'log_message'): self.log_message(f"Warning: BG image missing: {BACKGROUND_IMAGE_PATH}", COLOR_WARNING_YELLOW)
-            return
-        try:
-            background_pixmap = QPixmap(BACKGROUND_IMAGE_PATH)
-            if not background_pixmap.isNull():
-                palette = central_widget.palette(); scaled_pixmap = background_pixmap.scaled(central_widget.size(), Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
-                brush = QBrush(scaled_pixmap); palette.setBrush(QPalette.ColorRole.Window, brush); central_widget.setPalette(palette); central_widget.setAutoFillBackground(True)
-            elif hasattr(self, 'log_message'): self.log_message(f"Warning: Could not load pixmap from {BACKGROUND_IMAGE_PATH}.", COLOR_WARNING_YELLOW)
-        except Exception as e:
-            if hasattr(self, 'log_message'): self.log_message(f"Error applying background: {e}", color=COLOR_ERROR_RED)
-    def resizeEvent(self, event):
-        super().resizeEvent(event); self._apply_background_image()
-
-    def _extract_text_from_docx(self, file_path):
-        if docx is None: self.log_message("python-docx not available.", COLOR_ERROR_RED); return None, "python-docx library not installed."
-        try:
-            doc_obj = docx.Document(file_path); output_lines = [] 
-            for para_idx, para in enumerate(doc_obj.paragraphs):
-                paragraph_text_parts = []
-                for run in para.runs:
-                    run_text = run.text
-                    if run_text: 
-                        run_text = run_text.replace('&', '&').replace('<', '<').replace('>', '>')
-                        prefix = ""; suffix = ""
-                        if run.bold: prefix += "<b>"; suffix = "</b>" + suffix
-                        if run.italic: prefix += "<i>"; suffix = "</i>" + suffix
-                        if WD_UNDERLINE and run.underline and run.underline != WD_UNDERLINE.NONE and not run.strike: prefix += "<u>"; suffix = "</u>" + suffix
-                        elif not WD_UNDERLINE and run.underline and not run.strike: prefix += "<u>"; suffix = "</u>" + suffix
-                        paragraph_text_parts.append(prefix + run_text + suffix)
-                full_paragraph_text = "".join(paragraph_text_parts).strip()
-                style_name = para.style.name if para.style and para.style.name else ""; style_name_lower = style_name.lower()
-                is_list_style_by_name = 'list paragraph' in style_name_lower or 'list bullet' in style_name_lower or 'list number' in style_name_lower
-                is_list_by_text_pattern = bool(re.match(r"^\s*(\*|-|•|▪|o)\s+", full_paragraph_text)) or bool(re.match(r"^\s*(\d+\.|[a-zA-Z][\.\)])\s+", full_paragraph_text))
-                line_added = False
-                if style_name.startswith('Heading 1'):
-                    if para_idx > 0 and output_lines and output_lines[-1] != "": output_lines.append("") 
-                    output_lines.append(f"# {full_paragraph_text}"); line_added = True
-                elif style_name.startswith('Heading 2'):
-                    if para_idx > 0 and output_lines and output_lines[-1] != "": output_lines.append("")
-                    output_lines.append(f"## {full_paragraph_text}"); line_added = True
-                elif style_name.startswith('Heading 3'):
-                    if para_idx > 0 and output_lines and output_lines[-1] != "": output_lines.append("")
-                    output_lines.append(f"### {full_paragraph_text}"); line_added = True
-                elif not line_added and (is_list_style_by_name or is_list_by_text_pattern):
-                    if full_paragraph_text: 
-                        text_without_prefix = re.sub(r"^\s*(\*|-|•|▪|o|\d+\.|[a-zA-Z][\.\)])\s+", "", full_paragraph_text).strip()
-                        output_lines.append(f"* {text_without_prefix}"); line_added = True
-                if not line_added:
-                    if full_paragraph_text: output_lines.append(full_paragraph_text)
-                    elif para_idx > 0 and output_lines and output_lines[-1] != "": output_lines.append("")
-            final_text = "\n".join(output_lines)
-            final_text = re.sub(r'\n(\s*\n)+', '\n\n', final_text).strip() 
-            return final_text, None
-        except Exception as e:
-            self.log_message(f"Error reading .docx file {os.path.basename(file_path)}: {e}", COLOR_ERROR_RED)
-            return None, f"Error reading .docx file: {e}"
-
-    # +++ ADDED Method to Extract Text from PPTX +++
-    def _extract_text_from_pptx(self, file_path):
-        """Extracts text from a PPTX file slide by slide."""
-        if Presentation is None:
-            self.log_message("python-pptx library is not available. Cannot process PPTX files.", COLOR_ERROR_RED)
-            return None, "python-pptx library not installed."
-        
-        full_text = []
-        try:
-            prs = Presentation(file_path)
-            for i, slide in enumerate(prs.slides):
-                slide_texts = []
-                
-                # Add notes first
-                if slide.has_notes_slide:
-                    notes_frame = slide.notes_slide.notes_text_frame
-                    if notes_frame and notes_frame.text and notes_frame.text.strip():
-                        notes_text = notes_frame.text.strip()
-                        if slide_texts or full_text: slide_texts.append("") 
-                        slide_texts.append(f"### Speaker Notes (Slide {i+1}):")
-                        for note_para in notes_text.split('\n'):
-                            if note_para.strip():
-                                slide_texts.append(html.escape(note_para.strip())) # Escape notes text
-                        slide_texts.append("") 
-                
-                # Add slide title 
-                title_text = ""
-                if slide.shapes.title and slide.shapes.title.has_text_frame and slide.shapes.title.text.strip():
-                     title_text = html.escape(slide.shapes.title.text.strip())
-                     if slide_texts and slide_texts[-1] != "": slide_texts.append("") 
-                     slide_texts.append(f"## Slide {i+1}: {title_text}") 
-
-                # Extract text from other shapes
-                shape_texts = []
-                for shape in slide.shapes:
-                    if not shape.has_text_frame: continue
-                    if shape == slide.shapes.title: continue 
-                    if slide.has_notes_slide and shape.is_placeholder and shape.name.startswith("Notes Placeholder"): continue
-
-                    shape_content = []
-                    for paragraph in shape.text_frame.paragraphs:
-                        para_text_parts = []
-                        for run in paragraph.runs:
-                            run_text = run.text 
-                            if run_text:
-                                escaped_run_text = html.escape(run_text) # Escape text content
-                                prefix = ""; suffix = ""
-                                if run.font.bold: prefix += "<b>"; suffix = "</b>" + suffix
-                                if run.font.italic: prefix += "<i>"; suffix = "</i>" + suffix
-                                # Simple underline check (needs WD_UNDERLINE imported)
-                                if WD_UNDERLINE and run.font.underline and run.font.underline != WD_UNDERLINE.NONE: prefix += "<u>"; suffix = "</u>" + suffix
-                                elif not WD_UNDERLINE and run.font.underline: prefix += "<u>"; suffix = "</u>" + suffix
-                                para_text_parts.append(prefix + escaped_run_text + suffix)
-                        
-                        para_full_text = "".join(para_text_parts).strip()
-                        if para_full_text:
-                            indent_level = paragraph.level
-                            # Prefix list items based on indentation level
-                            if indent_level > 0:
-                                shape_content.append(f"* {para_full_text}") 
-                            else:
-                                shape_content.append(para_full_text)
-                    
-                    if shape_content:
-                        # Join paragraphs within a shape with single newlines
-                        shape_texts.append("\n".join(shape_content)) 
-
-                if shape_texts:
-                     # Add space before shape text if title or notes exist
-                     if slide_texts and slide_texts[-1] != "": slide_texts.append("") 
-                     # Join different shapes with double newlines
-                     slide_texts.append("\n\n".join(shape_texts)) 
-
-                if slide_texts:
-                    full_text.append("\n".join(slide_texts)) 
-
-            final_text = "\n\n".join(full_text)
-            final_text = re.sub(r'\n(\s*\n)+', '\n\n', final_text).strip()
-            return final_text, None
-
-        except Exception as e:
-            error_msg = f"Error reading PPTX file {os.path.basename(file_path)}: {e}"
-            self.log_message(error_msg, color=COLOR_ERROR_RED)
-            # import traceback # Uncomment for detailed debug
-            # self.log_message(traceback.format_exc(), color=COLOR_ERROR_RED) # Uncomment for detailed debug
-            return None, f"Error reading PPTX file: {e}"
-
-
-    def load_file(self):
-        # --- MODIFIED to include PPTX ---
-        file_types = "Supported Files (*.txt *.docx *.pptx);;Text files (*.txt);;Word documents (*.docx);;PowerPoint files (*.pptx);;All files (*)" # Added PPTX filter
-        file_path, selected_filter = QFileDialog.getOpenFileName(
-            self, "Select a File to Load", "", file_types)
-
-        if file_path:
-            file_content = None; error_message = None
-            file_extension = os.path.splitext(file_path)[1].lower()
-
-            try:
-                if file_extension == '.txt':
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f: file_content = f.read()
-                elif file_extension == '.docx':
-                    if docx is None: error_message = "python-docx library not installed."; QMessageBox.warning(self, "Library Missing", error_message)
-                    else: file_content, error_message = self._extract_text_from_docx(file_path)
-                # +++ Add PPTX handling +++
-                elif file_extension == '.pptx':
-                    if Presentation is None: # Check if Presentation class is available
-                        error_message = "python-pptx library not installed. Cannot load .pptx files."
-                        QMessageBox.warning(self, "Library Missing", error_message)
-                    else:
-                        file_content, error_message = self._extract_text_from_pptx(file_path) # Call the extractor
-                # +++ End PPTX handling +++
-                else: 
-                    error_message = f"Unsupported file type: {file_extension}. Please select .txt, .docx, or .pptx." # Updated message
-                    QMessageBox.warning(self, "Unsupported File", error_message)
-                
-                # Process result
-                if file_content is not None:
-                    self.original_text_input.setText(file_content); self.update_status(f"Loaded file: {os.path.basename(file_path)}", COLOR_TEXT_NEON_GREEN)
-                    self.log_message(f"Loaded file: {os.path.basename(file_path)}"); self._request_token_update() 
-                elif error_message: 
-                    self.update_status(f"Error loading {os.path.basename(file_path)}.", COLOR_ERROR_RED); self.log_message(error_message, color=COLOR_ERROR_RED) 
-                    if "Unsupported file type" not in error_message and "library not installed" not in error_message: QMessageBox.critical(self, "Error", error_message)
-                
-            except Exception as e: 
-                error_msg = f"Error processing file {os.path.basename(file_path)}: {e}"; self.update_status("Error processing file.", COLOR_ERROR_RED)
-                self.log_message(error_msg, color=COLOR_ERROR_RED); QMessageBox.critical(self, "Error", error_msg)
-
-
-    # --- Subsequent methods (start_ai_processing, cancel_ai_processing, etc.) are correct ---
-    def start_ai_processing(self): 
-        original_text = self.original_text_input.toPlainText().strip(); prompt_instruction = self.prompt_input.toPlainText().strip() 
-        if not original_text: QMessageBox.warning(self, "Input Required", "Please enter or load text."); self.update_status("Please enter or load text.", COLOR_WARNING_YELLOW); self.log_message("Processing cancelled: No original text.", color=COLOR_WARNING_YELLOW); return
-        if not prompt_instruction: QMessageBox.warning(self, "Input Required", "Please provide AI instructions."); self.update_status("Please provide AI instructions.", COLOR_WARNING_YELLOW); self.log_message("Processing cancelled: No AI instructions.", color=COLOR_WARNING_YELLOW); return
-        self.stacked_widget.setCurrentIndex(1); self.log_display.clear(); self.update_status("Starting AI processing...", COLOR_WARNING_YELLOW); self.log_message("Starting AI processing...")
-        self.progress_dialog = QProgressDialog("AI Processing...", "Cancel", 0, 0, self); self.progress_dialog.setWindowTitle("AI at Work"); self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal); self.progress_dialog.canceled.connect(self.cancel_ai_processing); self.progress_dialog.show()
-        self.ai_worker = AIWorker(original_text, prompt_instruction); self.ai_worker.finished.connect(self.handle_ai_response); self.ai_worker.progress.connect(self.update_progress_dialog); self.ai_worker.start()
-    def cancel_ai_processing(self):
-        self.log_message("AI processing cancellation requested.", color=COLOR_WARNING_YELLOW) 
-        if self.ai_worker and self.ai_worker.isRunning(): self.ai_worker.stop()
-        if self.progress_dialog: self.progress_dialog.close(); self.progress_dialog = None 
-        self.update_status("AI processing cancellation requested.", COLOR_WARNING_YELLOW)
-        if hasattr(self, 'back_button') and self.back_button: self.back_button.setEnabled(True)
-    def update_progress_dialog(self, message):
-         if self.progress_dialog and self.progress_dialog.isVisible(): self.progress_dialog.setLabelText(message)
-         self.log_message(f"AI Progress: {message}", color=COLOR_STATUS_DEFAULT)
-    def handle_ai_response(self, success, ai_output_or_error, was_cancelled): 
-        if self.progress_dialog: self.progress_dialog.close(); self.progress_dialog = None
-        if was_cancelled:
-            self.log_message("AI processing was confirmed cancelled. Skipping PDF generation.", COLOR_WARNING_YELLOW); self.update_status("AI Processing Cancelled.", COLOR_WARNING_YELLOW)
-            if hasattr(self, 'back_button') and self.back_button: self.back_button.setEnabled(True)
-            return 
-        if not success: 
-            self.update_status(f"AI Processing Failed: {ai_output_or_error}", COLOR_ERROR_RED); self.log_message(f"AI Error: {ai_output_or_error}", color=COLOR_ERROR_RED)
-            QMessageBox.critical(self, "AI Error", ai_output_or_error)
-            if hasattr(self, 'back_button') and self.back_button: self.back_button.setEnabled(True)
-            return 
-        self.update_status("AI processing complete. Preparing PDF...", COLOR_TEXT_NEON_GREEN); self.log_message("AI processing complete. Preparing PDF generation...")
-        self.save_pdf_from_ai_output(ai_output_or_error) 
-    def save_pdf_from_ai_output(self, processed_text): 
-         selected_page_size = self.page_size_combo.currentText(); selected_font_size = self.font_size_spinbox.value(); default_filename = "ai_formatted_document.pdf" 
-         output_filename, _ = QFileDialog.getSaveFileName(self, "Save AI Formatted PDF", default_filename, "PDF files (*.pdf);;All files (*)") 
-         if not output_filename: 
-            self.update_status("PDF save cancelled.", COLOR_WARNING_YELLOW); self.log_message("PDF save cancelled.", color=COLOR_WARNING_YELLOW); 
-            if hasattr(self, 'back_button'): self.back_button.setEnabled(True); 
-            print("DEBUG UI: PDF save dialog cancelled by user.") 
-            return
-         print(f"DEBUG UI: PDF Filename selected: {output_filename}") 
-         if not output_filename.lower().endswith('.pdf'): output_filename += '.pdf'
-         self.update_status("Generating PDF in background...", COLOR_WARNING_YELLOW); 
-         self.log_message(f"Starting background PDF generation '{os.path.basename(output_filename)}'...")
-         if hasattr(self, 'back_button'): self.back_button.setEnabled(False)
-         print(f"DEBUG UI: Creating PDFWorker (Font: {selected_font_size}). Text length: {len(processed_text)}") 
-         self.pdf_worker = PDFWorker(processed_text, output_filename, selected_page_size, selected_font_size)
-         print(f"DEBUG UI: Connecting PDFWorker finished signal...") 
-         self.pdf_worker.finished.connect(self.handle_pdf_result) 
-         print(f"DEBUG UI: Starting PDFWorker...") 
-         self.pdf_worker.start()
-    def handle_pdf_result(self, success, message):
-        print(f"DEBUG UI: handle_pdf_result received: success={success}, message='{message[:100]}...'") 
-        if hasattr(self, 'back_button'): self.back_button.setEnabled(True)
-        if success: 
-            self.update_status(message, COLOR_TEXT_NEON_GREEN); self.log_message(message, color=COLOR_TEXT_NEON_GREEN)
-        else: 
-            detailed_error_message = f"PDF Generation Error: {message}"
-            self.update_status("PDF Generation Failed.", COLOR_ERROR_RED) 
-            self.log_message(detailed_error_message, color=COLOR_ERROR_RED) 
-            QMessageBox.critical(self, "PDF Generation Error", f"Failed to generate PDF.\nDetails logged.\nError: {message.splitlines()[0]}") 
-        self.pdf_worker = None 
-    def update_status(self, message, color=COLOR_STATUS_DEFAULT):
-        if hasattr(self, 'status_display') and self.status_display: self.status_display.setText(message); self.status_display.setStyleSheet(f"QLineEdit {{ color: {color}; background-color: {COLOR_INPUT_BACKGROUND}; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; padding: 5px 8px; }}")
-    def log_message(self, message, color=None): 
-        if hasattr(self, 'log_display') and self.log_display:
-             timestamp = time.strftime("%H:%M:%S"); log_color = color if color else COLOR_HIGHLIGHT_CYAN 
-             current_html = self.log_display.toHtml()
-             if current_html.endswith("</body></html>"): current_html = current_html[:-len("</body></html>")]
-             escaped_message = html.escape(str(message)) 
-             new_log_entry = f"<br><span style='color: {log_color}; font-family: \"Consolas\", \"Monaco\", \"Courier New\", monospace;'>[{timestamp}] {escaped_message}</span>"
-             self.log_display.setHtml(current_html + new_log_entry + "</body></html>"); self.log_display.verticalScrollBar().setValue(self.log_display.verticalScrollBar().maximum())
-    def _go_to_input_page(self):
-        self.stacked_widget.setCurrentIndex(0)
-        if hasattr(self, 'process_button') and self.process_button: self.process_button.setEnabled(True) 
-        self.update_status("Ready for input.", COLOR_STATUS_DEFAULT)
-
-# --- Standalone Execution ---
-if __name__ == '__main__':
-    print("Running UI standalone test...")
-    app = QApplication(sys.argv)
-    main_window = ModernHackerPDFConverterWindow()
-    main_window.show()
+# ui.py
+
+# Standard Python imports
+import sys
+import os
+import time
+import html # For escaping log messages
+
+# PyQt6 imports
+from PyQt6.QtWidgets import (QApplication,
+                             QMainWindow, QVBoxLayout, QHBoxLayout,
+                             QWidget, QLabel, QPushButton, QTextEdit,
+                             QLineEdit,
+                             QFileDialog, QMessageBox, QSizePolicy,
+                             QProgressDialog, QProgressBar, QSpacerItem,
+                             QFrame,
+                             QComboBox,
+                             QSpinBox,
+                             QCheckBox,
+                             QStackedWidget,
+                             QDialog, QDialogButtonBox, QListWidget, QAbstractItemView)
+from PyQt6.QtGui import QFont, QPixmap, QPalette, QColor, QBrush
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QRect, QTimer, QBuffer, QByteArray, QIODevice
+
+# Other imports
+# Heavy dependencies (transformers, requests, reportlab, python-docx/pptx, QtPdf) are NOT imported here.
+# They are loaded on first use so the window shows quickly (see the startup report printed by main.py).
+from tokens import get_tokenizer
+# Assumes worker.py has the updated AIWorker with 3 args in finished signal
+from worker import AIWorker, LargeFileStatsWorker, TokenizerLoaderWorker, WarmUpWorker, FanOutWorker
+from large_file import LargeTextFile, is_large_file
+# Assumes pdf_generator.py and pdf_worker.py have enhanced error reporting
+from pdf_worker import PDFWorker, PreviewWorker
+from config import * 
+from prompts import PREDEFINED_PROMPTS, PROMPT_NAMES
+from format_validator import score_structure
+
+# Text extractors (built-in XML engine by default; python-docx / python-pptx are optional)
+from extractors import is_available as is_extractor_available, extract_file
+import profiling # No-op unless started with --profile
+
+
+# --- Tokenizer Initialization (Lazy Loading) ---
+class ModernHackerPDFConverterWindow(QMainWindow):
+    def __init__(self, warm_up=AI_WARM_UP_ON_START):
+        super().__init__()
+        self.setWindowTitle("FormatAI PDF)")
+        self.setGeometry(100, 100, WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.setStyleSheet(self._get_stylesheet())
+        self._tokenizer_instance = None; self.tokenizer_loader = None; self._tokenizer_failed = False
+        self._loaded_document = None # Document model of the last extracted .docx/.pptx file
+        self._loaded_file_name = None # Base name of the last loaded file (names the fan-out PDFs)
+        self.fan_out_worker = None
+        self._large_file = None; self._large_file_page = 0; self.large_file_stats_worker = None # Large-file mode state (memory-mapped .txt)
+        self.warm_up_worker = None; self._last_warm_up_time = None # Model warm-up (time.monotonic() of the last success)
+        self._eta_elapsed = 0.0; self._eta_remaining = None; self._eta_received = None # Last ETA from the AI worker and when it arrived
+        self.eta_timer = QTimer(self); self.eta_timer.setInterval(500); self.eta_timer.timeout.connect(self._update_eta_display)
+        self.token_update_timer = QTimer(self); self.token_update_timer.setSingleShot(True); self.token_update_timer.setInterval(500); self.token_update_timer.timeout.connect(self._perform_token_update)
+        central_widget = QWidget(); central_widget.setObjectName("centralWidget"); self.setCentralWidget(central_widget)
+        central_layout = QVBoxLayout(central_widget); central_layout.setContentsMargins(LAYOUT_MARGIN, LAYOUT_MARGIN, LAYOUT_MARGIN, LAYOUT_MARGIN); central_layout.setSpacing(0) 
+        self.stacked_widget = QStackedWidget(); central_layout.addWidget(self.stacked_widget)
+        self._create_status_log_widgets() 
+        self.input_page = self._create_input_page()
+        self.status_page = self._create_status_page()
+        self.stacked_widget.addWidget(self.input_page)
+        self.stacked_widget.addWidget(self.status_page)
+        self.stacked_widget.setCurrentIndex(0)
+        self._apply_background_image()
+        self.ai_worker = None; self.pdf_worker = None; self.progress_dialog = None; self.preview_worker = None
+        self._pending_checkpoint = None # Checkpoints of the AI job whose PDF is being written (removed once it is)
+        self._preview_pdf_document = None; self._preview_buffer = None # Kept alive while QtPdf reads the preview
+        self.log_message("Application started.")
+        if not is_extractor_available(".docx"): self.log_message("python-docx not found. DOCX loading disabled.", COLOR_WARNING_YELLOW)
+        # +++ Added check for python-pptx +++
+        if not is_extractor_available(".pptx"): self.log_message("python-pptx not found. PPTX loading disabled.", COLOR_WARNING_YELLOW) 
+        if warm_up: self._start_warm_up()
+
+
+    def _create_separator(self):
+        separator = QFrame(); separator.setFrameShape(QFrame.Shape.HLine); separator.setFrameShadow(QFrame.Shadow.Sunken); return separator
+    def _create_status_log_widgets(self):
+        self.status_label = QLabel("Status:"); self.status_display = QLineEdit(); self.status_display.setReadOnly(True); self.status_display.setPlaceholderText("Application ready.")
+        self.log_label = QLabel("Activity Log:"); self.log_display = QTextEdit(); self.log_display.setReadOnly(True); self.log_display.setMinimumHeight(LOG_AREA_MIN_HEIGHT); self.log_display.setPlaceholderText("Application events..."); self.log_display.setStyleSheet(f"QTextEdit {{ background-color: {COLOR_LOG_BACKGROUND}; color: {COLOR_TEXT_NEON_GREEN}; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; padding: 8px; font-size: 12px; border-radius: 4px; }}")
+    def _create_input_page(self):
+        page = QWidget(); page_layout = QVBoxLayout(page); page_layout.setContentsMargins(0, 0, 0, 0); page_layout.setSpacing(LAYOUT_SPACING)
+        prompt_select_layout = QHBoxLayout(); self.prompt_select_label = QLabel("Choose Prompt Template:"); prompt_select_layout.addWidget(self.prompt_select_label); self.prompt_combo = QComboBox(); self.prompt_combo.addItems(PROMPT_NAMES); self.prompt_combo.currentIndexChanged.connect(self._load_selected_prompt); prompt_select_layout.addWidget(self.prompt_combo); prompt_select_layout.addStretch(1)
+        self.processing_mode_label = QLabel("Mode:"); prompt_select_layout.addWidget(self.processing_mode_label); self.processing_mode_combo = QComboBox(); self.processing_mode_combo.addItems(PROCESSING_MODE_OPTIONS); self.processing_mode_combo.setCurrentText(PROCESSING_MODE_DEFAULT); self.processing_mode_combo.setToolTip("AI Format: always use the LLM. Direct Render: render the text as-is. Auto: render directly when the text is already well-structured."); prompt_select_layout.addWidget(self.processing_mode_combo)
+        self.compact_input_checkbox = QCheckBox("Compact Input"); self.compact_input_checkbox.setChecked(INPUT_COMPACTION_ENABLED); self.compact_input_checkbox.setToolTip("Before sending: keep repeated boilerplate lines once, normalize whitespace and shorten slide markers. Tokens saved are shown in the log."); prompt_select_layout.addWidget(self.compact_input_checkbox)
+        page_layout.addLayout(prompt_select_layout)
+        prompt_layout = QVBoxLayout(); self.prompt_label = QLabel("Editable Prompt Instructions:"); prompt_layout.addWidget(self.prompt_label); self.prompt_input = QTextEdit(); self.prompt_input.setPlaceholderText("Enter instructions..."); self.prompt_input.setMinimumHeight(PROMPT_INPUT_MIN_HEIGHT); prompt_layout.addWidget(self.prompt_input); page_layout.addLayout(prompt_layout)
+        page_layout.addWidget(self._create_separator())
+        settings_frame = QFrame(); settings_frame.setFrameShape(QFrame.Shape.StyledPanel); settings_frame.setMinimumHeight(SETTINGS_FRAME_HEIGHT); settings_layout = QHBoxLayout(settings_frame); settings_layout.setContentsMargins(10, 5, 10, 5); settings_layout.setSpacing(15); self.page_size_label = QLabel("Page Size:"); settings_layout.addWidget(self.page_size_label); self.page_size_combo = QComboBox(); self.page_size_combo.addItems(PDF_PAGE_SIZE_OPTIONS); self.page_size_combo.setCurrentText(PDF_PAGE_SIZE_DEFAULT); self.page_size_combo.setMinimumWidth(100); settings_layout.addWidget(self.page_size_combo); settings_layout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Minimum)); self.font_size_label = QLabel("Font Size:"); settings_layout.addWidget(self.font_size_label); self.font_size_spinbox = QSpinBox();
+        if PDF_FONT_SIZE_OPTIONS: self.font_size_spinbox.setRange(min(PDF_FONT_SIZE_OPTIONS), max(PDF_FONT_SIZE_OPTIONS)); self.font_size_spinbox.setValue(PDF_FONT_SIZE_DEFAULT if PDF_FONT_SIZE_DEFAULT in PDF_FONT_SIZE_OPTIONS else min(PDF_FONT_SIZE_OPTIONS))
+        else: self.font_size_spinbox.setRange(8, 24); self.font_size_spinbox.setValue(12)
+        self.font_size_spinbox.setSingleStep(1); self.font_size_spinbox.setToolTip("Base font size for the PDF."); self.font_size_spinbox.setMinimumWidth(60); settings_layout.addWidget(self.font_size_spinbox)
+        self.parallel_render_checkbox = QCheckBox("Parallel Render"); self.parallel_render_checkbox.setChecked(PDF_PARALLEL_RENDER_DEFAULT); self.parallel_render_checkbox.setToolTip("Lay out H1/H2 sections on all CPU cores and merge the pages (for very large documents, needs pypdf). Each section chunk starts on a new page."); settings_layout.addWidget(self.parallel_render_checkbox)
+        self.page_estimate_label = QLabel("Est. Pages: -"); self.page_estimate_label.setToolTip("Fast estimate for the current text, page size and font size."); settings_layout.addWidget(self.page_estimate_label)
+        self.page_size_combo.currentTextChanged.connect(self._update_page_estimate); self.font_size_spinbox.valueChanged.connect(self._update_page_estimate)
+        settings_layout.addStretch(1); page_layout.addWidget(settings_frame)
+        page_layout.addWidget(self._create_separator())
+        original_text_layout = QVBoxLayout(); self.original_text_label = QLabel("Original Text (Paste or Load File):"); original_text_layout.addWidget(self.original_text_label); self.original_text_input = QTextEdit(); self.original_text_input.setPlaceholderText("Paste your original text here..."); self.original_text_input.setMinimumHeight(ORIGINAL_TEXT_INPUT_MIN_HEIGHT); 
+        self.original_text_input.textChanged.connect(self._request_token_update) 
+        original_text_layout.addWidget(self.original_text_input); token_count_layout = QHBoxLayout(); token_count_layout.addStretch(1); self.token_count_label = QLabel(f"Tokens: 0 / {LLM_CONTEXT_WINDOW}"); self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_NORMAL};"); self.token_count_label.setFont(QFont("Consolas", 10)); token_count_layout.addWidget(self.token_count_label); original_text_layout.addLayout(token_count_layout)
+        # --- Large-File Mode Navigation (hidden until a large .txt file is loaded) ---
+        self.large_file_nav_widget = QWidget(); large_file_nav_layout = QHBoxLayout(self.large_file_nav_widget); large_file_nav_layout.setContentsMargins(0, 0, 0, 0); large_file_nav_layout.setSpacing(10)
+        self.large_file_prev_button = QPushButton("< Prev"); self.large_file_prev_button.clicked.connect(lambda: self._show_large_file_page(self._large_file_page - 1)); large_file_nav_layout.addWidget(self.large_file_prev_button)
+        self.large_file_page_label = QLabel("Page 1 / 1"); large_file_nav_layout.addWidget(self.large_file_page_label)
+        self.large_file_next_button = QPushButton("Next >"); self.large_file_next_button.clicked.connect(lambda: self._show_large_file_page(self._large_file_page + 1)); large_file_nav_layout.addWidget(self.large_file_next_button)
+        large_file_nav_layout.addStretch(1)
+        self.large_file_close_button = QPushButton("Close Large File"); self.large_file_close_button.clicked.connect(self._close_large_file); large_file_nav_layout.addWidget(self.large_file_close_button)
+        self.large_file_nav_widget.setVisible(False); original_text_layout.addWidget(self.large_file_nav_widget)
+        page_layout.addLayout(original_text_layout) 
+        # REMOVED Conversion Mode Section
+        page_layout.addSpacerItem(QSpacerItem(20, 10, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding))
+        # --- Bottom Buttons Section --- (Adding Exit Button) ---
+        button_container = QWidget()
+        button_layout = QHBoxLayout(button_container)
+        button_layout.setContentsMargins(0, 0, 0, 0)
+        button_layout.setSpacing(10)
+        # +++ Add Exit Button +++
+        self.exit_button = QPushButton("Exit")
+        self.exit_button.setMinimumHeight(BUTTON_MIN_HEIGHT)
+        self.exit_button.clicked.connect(self.close) 
+        button_layout.addWidget(self.exit_button) 
+        button_layout.addStretch(1) # Push other buttons right
+        # Preview Button
+        self.preview_button = QPushButton("Preview"); self.preview_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.preview_button.setToolTip("Lay out only the first page and estimate the page count."); self.preview_button.clicked.connect(self.preview_pdf); button_layout.addWidget(self.preview_button)
+        # Load File Button
+        self.load_file_button = QPushButton("Load File"); self.load_file_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.load_file_button.setMinimumWidth(LOAD_FILE_BUTTON_MIN_WIDTH); self.load_file_button.clicked.connect(self.load_file); button_layout.addWidget(self.load_file_button)
+        # Fan-Out Button (one PDF per selected prompt)
+        self.fan_out_button = QPushButton("Fan-Out..."); self.fan_out_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.fan_out_button.setToolTip("Render the text with several prompt templates at once (one PDF per prompt)."); self.fan_out_button.clicked.connect(self.start_fan_out); button_layout.addWidget(self.fan_out_button)
+        # Process Button
+        self.process_button = QPushButton("Process with AI & Generate PDF"); self.process_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.process_button.setMinimumWidth(PROCESS_BUTTON_MIN_WIDTH); self.process_button.clicked.connect(self.start_ai_processing); button_layout.addWidget(self.process_button)
+        self.processing_mode_combo.currentTextChanged.connect(self._update_process_button_text); self._update_process_button_text(self.processing_mode_combo.currentText())
+        page_layout.addWidget(button_container, alignment=Qt.AlignmentFlag.AlignBottom) # Align whole group bottom
+        # --- End Bottom Buttons ---
+        self._load_selected_prompt(self.prompt_combo.currentIndex()) 
+        self._request_token_update() 
+        return page
+    def _create_status_page(self):
+        page = QWidget(); page_layout = QVBoxLayout(page); page_layout.setContentsMargins(0, 0, 0, 0); page_layout.setSpacing(LAYOUT_SPACING); page_layout.addWidget(self.status_label); page_layout.addWidget(self.status_display)
+        # --- AI progress (ETA predicted from telemetry), shown while an AI job runs ---
+        self.ai_progress_bar = QProgressBar(); self.ai_progress_bar.setRange(0, 1000); self.ai_progress_bar.setFormat("%p%"); self.ai_progress_bar.setVisible(False); page_layout.addWidget(self.ai_progress_bar)
+        self.ai_eta_label = QLabel(""); self.ai_eta_label.setVisible(False); page_layout.addWidget(self.ai_eta_label)
+        page_layout.addWidget(self.log_label); page_layout.addWidget(self.log_display)
+        # --- Preview (first page image + page-count estimate), hidden until a preview is available ---
+        self.preview_info_label = QLabel(""); self.preview_info_label.setVisible(False); page_layout.addWidget(self.preview_info_label)
+        self.preview_image_label = QLabel(); self.preview_image_label.setAlignment(Qt.AlignmentFlag.AlignCenter); self.preview_image_label.setVisible(False); page_layout.addWidget(self.preview_image_label)
+        page_layout.addSpacerItem(QSpacerItem(20, 20, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)); back_button_container = QWidget(); back_button_layout = QHBoxLayout(back_button_container); back_button_layout.setContentsMargins(0,0,0,0); back_button_layout.addStretch(1); self.back_button = QPushButton("Back to Input"); self.back_button.setMinimumHeight(BUTTON_MIN_HEIGHT); self.back_button.setMinimumWidth(LOAD_FILE_BUTTON_MIN_WIDTH); self.back_button.clicked.connect(self._go_to_input_page); back_button_layout.addWidget(self.back_button); page_layout.addWidget(back_button_container, alignment=Qt.AlignmentFlag.AlignRight); return page
+    def _load_selected_prompt(self, index):
+        if hasattr(self, 'prompt_input') and self.prompt_input and self.prompt_input.isEnabled(): selected_prompt_name = self.prompt_combo.itemText(index); prompt_text = PREDEFINED_PROMPTS.get(selected_prompt_name, ""); self.prompt_input.setText(prompt_text); 
+        if hasattr(self, 'log_message'): self.log_message(f"Loaded prompt: '{selected_prompt_name}'.")
+    def _start_warm_up(self):
+        """Warms up the LM Studio model in the background, unless a warm-up is running or succeeded recently."""
+        if self.warm_up_worker and self.warm_up_worker.isRunning(): return
+        if self.ai_worker and self.ai_worker.isRunning(): return # A real job is already paying the cold start
+        if self._last_warm_up_time is not None and time.monotonic() - self._last_warm_up_time < AI_WARM_UP_INTERVAL_SECONDS: return
+        self.log_message("Warming up the AI model in background...", color=COLOR_STATUS_DEFAULT)
+        self.warm_up_worker = WarmUpWorker(); self.warm_up_worker.finished.connect(self._handle_warm_up_result); self.warm_up_worker.start()
+    def _handle_warm_up_result(self, success, message):
+        if success: self._last_warm_up_time = time.monotonic()
+        self.log_message(message, color=COLOR_STATUS_DEFAULT if success else COLOR_WARNING_YELLOW)
+    def _get_tokenizer(self):
+        """
+        Returns the tokenizer once it is loaded. On first use, starts loading it in the
+        background (importing transformers takes seconds) and returns None meanwhile.
+        """
+        if self._tokenizer_instance is None and self.tokenizer_loader is None and not self._tokenizer_failed:
+            self.log_message("Loading tokenizer in background...", color=COLOR_STATUS_DEFAULT)
+            self.tokenizer_loader = TokenizerLoaderWorker(); self.tokenizer_loader.finished.connect(self._handle_tokenizer_loaded); self.tokenizer_loader.start()
+        return self._tokenizer_instance
+    def _handle_tokenizer_loaded(self, success, error_message):
+        self.tokenizer_loader = None
+        if success:
+            self._tokenizer_instance = get_tokenizer()
+            self.log_message("Tokenizer loaded.", color=COLOR_STATUS_DEFAULT); self._request_token_update()
+        else:
+            self._tokenizer_failed = True
+            self.log_message(f"Error loading tokenizer: {error_message}", color=COLOR_ERROR_RED)
+            QMessageBox.warning(self, "Tokenizer Error", f"Could not load tokenizer: {error_message}\nToken counting may be inaccurate.")
+    def _get_token_count(self, text):
+        if not text: return 0
+        tokenizer = self._get_tokenizer()
+        if tokenizer:
+            try: token_ids = tokenizer.encode(text, add_special_tokens=False); return len(token_ids)
+            except Exception as e:
+                if not hasattr(self, '_tokenizer_error_logged'): self.log_message(f"Error during token counting: {e}", color=COLOR_ERROR_RED); self._tokenizer_error_logged = True
+                return 0 
+        else: return len(text.split()) if text else 0
+    def _request_token_update(self):
+        self.token_update_timer.start() 
+    def _perform_token_update(self):
+        if not hasattr(self, 'original_text_input') or not hasattr(self, 'token_count_label'): return 
+        if self._large_file is not None: return # Counted in the background by LargeFileStatsWorker
+        input_text = self.original_text_input.toPlainText(); token_count = self._get_token_count(input_text)
+        approx = "" if self._tokenizer_instance is not None else "~" # Word count until the tokenizer is ready
+        self.token_count_label.setText(f"Tokens: {approx}{token_count} / {LLM_CONTEXT_WINDOW}")
+        base_style = "font-family: 'Consolas', 'Monaco', 'Courier New', monospace; font-size: 10px;"
+        if token_count > LLM_CONTEXT_WINDOW: self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_EXCEEDED}; {base_style}")
+        elif token_count > LLM_CONTEXT_WINDOW * (TOKEN_WARNING_THRESHOLD_PERCENT / 100.0): self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_WARNING}; {base_style}")
+        else: self.token_count_label.setStyleSheet(f"color: {COLOR_TOKEN_NORMAL}; {base_style}")
+        self._update_page_estimate()
+    def _update_page_estimate(self, *_):
+        if not hasattr(self, 'page_estimate_label'): return
+        if self._large_file is not None: self.page_estimate_label.setText("Est. Pages: -"); return
+        source = self._current_document() or self.original_text_input.toPlainText()
+        if not source: self.page_estimate_label.setText("Est. Pages: -"); return
+        from pdf_generator import estimate_page_count # Lazy: imports reportlab
+        try: self.page_estimate_label.setText(f"Est. Pages: ~{estimate_page_count(source, self.page_size_combo.currentText(), self.font_size_spinbox.value())}")
+        except Exception as e: self.page_estimate_label.setText("Est. Pages: ?"); print(f"WARNING UI: Page estimate failed: {e}")
+    def _get_stylesheet(self): 
+         return f""" QMainWindow {{ color: {COLOR_TEXT_NEON_GREEN}; font-family: 'Consolas', 'Monaco', 'Courier New', monospace; background-color: {COLOR_BACKGROUND_DARK}; }} QWidget#centralWidget {{ background-color: transparent; }} QWidget {{ background-color: transparent; font-family: 'Consolas', 'Monaco', 'Courier New', monospace; }} QFrame {{ border: 1px solid {COLOR_HIGHLIGHT_CYAN}; border-radius: 5px; background-color: #222222; }} QFrame[frameShape="4"] {{ border: none; background-color: transparent; min-height: {SEPARATOR_HEIGHT_PX}px; max-height: {SEPARATOR_HEIGHT_PX}px; margin-top: {SEPARATOR_MARGIN_V}px; margin-bottom: {SEPARATOR_MARGIN_V}px; background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 transparent, stop:0.2 {SEPARATOR_COLOR}, stop:0.8 {SEPARATOR_COLOR}, stop:1 transparent); }} QLabel {{ color: {COLOR_HIGHLIGHT_CYAN}; font-size: 14px; font-weight: bold; margin-bottom: 3px; background-color: transparent; }} QLabel:disabled {{ color: {COLOR_DISABLED_TEXT}; }} QTextEdit, QLineEdit, QSpinBox, QComboBox {{ background-color: {COLOR_INPUT_BACKGROUND}; color: {COLOR_TEXT_NEON_GREEN}; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; padding: 8px; selection-background-color: #004444; font-size: 13px; border-radius: 4px; }} QTextEdit:disabled, QLineEdit:disabled, QSpinBox:disabled, QComboBox:disabled {{ background-color: {COLOR_DISABLED_BG}; color: {COLOR_DISABLED_TEXT}; border: 1px solid {COLOR_DISABLED_BORDER}; }} QComboBox::drop-down {{ border-left: 1px solid {COLOR_HIGHLIGHT_CYAN}; }} QComboBox::drop-down:disabled {{ border-left: 1px solid {COLOR_DISABLED_BORDER}; }} QComboBox QAbstractItemView {{ background-color: {COLOR_INPUT_BACKGROUND}; color: {COLOR_TEXT_NEON_GREEN}; selection-background-color: #005555; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; }} QLineEdit {{ padding: 5px 8px; }} QCheckBox {{ color: {COLOR_HIGHLIGHT_CYAN}; font-size: 13px; }} QSpinBox {{ padding: 5px 8px; }} QPushButton {{ background-color: {COLOR_BUTTON_GREEN_DARK}; color: {COLOR_TEXT_NEON_GREEN}; border: 2px solid {COLOR_TEXT_NEON_GREEN}; padding: 10px 15px; font-size: 14px; font-weight: bold; border-radius: 7px; }} QPushButton:hover {{ background-color: {COLOR_BUTTON_GREEN_HOVER}; border-color: #33ff33; }} QPushButton:pressed {{ background-color: {COLOR_BUTTON_GREEN_PRESSED}; }} QPushButton:disabled {{ background-color: {COLOR_DISABLED_BG}; color: {COLOR_DISABLED_TEXT}; border-color: {COLOR_DISABLED_BORDER}; }} QMessageBox {{ background-color: {COLOR_BACKGROUND_DARK}; }} QMessageBox QLabel {{ color: {COLOR_TEXT_NEON_GREEN}; font-size: 13px; }} QFileDialog {{ background-color: {COLOR_BACKGROUND_DARK}; }} QProgressBar {{ border: 1px solid {COLOR_TEXT_NEON_GREEN}; border-radius: 3px; background-color: #333333; text-align: center; color: {COLOR_TEXT_NEON_GREEN}; }} QProgressBar::chunk {{ background-color: {COLOR_TEXT_NEON_GREEN}; }} QProgressDialog {{ background-color: {COLOR_BACKGROUND_DARK}; color: {COLOR_TEXT_NEON_GREEN}; border: 2px solid {COLOR_HIGHLIGHT_CYAN}; border-radius: 5px; }} QProgressDialog QLabel {{ color: {COLOR_HIGHLIGHT_CYAN}; font-size: 13px; font-weight: normal; }} QProgressDialog QProgressBar {{ border: 1px solid {COLOR_TEXT_NEON_GREEN}; border-radius: 3px; background-color: #333333; text-align: center; color: {COLOR_TEXT_NEON_GREEN}; }} QProgressDialog QProgressBar::chunk {{ background-color: {COLOR_TEXT_NEON_GREEN}; }} QProgressDialog QPushButton {{ padding: 5px 10px; font-size: 12px; }} """
+    def _apply_background_image(self):
+        central_widget = self.centralWidget();
+        if not central_widget or not os.path.exists(BACKGROUND_IMAGE_PATH):
+            if not os.path.exists(BACKGROUND_IMAGE_PATH) and hasattr(self, 'log_message'): self.log_message(f"Warning: BG image missing: {BACKGROUND_IMAGE_PATH}", COLOR_WARNING_YELLOW)
+            return
+        try:
+            background_pixmap = QPixmap(BACKGROUND_IMAGE_PATH)
+            if not background_pixmap.isNull():
+                palette = central_widget.palette(); scaled_pixmap = background_pixmap.scaled(central_widget.size(), Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation)
+                brush = QBrush(scaled_pixmap); palette.setBrush(QPalette.ColorRole.Window, brush); central_widget.setPalette(palette); central_widget.setAutoFillBackground(True)
+            elif hasattr(self, 'log_message'): self.log_message(f"Warning: Could not load pixmap from {BACKGROUND_IMAGE_PATH}.", COLOR_WARNING_YELLOW)
+        except Exception as e:
+            if hasattr(self, 'log_message'): self.log_message(f"Error applying background: {e}", color=COLOR_ERROR_RED)
+    def resizeEvent(self, event):
+        super().resizeEvent(event); self._apply_background_image()
+
+    def _extract_text_from_docx(self, file_path):
+        if not is_extractor_available(".docx"): self.log_message("python-docx not available.", COLOR_ERROR_RED); return None, "python-docx library not installed."
+        try:
+            with profiling.job(f"load-{os.path.basename(file_path)}"): self._loaded_document, cache_hit = extract_file(file_path)
+            if cache_hit: self.log_message(f"Loaded '{os.path.basename(file_path)}' from the extraction cache.")
+            return self._loaded_document.to_markup(), None
+        except Exception as e:
+            self.log_message(f"Error reading .docx file {os.path.basename(file_path)}: {e}", COLOR_ERROR_RED)
+            return None, f"Error reading .docx file: {e}"
+
+    # +++ ADDED Method to Extract Text from PPTX +++
+    def _extract_text_from_pptx(self, file_path):
+        """Extracts text from a PPTX file slide by slide."""
+        if not is_extractor_available(".pptx"):
+            self.log_message("python-pptx library is not available. Cannot process PPTX files.", COLOR_ERROR_RED)
+            return None, "python-pptx library not installed."
+        try:
+            with profiling.job(f"load-{os.path.basename(file_path)}"): self._loaded_document, cache_hit = extract_file(file_path)
+            if cache_hit: self.log_message(f"Loaded '{os.path.basename(file_path)}' from the extraction cache.")
+            return self._loaded_document.to_markup(), None
+        except Exception as e:
+            error_msg = f"Error reading PPTX file {os.path.basename(file_path)}: {e}"
+            self.log_message(error_msg, color=COLOR_ERROR_RED)
+            # import traceback # Uncomment for detailed debug
+            # self.log_message(traceback.format_exc(), color=COLOR_ERROR_RED) # Uncomment for detailed debug
+            return None, f"Error reading PPTX file: {e}"
+
+    def _current_document(self):
+        """
+        The Document model of the loaded file, if the input text is still exactly what was extracted.
+        Returns None once the user has edited the text (or for pasted/.txt input).
+        """
+        if self._loaded_document is None or self._large_file is not None: return None
+        if self.original_text_input.toPlainText().strip() != self._loaded_document.to_markup():
+            self._loaded_document = None
+        return self._loaded_document
+
+
+    def load_file(self):
+        # --- MODIFIED to include PPTX ---
+        file_types = "Supported Files (*.txt *.docx *.pptx);;Text files (*.txt);;Word documents (*.docx);;PowerPoint files (*.pptx);;All files (*)" # Added PPTX filter
+        file_path, selected_filter = QFileDialog.getOpenFileName(
+            self, "Select a File to Load", "", file_types)
+
+        if file_path:
+            file_content = None; error_message = None; self._loaded_document = None
+            file_extension = os.path.splitext(file_path)[1].lower()
+
+            try:
+                if file_extension == '.txt' and is_large_file(file_path, LARGE_FILE_THRESHOLD_BYTES):
+                    self._open_large_file(file_path); return
+                if file_extension == '.txt':
+                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f: file_content = f.read()
+                elif file_extension == '.docx':
+                    if not is_extractor_available(".docx"): error_message = "python-docx library not installed."; QMessageBox.warning(self, "Library Missing", error_message)
+                    else: file_content, error_message = self._extract_text_from_docx(file_path)
+                # +++ Add PPTX handling +++
+                elif file_extension == '.pptx':
+                    if not is_extractor_available(".pptx"): # Check if python-pptx is installed
+                        error_message = "python-pptx library not installed. Cannot load .pptx files."
+                        QMessageBox.warning(self, "Library Missing", error_message)
+                    else:
+                        file_content, error_message = self._extract_text_from_pptx(file_path) # Call the extractor
+                # +++ End PPTX handling +++
+                else: 
+                    error_message = f"Unsupported file type: {file_extension}. Please select .txt, .docx, or .pptx." # Updated message
+                    QMessageBox.warning(self, "Unsupported File", error_message)
+                
+                # Process result
+                if file_content is not None:
+                    if not self._close_large_file(): return
+                    self.original_text_input.setText(file_content); self.update_status(f"Loaded file: {os.path.basename(file_path)}", COLOR_TEXT_NEON_GREEN); self._loaded_file_name = os.path.splitext(os.path.basename(file_path))[0]
+                    self.log_message(f"Loaded file: {os.path.basename(file_path)}"); self._request_token_update() 
+                    if AI_WARM_UP_ON_FILE_LOAD: self._start_warm_up()
+                elif error_message: 
+                    self.update_status(f"Error loading {os.path.basename(file_path)}.", COLOR_ERROR_RED); self.log_message(error_message, color=COLOR_ERROR_RED) 
+                    if "Unsupported file type" not in error_message and "library not installed" not in error_message: QMessageBox.critical(self, "Error", error_message)
+                
+            except Exception as e: 
+                error_msg = f"Error processing file {os.path.basename(file_path)}: {e}"; self.update_status("Error processing file.", COLOR_ERROR_RED)
+                self.log_message(error_msg, color=COLOR_ERROR_RED); QMessageBox.critical(self, "Error", error_msg)
+
+
+    # --- Large-File Mode ---
+    def _open_large_file(self, file_path):
+        """Memory-maps a large .txt file and shows a read-only, paged preview instead of the full text."""
+        if not self._close_large_file(): return
+        self._large_file = LargeTextFile(file_path); self._large_file_page = 0
+        self.original_text_input.setReadOnly(True); self.large_file_nav_widget.setVisible(True)
+        self._show_large_file_page(0)
+        self.token_count_label.setText(f"Tokens: scanning... / {LLM_CONTEXT_WINDOW}")
+        size_mb = self._large_file.size / (1024 * 1024)
+        self.update_status(f"Loaded large file (preview): {self._large_file.name}", COLOR_TEXT_NEON_GREEN)
+        self.log_message(f"Large-file mode: '{self._large_file.name}' ({size_mb:.1f} MB) is memory-mapped. Showing a read-only preview; the full text is streamed to the AI in segments.")
+        self.large_file_stats_worker = LargeFileStatsWorker(self._large_file)
+        self.large_file_stats_worker.progress.connect(lambda percent: self.token_count_label.setText(f"Tokens: scanning {percent}%... / {LLM_CONTEXT_WINDOW}"))
+        self.large_file_stats_worker.finished.connect(self._handle_large_file_stats)
+        self.large_file_stats_worker.start()
+        if AI_WARM_UP_ON_FILE_LOAD: self._start_warm_up()
+    def _show_large_file_page(self, index):
+        if self._large_file is None: return
+        page_count = self._large_file.page_count; self._large_file_page = min(max(index, 0), page_count - 1)
+        self.original_text_input.blockSignals(True); self.original_text_input.setPlainText(self._large_file.read_page(self._large_file_page)); self.original_text_input.blockSignals(False)
+        self.large_file_page_label.setText(f"Page {self._large_file_page + 1} / {page_count}")
+        self.large_file_prev_button.setEnabled(self._large_file_page > 0); self.large_file_next_button.setEnabled(self._large_file_page < page_count - 1)
+    def _handle_large_file_stats(self, stats):
+        self.large_file_stats_worker = None
+        if not stats.get("complete") or self._large_file is None: return
+        approx = "~" if stats.get("estimated") else ""; size_mb = stats["bytes"] / (1024 * 1024)
+        self.token_count_label.setText(f"Tokens: {approx}{stats['tokens']:,} / {LLM_CONTEXT_WINDOW} | {size_mb:.1f} MB, {stats['lines']:,} lines")
+        base_style = "font-family: 'Consolas', 'Monaco', 'Courier New', monospace; font-size: 10px;"
+        # Large files are sent in segments, so exceeding the context window is expected; show it as a warning only
+        token_color = COLOR_TOKEN_WARNING if stats['tokens'] > LLM_CONTEXT_WINDOW else COLOR_TOKEN_NORMAL
+        self.token_count_label.setStyleSheet(f"color: {token_color}; {base_style}")
+        self.log_message(f"Large file statistics: {approx}{stats['tokens']:,} tokens, {stats['words']:,} words, {stats['lines']:,} lines, {size_mb:.1f} MB.")
+    def _close_large_file(self):
+        """Leaves large-file mode. Returns False if the file is still in use by the AI worker."""
+        if self._large_file is None: return True
+        if self.ai_worker and self.ai_worker.isRunning():
+            QMessageBox.warning(self, "File In Use", "The large file is still being processed. Wait for the AI worker to finish."); return False
+        if self.large_file_stats_worker and self.large_file_stats_worker.isRunning(): self.large_file_stats_worker.stop(); self.large_file_stats_worker.wait()
+        self.large_file_stats_worker = None
+        self.log_message(f"Closed large file '{self._large_file.name}'.")
+        self._large_file.close(); self._large_file = None
+        self.original_text_input.setReadOnly(False); self.large_file_nav_widget.setVisible(False)
+        self.original_text_input.clear(); self._request_token_update()
+        return True
+
+
+    # --- Subsequent methods (start_ai_processing, cancel_ai_processing, etc.) are correct ---
+    def _update_process_button_text(self, mode):
+        labels = {PROCESSING_MODE_AI: "Process with AI & Generate PDF", PROCESSING_MODE_AUTO: "Process (Auto) & Generate PDF", PROCESSING_MODE_DIRECT: "Generate PDF (Direct Render)"}
+        self.process_button.setText(labels.get(mode, labels[PROCESSING_MODE_AI]))
+    def _try_direct_render(self, original_text):
+        """
+        Skips the LLM when the mode is "Direct Render", or "Auto" and the text scores as well-structured.
+        Returns True if PDF generation was started directly.
+        """
+        mode = self.processing_mode_combo.currentText()
+        if mode == PROCESSING_MODE_AI: return False
+        if self._large_file is not None:
+            self.log_message("Direct render is not available in large-file mode. Using AI processing.", COLOR_WARNING_YELLOW); return False
+        source = self._current_document() or original_text # Render the extracted Document without re-parsing when possible
+        if mode == PROCESSING_MODE_AUTO:
+            score, reasons = score_structure(source)
+            if score < DIRECT_RENDER_SCORE_THRESHOLD:
+                self.log_message(f"Auto mode: structure score {score:.2f} < {DIRECT_RENDER_SCORE_THRESHOLD:.2f}, using AI processing. ({'; '.join(reasons)})"); return False
+            self.log_message(f"Auto mode: structure score {score:.2f} >= {DIRECT_RENDER_SCORE_THRESHOLD:.2f}, rendering directly without the LLM.")
+        self.stacked_widget.setCurrentIndex(1); self.update_status("Direct render: preparing PDF...", COLOR_TEXT_NEON_GREEN); self.log_message("Direct render: skipping AI processing.")
+        self.save_pdf_from_ai_output(source)
+        return True
+    def start_ai_processing(self): 
+        original_text = self._large_file if self._large_file is not None else self.original_text_input.toPlainText().strip(); prompt_instruction = self.prompt_input.toPlainText().strip() 
+        if not original_text: QMessageBox.warning(self, "Input Required", "Please enter or load text."); self.update_status("Please enter or load text.", COLOR_WARNING_YELLOW); self.log_message("Processing cancelled: No original text.", color=COLOR_WARNING_YELLOW); return
+        self.log_display.clear(); self._pending_checkpoint = None
+        if self._try_direct_render(original_text): return
+        if not prompt_instruction: QMessageBox.warning(self, "Input Required", "Please provide AI instructions."); self.update_status("Please provide AI instructions.", COLOR_WARNING_YELLOW); self.log_message("Processing cancelled: No AI instructions.", color=COLOR_WARNING_YELLOW); return
+        self.stacked_widget.setCurrentIndex(1); self.update_status("Starting AI processing...", COLOR_WARNING_YELLOW); self.log_message("Starting AI processing...")
+        self.progress_dialog = QProgressDialog("AI Processing...", "Cancel", 0, 1000, self); self.progress_dialog.setAutoClose(False); self.progress_dialog.setAutoReset(False); self.progress_dialog.setWindowTitle("AI at Work"); self.progress_dialog.setWindowModality(Qt.WindowModality.WindowModal); self.progress_dialog.canceled.connect(self.cancel_ai_processing); self.progress_dialog.show()
+        # Hand the extracted Document to the worker if the text is unchanged; it is serialized when the request is built
+        current_document = self._current_document()
+        if current_document is not None: original_text = current_document
+        self._eta_elapsed = 0.0; self._eta_remaining = None; self._eta_received = None
+        self.ai_progress_bar.setValue(0); self.ai_progress_bar.setVisible(True); self.ai_eta_label.setText("ETA: estimating..."); self.ai_eta_label.setVisible(True); self.eta_timer.start()
+        self.ai_worker = AIWorker(original_text, prompt_instruction, compact=self.compact_input_checkbox.isChecked()); self.ai_worker.finished.connect(self.handle_ai_response); self.ai_worker.progress.connect(self.update_progress_dialog); self.ai_worker.eta.connect(self._handle_eta); self.ai_worker.start()
+    def _handle_eta(self, elapsed, remaining):
+        self._eta_elapsed = elapsed; self._eta_remaining = remaining; self._eta_received = time.monotonic(); self._update_eta_display()
+    def _update_eta_display(self):
+        """Advances the progress bar and ETA between worker updates by counting down the last prediction."""
+        if self._eta_received is None: return
+        since_update = time.monotonic() - self._eta_received
+        elapsed = self._eta_elapsed + since_update; remaining = max(self._eta_remaining - since_update, 0.0)
+        fraction = min(elapsed / (elapsed + remaining), 0.99) if elapsed + remaining > 0 else 0.0 # Never show 100% before the result arrives
+        self.ai_progress_bar.setValue(int(fraction * 1000))
+        if self.progress_dialog: self.progress_dialog.setValue(int(fraction * 1000))
+        if remaining > 0: self.ai_eta_label.setText(f"ETA: ~{remaining:.0f}s remaining (elapsed {elapsed:.0f}s)")
+        else: self.ai_eta_label.setText(f"ETA: taking longer than predicted (elapsed {elapsed:.0f}s)")
+    def _stop_eta_display(self, completed):
+        self.eta_timer.stop(); self._eta_received = None
+        if completed: self.ai_progress_bar.setValue(1000); self.ai_eta_label.setText(f"AI processing finished in {self._eta_elapsed:.0f}s.")
+        else: self.ai_progress_bar.setVisible(False); self.ai_eta_label.setVisible(False)
+    def cancel_ai_processing(self):
+        self.log_message("AI processing cancellation requested.", color=COLOR_WARNING_YELLOW) 
+        self._stop_eta_display(False)
+        if self.ai_worker and self.ai_worker.isRunning(): self.ai_worker.stop()
+        if self.progress_dialog: self.progress_dialog.close(); self.progress_dialog = None 
+        self.update_status("AI processing cancellation requested.", COLOR_WARNING_YELLOW)
+        if hasattr(self, 'back_button') and self.back_button: self.back_button.setEnabled(True)
+    def update_progress_dialog(self, message):
+         if self.progress_dialog and self.progress_dialog.isVisible(): self.progress_dialog.setLabelText(message)
+         self.log_message(f"AI Progress: {message}", color=COLOR_STATUS_DEFAULT)
+    def handle_ai_response(self, success, ai_output_or_error, was_cancelled): 
+        if self.progress_dialog: self.progress_dialog.close(); self.progress_dialog = None
+        if self._eta_received is not None: self._eta_elapsed += time.monotonic() - self._eta_received
+        self._stop_eta_display(success and not was_cancelled)
+        if was_cancelled:
+            self.log_message("AI processing was confirmed cancelled. Skipping PDF generation.", COLOR_WARNING_YELLOW); self.update_status("AI Processing Cancelled.", COLOR_WARNING_YELLOW)
+            if self.ai_worker and self.ai_worker.checkpoint: self.log_message("Completed segments are checkpointed. Process the same file with the same prompt to resume.")
+            if hasattr(self, 'back_button') and self.back_button: self.back_button.setEnabled(True)
+            return 
+        if not success: 
+            self.update_status(f"AI Processing Failed: {ai_output_or_error}", COLOR_ERROR_RED); self.log_message(f"AI Error: {ai_output_or_error}", color=COLOR_ERROR_RED)
+            QMessageBox.critical(self, "AI Error", ai_output_or_error)
+            if hasattr(self, 'back_button') and self.back_button: self.back_button.setEnabled(True)
+            return 
+        self.update_status("AI processing complete. Preparing PDF...", COLOR_TEXT_NEON_GREEN); self.log_message("AI processing complete. Preparing PDF generation...")
+        self._pending_checkpoint = self.ai_worker.checkpoint if self.ai_worker else None
+        self.save_pdf_from_ai_output(ai_output_or_error) 
+    def save_pdf_from_ai_output(self, processed_text): 
+         selected_page_size = self.page_size_combo.currentText(); selected_font_size = self.font_size_spinbox.value(); parallel_render = self.parallel_render_checkbox.isChecked(); default_filename = "ai_formatted_document.pdf" 
+         output_filename, _ = QFileDialog.getSaveFileName(self, "Save AI Formatted PDF", default_filename, "PDF files (*.pdf);;All files (*)") 
+         if not output_filename: 
+            self.update_status("PDF save cancelled.", COLOR_WARNING_YELLOW); self.log_message("PDF save cancelled.", color=COLOR_WARNING_YELLOW); 
+            if self._pending_checkpoint: self._pending_checkpoint.discard(); self._pending_checkpoint = None # Declined: the next run is a fresh job
+            if hasattr(self, 'back_button'): self.back_button.setEnabled(True); 
+            print("DEBUG UI: PDF save dialog cancelled by user.") 
+            return
+         print(f"DEBUG UI: PDF Filename selected: {output_filename}") 
+         if not output_filename.lower().endswith('.pdf'): output_filename += '.pdf'
+         self.update_status("Generating PDF in background...", COLOR_WARNING_YELLOW); 
+         self.log_message(f"Starting background PDF generation '{os.path.basename(output_filename)}'...")
+         if hasattr(self, 'back_button'): self.back_button.setEnabled(False)
+         print(f"DEBUG UI: Creating PDFWorker (Font: {selected_font_size}). Text length: {len(processed_text)}") 
+         self.pdf_worker = PDFWorker(processed_text, output_filename, selected_page_size, selected_font_size, parallel=parallel_render,
+                                     reproducible=PDF_REPRODUCIBLE or self._pending_checkpoint is not None) # A resumed large-file job gives the same file as an uninterrupted one
+         print(f"DEBUG UI: Connecting PDFWorker finished signal...") 
+         self.pdf_worker.finished.connect(self.handle_pdf_result) 
+         print(f"DEBUG UI: Starting PDFWorker...") 
+         self.pdf_worker.start()
+         if PDF_PREVIEW_ON_GENERATE: self._start_preview(processed_text, selected_page_size, selected_font_size)
+    # --- Multi-Prompt Fan-Out ---
+    def _choose_fan_out_prompts(self):
+        """Dialog with a multi-select list of prompt templates. Returns the chosen names ([] if cancelled)."""
+        dialog = QDialog(self); dialog.setWindowTitle("Fan-Out: Choose Prompts"); dialog_layout = QVBoxLayout(dialog)
+        dialog_layout.addWidget(QLabel("One PDF is generated per selected prompt. Requests run concurrently."))
+        prompt_list = QListWidget(); prompt_list.setSelectionMode(QAbstractItemView.SelectionMode.MultiSelection); prompt_list.addItems(PROMPT_NAMES); dialog_layout.addWidget(prompt_list)
+        current_items = prompt_list.findItems(self.prompt_combo.currentText(), Qt.MatchFlag.MatchExactly)
+        if current_items: current_items[0].setSelected(True)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel); buttons.accepted.connect(dialog.accept); buttons.rejected.connect(dialog.reject); dialog_layout.addWidget(buttons)
+        if dialog.exec() != QDialog.DialogCode.Accepted: return []
+        return [prompt_list.item(row).text() for row in range(prompt_list.count()) if prompt_list.item(row).isSelected()]
+    def start_fan_out(self):
+        original_text = self.original_text_input.toPlainText().strip()
+        if self._large_file is not None: QMessageBox.warning(self, "Fan-Out", "Fan-out is not available in large-file mode."); return
+        if not original_text: QMessageBox.warning(self, "Input Required", "Please enter or load text."); self.update_status("Please enter or load text.", COLOR_WARNING_YELLOW); return
+        prompt_names = self._choose_fan_out_prompts()
+        if not prompt_names: self.log_message("Fan-out cancelled: no prompts selected.", COLOR_WARNING_YELLOW); return
+        output_dir = QFileDialog.getExistingDirectory(self, "Folder for the Fan-Out PDFs")
+        if not output_dir: self.log_message("Fan-out cancelled: no output folder.", COLOR_WARNING_YELLOW); return
+        source = self._current_document() or original_text # The extracted Document is shared by every prompt
+        self.log_display.clear(); self.stacked_widget.setCurrentIndex(1); self.back_button.setEnabled(False)
+        self.update_status(f"Fan-out: {len(prompt_names)} prompt(s) running...", COLOR_WARNING_YELLOW); self.log_message(f"Fan-out to '{output_dir}': {', '.join(prompt_names)}")
+        self.fan_out_worker = FanOutWorker(source, prompt_names, output_dir, self._loaded_file_name or "document", self.page_size_combo.currentText(), self.font_size_spinbox.value(),
+                                           compact=self.compact_input_checkbox.isChecked())
+        self.fan_out_worker.progress.connect(lambda message: self.log_message(message)); self.fan_out_worker.finished.connect(self._handle_fan_out_result); self.fan_out_worker.start()
+    def _handle_fan_out_result(self, results, summary):
+        self.back_button.setEnabled(True); self.fan_out_worker = None
+        for entry in results: self.log_message(f"{entry['prompt']}: {entry['pdf_path'] or entry['message']}", COLOR_TEXT_NEON_GREEN if entry["success"] else COLOR_ERROR_RED)
+        all_succeeded = bool(results) and all(entry["success"] for entry in results)
+        self.update_status(summary, COLOR_TEXT_NEON_GREEN if all_succeeded else COLOR_WARNING_YELLOW); self.log_message(summary, COLOR_TEXT_NEON_GREEN if all_succeeded else COLOR_WARNING_YELLOW)
+    # --- Preview ---
+    def preview_pdf(self):
+        """Renders the first page(s) of the current input with the selected page/font size, without a full build."""
+        source = self._current_document() or self.original_text_input.toPlainText().strip()
+        if not source: QMessageBox.warning(self, "Input Required", "Please enter or load text."); return
+        self.stacked_widget.setCurrentIndex(1); self.update_status("Generating preview...", COLOR_WARNING_YELLOW)
+        if self._large_file is not None: self.log_message("Large-file mode: previewing the current preview page only.", COLOR_WARNING_YELLOW)
+        self._start_preview(source, self.page_size_combo.currentText(), self.font_size_spinbox.value())
+    def _start_preview(self, source, page_size, font_size):
+        if self.preview_worker and self.preview_worker.isRunning(): self.log_message("A preview is already being generated.", COLOR_WARNING_YELLOW); return
+        self.preview_image_label.setVisible(False); self.preview_info_label.setVisible(False)
+        self._preview_settings = (page_size, font_size)
+        self.log_message(f"Generating first-page preview ({page_size}, {font_size}pt)...")
+        self.preview_worker = PreviewWorker(source, page_size, font_size, PDF_PREVIEW_MAX_PAGES)
+        self.preview_worker.finished.connect(self._handle_preview_result)
+        self.preview_worker.start()
+    def _handle_preview_result(self, success, pdf_bytes_or_error, estimated_pages):
+        self.preview_worker = None
+        if not success: self.log_message(f"Preview failed: {pdf_bytes_or_error}", COLOR_ERROR_RED); self.update_status("Preview failed.", COLOR_ERROR_RED); return
+        page_size, font_size = self._preview_settings
+        info = f"Preview: {page_size}, {font_size}pt | Estimated total: ~{estimated_pages} page{'s' if estimated_pages != 1 else ''}"
+        self.preview_info_label.setText(info); self.preview_info_label.setVisible(True); self.log_message(info)
+        if self.pdf_worker is None: self.update_status("Preview ready.", COLOR_TEXT_NEON_GREEN)
+        pixmap = self._render_preview_pixmap(pdf_bytes_or_error)
+        if pixmap is not None: self.preview_image_label.setPixmap(pixmap); self.preview_image_label.setVisible(True)
+    def _render_preview_pixmap(self, pdf_bytes):
+        """Rasterizes page 1 of an in-memory PDF with QtPdf. Returns a QPixmap or None."""
+        # QtPdf is part of PyQt6 >= 6.4 wheels; imported lazily as it is only needed for previews
+        try: from PyQt6.QtPdf import QPdfDocument
+        except ImportError: self.log_message("QtPdf not available: showing the page estimate only.", COLOR_WARNING_YELLOW); return None
+        try:
+            self._preview_buffer = QBuffer(); self._preview_buffer.setData(QByteArray(pdf_bytes)); self._preview_buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+            self._preview_pdf_document = QPdfDocument(self); self._preview_pdf_document.load(self._preview_buffer)
+            if self._preview_pdf_document.pageCount() < 1: return None
+            page_points = self._preview_pdf_document.pagePointSize(0)
+            width = PDF_PREVIEW_IMAGE_WIDTH; height = int(width * page_points.height() / page_points.width()) if page_points.width() else width
+            image = self._preview_pdf_document.render(0, QSize(width, height))
+            return None if image.isNull() else QPixmap.fromImage(image)
+        except Exception as e:
+            self.log_message(f"Could not render preview image: {e}", COLOR_WARNING_YELLOW); return None
+    def handle_pdf_result(self, success, message):
+        print(f"DEBUG UI: handle_pdf_result received: success={success}, message='{message[:100]}...'") 
+        if hasattr(self, 'back_button'): self.back_button.setEnabled(True)
+        if success: 
+            self.update_status(message, COLOR_TEXT_NEON_GREEN); self.log_message(message, color=COLOR_TEXT_NEON_GREEN)
+            if self._pending_checkpoint: self._pending_checkpoint.discard(); self._pending_checkpoint = None
+        else: 
+            detailed_error_message = f"PDF Generation Error: {message}"
+            self.update_status("PDF Generation Failed.", COLOR_ERROR_RED) 
+            self.log_message(detailed_error_message, color=COLOR_ERROR_RED) 
+            QMessageBox.critical(self, "PDF Generation Error", f"Failed to generate PDF.\nDetails logged.\nError: {message.splitlines()[0]}") 
+        self.pdf_worker = None 
+    def update_status(self, message, color=COLOR_STATUS_DEFAULT):
+        if hasattr(self, 'status_display') and self.status_display: self.status_display.setText(message); self.status_display.setStyleSheet(f"QLineEdit {{ color: {color}; background-color: {COLOR_INPUT_BACKGROUND}; border: 1px solid {COLOR_HIGHLIGHT_CYAN}; padding: 5px 8px; }}")
+    def log_message(self, message, color=None): 
+        if hasattr(self, 'log_display') and self.log_display:
+             timestamp = time.strftime("%H:%M:%S"); log_color = color if color else COLOR_HIGHLIGHT_CYAN 
+             current_html = self.log_display.toHtml()
+             if current_html.endswith("</body></html>"): current_html = current_html[:-len("</body></html>")]
+             escaped_message = html.escape(str(message)) 
+             new_log_entry = f"<br><span style='color: {log_color}; font-family: \"Consolas\", \"Monaco\", \"Courier New\", monospace;'>[{timestamp}] {escaped_message}</span>"
+             self.log_display.setHtml(current_html + new_log_entry + "</body></html>"); self.log_display.verticalScrollBar().setValue(self.log_display.verticalScrollBar().maximum())
+    def _go_to_input_page(self):
+        self.stacked_widget.setCurrentIndex(0)
+        if hasattr(self, 'process_button') and self.process_button: self.process_button.setEnabled(True) 
+        self.update_status("Ready for input.", COLOR_STATUS_DEFAULT)
+
+# --- Standalone Execution ---
+if __name__ == '__main__':
+    print("Running UI standalone test...")
+    app = QApplication(sys.argv)
+    main_window = ModernHackerPDFConverterWindow()
+    main_window.show()
     sys.exit(app.exec())
\ No newline at end of file
@@ -1,107 +1,255 @@
-# worker.py
-
-from PyQt6.QtCore import QThread, pyqtSignal, QMutex 
-import time
-import sys
-from PyQt6.QtWidgets import QApplication 
-from ai_processor import process_text_with_ai
-
-class AIWorker(QThread):
-    """
-    Worker thread for running the AI processing in the background.
-    Communicates with the main GUI thread using signals.
-    """
-    # Signal emitted when processing is completely finished
-    # Arguments: success (bool), result_or_message (str), was_cancelled (bool) <--- ADDED was_cancelled
-    finished = pyqtSignal(bool, str, bool) 
-                                    
-    # Signal emitted to report progress or current status
-    # Argument: message (str)
-    progress = pyqtSignal(str)
-
-    def __init__(self, text_to_process, prompt_instruction):
-        """Initializes the AIWorker with text and prompt."""
-        super().__init__()
-        self.text_to_process = text_to_process
-        self.prompt_instruction = prompt_instruction
-        self._mutex = QMutex() # Mutex for safe access to _is_running flag
-        self._is_running = True # Flag to signal thread to continue, protected by mutex
-
-    def stop(self):
-        """Safely signals the worker thread to stop processing."""
-        self._mutex.lock()
-        self._is_running = False
-        self._mutex.unlock()
-        # Optional: print for debugging
-        # print("DEBUG Worker: stop() called, _is_running set to False") 
-
-    def is_running(self):
-        """Check if the thread is supposed to be running (thread-safe)."""
-        self._mutex.lock()
-        running = self._is_running
-        self._mutex.unlock()
-        return running
-
-    def run(self):
-        """
-        The main entry point for the thread.
-        This method is executed when QThread.start() is called.
-        """
-        # Optional: print for debugging
-        # print("DEBUG Worker: run() started.")
-        
-        # Check for immediate cancellation before doing any work
-        if not self.is_running():
-            self.progress.emit("Worker cancelled before starting.")
-            # Emit finished with success=False, appropriate message, and was_cancelled=True
-            self.finished.emit(False, "AI processing cancelled before starting.", True) 
-            # print("DEBUG Worker: cancelled before API call, finished emitted.")
-            return # Exit the run method
-
-        # --- Perform the AI processing ---
-        # Pass the self.progress.emit method as the callback
-        success, result = process_text_with_ai(
-            self.text_to_process,
-            self.prompt_instruction,
-            progress_callback=self.progress.emit 
-        )
-        # Optional: print for debugging
-        # print(f"DEBUG Worker: process_text_with_ai returned: success={success}")
-
-        # --- Check for cancellation *after* processing call returns ---
-        # Use the thread-safe getter method
-        was_cancelled = not self.is_running() 
-        # Optional: print for debugging
-        # print(f"DEBUG Worker: check after API call: was_cancelled={was_cancelled}")
-
-        if was_cancelled:
-             # If stop() was called, always report as cancelled, regardless of API success
-             final_message = "AI processing was cancelled by user."
-             # Emit finished with success=False, cancellation message, and was_cancelled=True
-             self.finished.emit(False, final_message, True) 
-             # Optional: print for debugging
-             # print(f"DEBUG Worker: emitting finished (cancelled): success=False, cancelled=True, msg='{final_message}'")
-        else:
-             # If not cancelled, emit the result from process_text_with_ai
-             # Emit finished with API success/failure, API result/error, and was_cancelled=False
-             self.finished.emit(success, result, False) 
-             # Optional: print for debugging
-             # print(f"DEBUG Worker: emitting finished (normal): success={success}, cancelled=False, msg='{result[:50]}...'")
-        
-        # Optional: print for debugging
-        # print("DEBUG Worker: run() finished.")
-
-
-# --- Standalone Test Block ---
-# (Adjusted lambda to accept the new argument)
-if __name__ == '__main__':
-    app = QApplication(sys.argv) 
-    test_worker = AIWorker("Tell me a joke.", "Generate a single short joke.")
-    # Adjust lambda for the finished signal
-    test_worker.finished.connect(lambda s, m, c: print(f"Worker Finished: Success={s}, Cancelled={c}, Message={m}"))
-    test_worker.progress.connect(lambda msg: print(f"Worker Progress: {msg}"))
-    print("Starting worker thread...")
-    test_worker.start() 
-    test_worker.wait()
-    print("Worker thread finished execution.")
+# worker.py
+
+from PyQt6.QtCore import QThread, pyqtSignal, QMutex 
+import time
+import sys
+from PyQt6.QtWidgets import QApplication 
+from large_file import LargeTextFile
+from tokens import get_tokenizer, count_tokens
+from config import LARGE_FILE_SEGMENT_BYTES, INPUT_COMPACTION_ENABLED
+import profiling
+
+class AIWorker(QThread):
+    """
+    Worker thread for running the AI processing in the background.
+    Communicates with the main GUI thread using signals.
+    """
+    # Signal emitted when processing is completely finished
+    # Arguments: success (bool), result_or_message (str), was_cancelled (bool) <--- ADDED was_cancelled
+    finished = pyqtSignal(bool, str, bool) 
+                                    
+    # Signal emitted to report progress or current status
+    # Argument: message (str)
+    progress = pyqtSignal(str)
+
+    # Signal emitted with the predicted timing of the whole job (from telemetry, refined while streaming)
+    # Arguments: elapsed_seconds (float), remaining_seconds (float)
+    eta = pyqtSignal(float, float)
+
+    def __init__(self, text_to_process, prompt_instruction, compact=INPUT_COMPACTION_ENABLED):
+        """
+        Initializes the AIWorker with text and prompt.
+        text_to_process is either a string or a LargeTextFile, whose segments are
+        streamed to the AI one request at a time. compact enables input compaction.
+        Completed segments of a LargeTextFile are checkpointed (see checkpoints.py).
+        """
+        super().__init__()
+        self.text_to_process = text_to_process
+        self.prompt_instruction = prompt_instruction
+        self.compact = compact
+        self.checkpoint = None # JobCheckpoint of a large-file run; discard it once the result is saved
+        self._mutex = QMutex() # Mutex for safe access to _is_running flag
+        self._is_running = True # Flag to signal thread to continue, protected by mutex
+        self.repair_stats = {} # Formatting repair counts for this run (see ai_processor.repair_formatting)
+
+    def stop(self):
+        """Safely signals the worker thread to stop processing."""
+        self._mutex.lock()
+        self._is_running = False
+        self._mutex.unlock()
+        # Optional: print for debugging
+        # print("DEBUG Worker: stop() called, _is_running set to False") 
+
+    def is_running(self):
+        """Check if the thread is supposed to be running (thread-safe)."""
+        self._mutex.lock()
+        running = self._is_running
+        self._mutex.unlock()
+        return running
+
+    def run(self):
+        """
+        The main entry point for the thread.
+        This method is executed when QThread.start() is called.
+        """
+        # Optional: print for debugging
+        # print("DEBUG Worker: run() started.")
+        
+        # Check for immediate cancellation before doing any work
+        if not self.is_running():
+            self.progress.emit("Worker cancelled before starting.")
+            # Emit finished with success=False, appropriate message, and was_cancelled=True
+            self.finished.emit(False, "AI processing cancelled before starting.", True) 
+            # print("DEBUG Worker: cancelled before API call, finished emitted.")
+            return # Exit the run method
+
+        # --- Perform the AI processing ---
+        from ai_processor import process_text_with_ai, describe_stats # Lazy: imports requests only when a job runs
+        with profiling.job("ai") as profile:
+            if isinstance(self.text_to_process, LargeTextFile):
+                success, result = self._process_large_file(self.text_to_process)
+            else:
+                # Pass the self.progress.emit method as the callback
+                success, result = process_text_with_ai(
+                    self.text_to_process,
+                    self.prompt_instruction,
+                    progress_callback=self.progress.emit,
+                    stats=self.repair_stats,
+                    eta_callback=self.eta.emit,
+                    compact=self.compact
+                )
+        if profile and profile.directory: self.progress.emit(f"Profile written to {profile.directory}")
+        for line in describe_stats(self.repair_stats): self.progress.emit(f"This run: {line}")
+        # Optional: print for debugging
+        # print(f"DEBUG Worker: process_text_with_ai returned: success={success}")
+
+        # --- Check for cancellation *after* processing call returns ---
+        # Use the thread-safe getter method
+        was_cancelled = not self.is_running() 
+        # Optional: print for debugging
+        # print(f"DEBUG Worker: check after API call: was_cancelled={was_cancelled}")
+
+        if was_cancelled:
+             # If stop() was called, always report as cancelled, regardless of API success
+             final_message = "AI processing was cancelled by user."
+             # Emit finished with success=False, cancellation message, and was_cancelled=True
+             self.finished.emit(False, final_message, True) 
+             # Optional: print for debugging
+             # print(f"DEBUG Worker: emitting finished (cancelled): success=False, cancelled=True, msg='{final_message}'")
+        else:
+             # If not cancelled, emit the result from process_text_with_ai
+             # Emit finished with API success/failure, API result/error, and was_cancelled=False
+             self.finished.emit(success, result, False) 
+             # Optional: print for debugging
+             # print(f"DEBUG Worker: emitting finished (normal): success={success}, cancelled=False, msg='{result[:50]}...'")
+        
+        # Optional: print for debugging
+        # print("DEBUG Worker: run() finished.")
+
+
+    def _process_large_file(self, large_file):
+        """
+        Streams a memory-mapped file to the AI segment by segment and joins the outputs.
+        Every completed segment is checkpointed, and segments completed by an earlier run
+        of the same job are restored instead of requested again.
+        Stops between segments if the worker is cancelled.
+        """
+        from ai_processor import process_text_with_ai
+        from checkpoints import open_job
+        from telemetry import predict_request
+        from tokens import estimate_tokens
+        outputs = []
+        self.checkpoint = open_job(large_file.iter_segments(), self.prompt_instruction, large_file.name, self.compact)
+        total_segments = self.checkpoint.segment_count if self.checkpoint else large_file.segment_count()
+        completed = {index for index in range(1, total_segments + 1) if self.checkpoint and self.checkpoint.is_complete(index)}
+        if completed: self.progress.emit(f"Resuming '{large_file.name}': {len(completed)}/{total_segments} segment(s) restored from checkpoints.")
+        # Segments after the current one are assumed to be full-size
+        seconds_per_segment = predict_request(estimate_tokens(self.prompt_instruction) + LARGE_FILE_SEGMENT_BYTES // 4)["total_seconds"]
+        job_start_time = time.perf_counter()
+        for index, segment in enumerate(large_file.iter_segments(), start=1):
+            if not self.is_running(): return False, "AI processing was cancelled by user."
+            restored = self.checkpoint.load(index) if index in completed else None
+            if restored is not None: outputs.append(restored); continue
+            self.progress.emit(f"Processing segment {index}/{total_segments} of '{large_file.name}'...")
+            segments_left = sum(1 for later in range(index + 1, total_segments + 1) if later not in completed)
+            segment_eta = lambda elapsed, remaining: self.eta.emit(time.perf_counter() - job_start_time, remaining + segments_left * seconds_per_segment)
+            success, result = process_text_with_ai(segment, self.prompt_instruction, progress_callback=self.progress.emit, stats=self.repair_stats, eta_callback=segment_eta, compact=self.compact)
+            if not success:
+                resume_hint = f" {self.checkpoint.completed_count()} completed segment(s) are checkpointed; run the job again to resume." if self.checkpoint else ""
+                return False, f"Segment {index}/{total_segments} failed: {result}{resume_hint}"
+            if self.checkpoint: self.checkpoint.save(index, result)
+            outputs.append(result)
+        return True, "\n\n".join(outputs)
+
+
+class LargeFileStatsWorker(QThread):
+    """
+    Worker thread that scans a LargeTextFile once to compute size, line, word
+    and token statistics without loading the file into the UI.
+    """
+    # Argument: stats (dict) as returned by LargeTextFile.compute_stats
+    finished = pyqtSignal(dict)
+    # Argument: percentage of the file scanned (int)
+    progress = pyqtSignal(int)
+
+    def __init__(self, large_file):
+        super().__init__()
+        self.large_file = large_file
+        self._mutex = QMutex()
+        self._is_running = True
+
+    def stop(self):
+        self._mutex.lock(); self._is_running = False; self._mutex.unlock()
+
+    def is_running(self):
+        self._mutex.lock(); running = self._is_running; self._mutex.unlock()
+        return running
+
+    def run(self):
+        try: tokenizer = get_tokenizer()
+        except Exception as e:
+            print(f"WARNING (LargeFileStatsWorker): Tokenizer unavailable, counting words instead: {e}")
+            tokenizer = None
+        stats = self.large_file.compute_stats(
+            lambda text: count_tokens(text, tokenizer),
+            progress_callback=self.progress.emit,
+            should_stop=lambda: not self.is_running()
+        )
+        stats["estimated"] = tokenizer is None
+        self.finished.emit(stats)
+
+
+class TokenizerLoaderWorker(QThread):
+    """Loads the shared tokenizer (and transformers) in the background."""
+    # Arguments: success (bool), error_message (str, empty on success)
+    finished = pyqtSignal(bool, str)
+
+    def run(self):
+        try:
+            get_tokenizer()
+            self.finished.emit(True, "")
+        except Exception as e:
+            self.finished.emit(False, str(e))
+
+
+class WarmUpWorker(QThread):
+    """Checks the LM Studio endpoint and primes the model in the background (see ai_processor.warm_up_model)."""
+    # Arguments: success (bool), message (str) with latencies or the problem found
+    finished = pyqtSignal(bool, str)
+
+    def run(self):
+        from ai_processor import warm_up_model
+        success, message = warm_up_model()
+        self.finished.emit(success, message)
+
+
+class FanOutWorker(QThread):
+    """Renders one source with several prompts in the background (see fanout.fan_out)."""
+    progress = pyqtSignal(str)
+    # Arguments: results (list of dicts, one per prompt), summary message (str)
+    finished = pyqtSignal(object, str)
+
+    def __init__(self, source, prompt_names, output_dir, base_name, page_size_name, font_size, compact=INPUT_COMPACTION_ENABLED):
+        super().__init__()
+        self.compact = compact
+        self.source = source
+        self.prompt_names = prompt_names
+        self.output_dir = output_dir
+        self.base_name = base_name
+        self.page_size_name = page_size_name
+        self.font_size = font_size
+
+    def run(self):
+        from fanout import fan_out, summary_message
+        try:
+            with profiling.job("fanout"):
+                results, summary = fan_out(self.source, self.prompt_names, self.output_dir, self.base_name, self.page_size_name, self.font_size,
+                                           progress_callback=self.progress.emit, compact=self.compact)
+            self.finished.emit(results, summary_message(results, summary))
+        except Exception as e:
+            self.finished.emit([], f"Fan-out failed: {e}")
+
+
+# --- Standalone Test Block ---
+# (Adjusted lambda to accept the new argument)
+if __name__ == '__main__':
+    app = QApplication(sys.argv) 
+    test_worker = AIWorker("Tell me a joke.", "Generate a single short joke.")
+    # Adjust lambda for the finished signal
+    test_worker.finished.connect(lambda s, m, c: print(f"Worker Finished: Success={s}, Cancelled={c}, Message={m}"))
+    test_worker.progress.connect(lambda msg: print(f"Worker Progress: {msg}"))
+    print("Starting worker thread...")
+    test_worker.start() 
+    test_worker.wait()
+    print("Worker thread finished execution.")
     # sys.exit(app.exec()) # Uncomment to keep app open if needed for testing signals
\ No newline at end of file
@@ -0,0 +1,219 @@
+# xml_extractors.py
+
+# DOCX/PPTX extraction straight from the package XML, without python-docx/python-pptx.
+# word/document.xml and each slide/notes part are read from the zip with an incremental
+# parser (ElementTree.iterparse). Every top-level paragraph or shape is turned into Runs as
+# soon as it is complete and then discarded, so memory stays constant in the document size.
+# The reading rules mirror what the libraries expose (direct runs only, tri-state
+# bold/italic, underline values, style UI names, placeholder lookup), and the Documents are
+# built by the same helpers as extractors.py, so both engines give identical output
+# (checked by test_xml_extractors.py).
+
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+
+from document_model import Document, Run
+from extractors import add_docx_paragraph, add_pptx_slide
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+NOTES_SLIDE_REL_TYPE = "/notesSlide"
+
+# Built-in style names are stored lowercase in styles.xml; python-docx reports these UI names
+BUILTIN_STYLE_NAMES = {f"heading {level}": f"Heading {level}" for level in range(1, 10)}
+BUILTIN_STYLE_NAMES.update({"caption": "Caption", "footer": "Footer", "header": "Header"})
+
+# Shape elements that can be direct children of a slide's shape tree
+SHAPE_TAGS = {P + "sp", P + "grpSp", P + "graphicFrame", P + "cxnSp", P + "pic", P + "contentPart"}
+
+def _on_off(element, attribute):
+    """Tri-state ST_OnOff value: None if the element is missing, else True/False."""
+    if element is None: return None
+    value = element.get(attribute)
+    return value is None or value.lower() not in ("0", "false", "off")
+
+def _iter_children(zip_file, part_name, depth):
+    """
+    Yields the elements at the given depth (root = 1) of a zip part as each one is
+    completed, then removes it from its parent so the part is never held in memory.
+    """
+    parents = []
+    with zip_file.open(part_name) as stream:
+        for event, element in ET.iterparse(stream, events=("start", "end")):
+            if event == "start": parents.append(element); continue
+            parents.pop()
+            if len(parents) == depth - 1:
+                yield element
+                if parents: parents[-1].remove(element)
+
+def _read_relationships(zip_file, part_name):
+    """{relationship id: (type, absolute part name)} for a part, or {} if it has no .rels part."""
+    directory, file_name = posixpath.split(part_name)
+    rels_name = posixpath.join(directory, "_rels", file_name + ".rels")
+    if rels_name not in zip_file.namelist(): return {}
+    relationships = {}
+    for rel in ET.fromstring(zip_file.read(rels_name)).iter(REL):
+        if rel.get("TargetMode") == "External": continue
+        relationships[rel.get("Id")] = (rel.get("Type", ""), posixpath.normpath(posixpath.join(directory, rel.get("Target", ""))))
+    return relationships
+
+# --- DOCX ---
+
+def _docx_style_names(zip_file):
+    """Returns ({paragraph style id: UI name}, default paragraph style UI name)."""
+    names = {}; default_name = ""
+    if "word/styles.xml" not in zip_file.namelist(): return names, default_name
+    for style in ET.fromstring(zip_file.read("word/styles.xml")).iter(W + "style"):
+        if style.get(W + "type", "paragraph") != "paragraph": continue
+        name_element = style.find(W + "name")
+        name = name_element.get(W + "val", "") if name_element is not None else ""
+        name = BUILTIN_STYLE_NAMES.get(name, name)
+        names[style.get(W + "styleId")] = name
+        if _on_off(style, W + "default") and not default_name: default_name = name
+    return names, default_name
+
+def _docx_run_text(run):
+    """Text of a w:r the way python-docx reads it (tabs, breaks, non-breaking hyphens)."""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W + "t": parts.append(child.text or "")
+        elif tag in (W + "tab", W + "ptab"): parts.append("\t")
+        elif tag == W + "br": parts.append("\n" if child.get(W + "type", "textWrapping") == "textWrapping" else "")
+        elif tag == W + "cr": parts.append("\n")
+        elif tag == W + "noBreakHyphen": parts.append("-")
+    return "".join(parts)
+
+def _docx_runs(paragraph):
+    """Non-empty Runs of a w:p (direct w:r children only, like python-docx's Paragraph.runs)."""
+    runs = []
+    for run in paragraph.findall(W + "r"):
+        run_text = _docx_run_text(run)
+        if not run_text: continue
+        properties = run.find(W + "rPr")
+        if properties is None: runs.append(Run(run_text)); continue
+        underline = properties.find(W + "u")
+        underline_value = underline.get(W + "val") if underline is not None else None
+        struck = _on_off(properties.find(W + "strike"), W + "val")
+        runs.append(Run(run_text, bool(_on_off(properties.find(W + "b"), W + "val")), bool(_on_off(properties.find(W + "i"), W + "val")),
+                        bool(underline_value) and underline_value != "none" and not struck))
+    return runs
+
+def extract_docx_xml(file_path):
+    """
+    Extracts a DOCX file into a Document by streaming word/document.xml.
+    Same output as extractors.extract_docx; needs no third-party library.
+    """
+    document = Document()
+    with zipfile.ZipFile(file_path) as zip_file:
+        style_names, default_style_name = _docx_style_names(zip_file)
+        # w:document > w:body > w:p: only top-level paragraphs, as in python-docx's Document.paragraphs
+        for element in _iter_children(zip_file, "word/document.xml", 3):
+            if element.tag != W + "p": continue
+            properties = element.find(W + "pPr")
+            style_element = properties.find(W + "pStyle") if properties is not None else None
+            style_id = style_element.get(W + "val") if style_element is not None else None
+            style_name = style_names.get(style_id, default_style_name) if style_id else default_style_name
+            add_docx_paragraph(document, style_name, _docx_runs(element))
+    return document
+
+# --- PPTX ---
+
+def _text_frame_text(shape):
+    """TextFrame.text of a p:sp: paragraphs joined by newlines, line breaks as vertical tabs."""
+    body = shape.find(P + "txBody")
+    if body is None: return ""
+    paragraph_texts = []
+    for paragraph in body.findall(A + "p"):
+        parts = []
+        for child in paragraph:
+            if child.tag in (A + "r", A + "fld"): parts.append(child.findtext(A + "t") or "")
+            elif child.tag == A + "br": parts.append("\v")
+        paragraph_texts.append("".join(parts))
+    return "\n".join(paragraph_texts)
+
+def _placeholder(shape):
+    """The p:ph element of a shape, or None."""
+    for non_visual in shape:
+        if non_visual.tag.startswith(P + "nv"):
+            properties = non_visual.find(P + "nvPr")
+            return properties.find(P + "ph") if properties is not None else None
+    return None
+
+def _shape_name(shape):
+    for non_visual in shape:
+        if non_visual.tag.startswith(P + "nv"):
+            c_nv_pr = non_visual.find(P + "cNvPr")
+            return c_nv_pr.get("name", "") if c_nv_pr is not None else ""
+    return ""
+
+def _shape_paragraphs(shape):
+    """[(level, runs)] for a p:sp, with the a:r runs of each paragraph (unescaped)."""
+    body = shape.find(P + "txBody")
+    if body is None: return []
+    paragraphs = []
+    for paragraph in body.findall(A + "p"):
+        paragraph_properties = paragraph.find(A + "pPr")
+        level = int(paragraph_properties.get("lvl", "0")) if paragraph_properties is not None else 0
+        runs = []
+        for run in paragraph.findall(A + "r"):
+            properties = run.find(A + "rPr")
+            if properties is None: runs.append(Run(run.findtext(A + "t") or "")); continue
+            underline_value = properties.get("u")
+            runs.append(Run(run.findtext(A + "t") or "", properties.get("b") in ("1", "true"), properties.get("i") in ("1", "true"),
+                            bool(underline_value) and underline_value != "none"))
+        paragraphs.append((level, runs))
+    return paragraphs
+
+def _slide_parts(zip_file):
+    """Slide part names in presentation order."""
+    relationships = _read_relationships(zip_file, "ppt/presentation.xml")
+    root = ET.fromstring(zip_file.read("ppt/presentation.xml"))
+    slide_id_list = root.find(P + "sldIdLst")
+    if slide_id_list is None: return []
+    return [relationships[slide_id.get(R_ID)][1] for slide_id in slide_id_list.findall(P + "sldId") if slide_id.get(R_ID) in relationships]
+
+def _notes_text(zip_file, notes_part):
+    """Text of the notes slide's body placeholder, or None if it has none."""
+    # p:notes > p:cSld > p:spTree > shape
+    for shape in _iter_children(zip_file, notes_part, 4):
+        if shape.tag not in SHAPE_TAGS: continue
+        placeholder = _placeholder(shape)
+        if placeholder is not None and placeholder.get("type", "obj") == "body":
+            return _text_frame_text(shape) if shape.tag == P + "sp" else None
+    return None
+
+def extract_pptx_xml(file_path):
+    """
+    Extracts a PPTX file into a Document by streaming each slide and notes part.
+    Same output as extractors.extract_pptx; needs no third-party library.
+    """
+    document = Document()
+    with zipfile.ZipFile(file_path) as zip_file:
+        for slide_number, slide_part in enumerate(_slide_parts(zip_file), start=1):
+            notes_parts = [target for rel_type, target in _read_relationships(zip_file, slide_part).values() if rel_type.endswith(NOTES_SLIDE_REL_TYPE)]
+            has_notes_slide = bool(notes_parts)
+            notes_text = _notes_text(zip_file, notes_parts[0]) if has_notes_slide else None
+
+            title_text = None; title_found = False; shape_paragraphs = []
+            # p:sld > p:cSld > p:spTree > shape; only the small per-shape summaries are kept
+            for shape in _iter_children(zip_file, slide_part, 4):
+                if shape.tag not in SHAPE_TAGS: continue
+                placeholder = _placeholder(shape)
+                is_text_shape = shape.tag == P + "sp"
+                # The title is the first placeholder with idx 0 (python-pptx SlideShapes.title)
+                if not title_found and placeholder is not None and int(placeholder.get("idx", "0")) == 0:
+                    title_found = True
+                    if is_text_shape: title_text = _text_frame_text(shape)
+                    continue
+                if not is_text_shape: continue
+                if has_notes_slide and placeholder is not None and _shape_name(shape).startswith("Notes Placeholder"): continue
+                shape_paragraphs.append(_shape_paragraphs(shape))
+            add_pptx_slide(document, slide_number, notes_text, title_text, shape_paragraphs)
+    return document
+
+XML_EXTRACTORS = {".docx": extract_docx_xml, ".pptx": extract_pptx_xml}